@@ -0,0 +1,90 @@
+import time
+import numpy as np
+from typing import Iterable, Optional, Tuple
+
+class OrderBook:
+    """
+    Available-to-back ladder for one selection as price-sorted NumPy arrays,
+    best (highest) price first. Updating an existing level is a binary search;
+    fills walk the ladder with a cumulative sum instead of a Python loop.
+
+    Consumed volume recovers towards the last quoted depth at recovery_rate
+    (fraction of depth per second), applied lazily whenever the book is read.
+    """
+    def __init__(self, recovery_rate: float = 0.1, now: Optional[float] = None):
+        self.recovery_rate = recovery_rate
+        self.prices = np.empty(0)
+        self.volume = np.empty(0) # Currently available
+        self.depth = np.empty(0)  # Last quoted; what consumed volume recovers to
+        self.updated = time.time() if now is None else now
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def _replenish(self, now: Optional[float]):
+        now = time.time() if now is None else now
+        elapsed = now - self.updated
+        if elapsed > 0:
+            np.minimum(self.depth, self.volume + self.recovery_rate * elapsed * self.depth, out=self.volume)
+            self.updated = now
+
+    def set_level(self, price: float, volume: float, now: Optional[float] = None):
+        """
+        Sets a level to its quoted volume; a zero quote removes it.
+        """
+        self._replenish(now)
+        # Prices are descending, so search the negated (ascending) order
+        i = int(np.searchsorted(-self.prices, -price))
+        exists = i < len(self.prices) and self.prices[i] == price
+        if volume <= 0:
+            if exists:
+                self.prices, self.volume, self.depth = (np.delete(a, i) for a in (self.prices, self.volume, self.depth))
+        elif exists:
+            self.volume[i] = self.depth[i] = volume
+        else:
+            self.prices = np.insert(self.prices, i, price)
+            self.volume = np.insert(self.volume, i, volume)
+            self.depth = np.insert(self.depth, i, volume)
+
+    def update(self, levels: Iterable[Tuple[float, float]], now: Optional[float] = None):
+        """
+        Applies a depth snapshot of (price, volume) levels in one merge. Quoted
+        levels reset to their volume; zero quotes remove the level.
+        """
+        levels = np.asarray(list(levels), dtype=float).reshape(-1, 2)
+        if not len(levels):
+            return
+        self._replenish(now)
+        # Last quote wins for repeated prices
+        prices, last = np.unique(levels[::-1, 0], return_index=True)
+        volumes = levels[::-1, 1][last]
+
+        keep = ~np.isin(self.prices, prices)
+        quoted = volumes > 0
+        merged_prices = np.concatenate([self.prices[keep], prices[quoted]])
+        order = np.argsort(-merged_prices, kind='stable')
+        self.prices = merged_prices[order]
+        self.volume = np.concatenate([self.volume[keep], volumes[quoted]])[order]
+        self.depth = np.concatenate([self.depth[keep], volumes[quoted]])[order]
+
+    def available(self, now: Optional[float] = None) -> float:
+        self._replenish(now)
+        return float(self.volume.sum())
+
+    def fill(self, stake: float, now: Optional[float] = None) -> Tuple[float, float]:
+        """
+        Consumes liquidity best price first. Returns (filled stake, average
+        price), with price 0 when nothing fills.
+        """
+        self._replenish(now)
+        cum = np.cumsum(self.volume)
+        # Levels up to and including the one that completes the stake
+        k = min(int(np.searchsorted(cum, stake)) + 1, len(cum))
+        before = cum[:k] - self.volume[:k]
+        fills = np.clip(stake - before, 0.0, self.volume[:k])
+        self.volume[:k] -= fills
+
+        filled = float(fills.sum())
+        if filled <= 0:
+            return 0.0, 0.0
+        return filled, float(fills @ self.prices[:k]) / filled
@@ -0,0 +1,290 @@
+import json
+import time
+import asyncio
+import threading
+import numpy as np
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from .simulator import LiveEventGenerator
+
+# (seconds from the start of the recording, stream, fields)
+Tick = Tuple[float, str, Dict[str, str]]
+
+INPUT_STREAMS = ('live_events', 'live_odds')
+OUTPUT_STREAMS = ('live_predictions', 'live_signals')
+
+# Seconds each book trails the exchange, and its overround
+BOOKMAKERS = {'Betfair': (0.0, 1.0), 'Pinnacle': (3.0, 1.02), 'Bet365': (7.0, 1.06)}
+SELECTIONS = ('home', 'draw', 'away')
+
+def _outcome_probs(home_exp_goals: float, away_exp_goals: float, max_goals: int = 10) -> np.ndarray:
+    goals = np.arange(max_goals + 1)
+    log_fact = np.cumsum(np.log(np.maximum(goals, 1)))
+    home = np.exp(goals * np.log(home_exp_goals) - home_exp_goals - log_fact)
+    away = np.exp(goals * np.log(away_exp_goals) - away_exp_goals - log_fact)
+    grid = np.outer(home, away)
+    probs = np.array([np.tril(grid, -1).sum(), np.trace(grid), np.triu(grid, 1).sum()])
+    return probs / probs.sum()
+
+def synthesize_traffic(n_fixtures: int = 20, seed: int = 42, odds_interval_sec: float = 5.0,
+                       kickoff_spread_sec: float = 300.0, price_vol: float = 0.004,
+                       depth_levels: int = 3) -> List[Tick]:
+    """
+    Synthetic in-play traffic: match events from LiveEventGenerator plus 1X2 odds
+    for every book in BOOKMAKERS. Odds follow one exchange price path per fixture
+    (a log-price random walk that jumps on goals); the other books quote it late
+    and with margin, so the lead-lag and EV paths see realistic input.
+    """
+    rng = np.random.default_rng(seed)
+    events = LiveEventGenerator(seed)
+    match_sec = 95 * 60
+    ticks: List[Tick] = []
+
+    for f in range(n_fixtures):
+        fixture_id = f"replay_{f}"
+        kickoff = rng.uniform(0, kickoff_spread_sec)
+        home_exp, away_exp = rng.uniform(0.8, 2.0), rng.uniform(0.6, 1.6)
+
+        # Exchange log prices on a one-second grid, with a jump at every goal
+        log_prices = np.cumsum(rng.normal(0, price_vol, (match_sec, 3)), axis=0)
+        log_prices -= np.log(_outcome_probs(home_exp, away_exp))
+        for e in events.generate_match_stream(fixture_id, home_exp, away_exp):
+            minute = int(e['timestamp'])
+            t = minute * 60 + rng.uniform(0, 60)
+            ticks.append((kickoff + t, 'live_events', {
+                'fixtureId': fixture_id,
+                'type': e['type'],
+                'data': json.dumps({**e['data'], 'elapsed': minute})
+            }))
+            if e['type'] == 'GOAL':
+                scorer = 1.0 if e['data']['team'] == 'home' else -1.0
+                log_prices[int(t):] += [-0.5 * scorer, 0.2, 0.5 * scorer]
+        ticks.append((kickoff + match_sec, 'live_events', {
+            'fixtureId': fixture_id,
+            'type': 'STATUS',
+            'data': json.dumps({'status': 'FT', 'elapsed': 90})
+        }))
+
+        prices = np.maximum(np.exp(log_prices), 1.01)
+        for bookmaker, (lag, margin) in BOOKMAKERS.items():
+            n = int(match_sec / odds_interval_sec)
+            times = np.arange(n) * odds_interval_sec + rng.uniform(0, odds_interval_sec, n)
+            quoted = np.maximum(prices[np.clip(times - lag, 0, match_sec - 1).astype(int)] / margin, 1.01)
+            for t, row in zip(times, quoted.round(2)):
+                values = [{'selection': sel, 'odds': float(p)} for sel, p in zip(SELECTIONS, row)]
+                if bookmaker == 'Betfair':
+                    for v in values:
+                        volume = rng.uniform(50, 500, depth_levels).round(2)
+                        v['depth'] = [{'price': round(v['odds'] - 0.02 * i, 2), 'volume': float(vol)}
+                                      for i, vol in enumerate(volume)]
+                ticks.append((kickoff + t, 'live_odds', {
+                    'fixtureId': fixture_id,
+                    'bookmaker': bookmaker,
+                    'market': '1X2',
+                    'values': json.dumps(values)
+                }))
+
+    ticks.sort(key=lambda tick: tick[0])
+    return ticks
+
+def record_traffic(client, count: Optional[int] = None, streams: Sequence[str] = INPUT_STREAMS,
+                   start: str = '-', end: str = '+') -> List[Tick]:
+    """
+    Captures existing stream entries (e.g. from a staging Redis) as replayable
+    ticks, timed by their entry IDs.
+    """
+    ticks = []
+    for stream in streams:
+        for msg_id, data in client.xrange(stream, start, end, count=count):
+            ticks.append((_entry_time(msg_id), stream,
+                          {_decode(k): _decode(v) for k, v in data.items()}))
+    ticks.sort(key=lambda tick: tick[0])
+    if count is not None:
+        ticks = ticks[:count]
+    origin = ticks[0][0] if ticks else 0.0
+    return [(t - origin, stream, fields) for t, stream, fields in ticks]
+
+def save_traffic(path: str, ticks: List[Tick]):
+    with open(path, 'w') as f:
+        for t, stream, fields in ticks:
+            f.write(json.dumps({'t': t, 'stream': stream, 'fields': fields}) + '\n')
+
+def load_traffic(path: str) -> List[Tick]:
+    with open(path) as f:
+        rows = (json.loads(line) for line in f if line.strip())
+        return [(row['t'], row['stream'], row['fields']) for row in rows]
+
+def replay(client, ticks: List[Tick], speed: float = 1.0, batch_size: int = 500) -> float:
+    """
+    XADDs ticks at speed times their recorded pace (speed <= 0: as fast as
+    possible), pipelining whatever is due together. Returns seconds taken.
+    """
+    start = time.perf_counter()
+    i = 0
+    while i < len(ticks):
+        if speed > 0:
+            wait = ticks[i][0] / speed - (time.perf_counter() - start)
+            if wait > 0:
+                time.sleep(wait)
+        due = (time.perf_counter() - start) * speed if speed > 0 else float('inf')
+        pipe = client.pipeline(transaction=False)
+        j = i
+        while j < len(ticks) and j - i < batch_size and (j == i or ticks[j][0] <= due):
+            pipe.xadd(ticks[j][1], ticks[j][2])
+            j += 1
+        pipe.execute()
+        i = j
+    return time.perf_counter() - start
+
+def backlog(client, group: str, streams: Sequence[str] = INPUT_STREAMS) -> int:
+    """
+    Entries not yet acked by group: undelivered (lag, Redis >= 7) plus pending.
+    """
+    total = 0
+    for stream in streams:
+        for info in client.xinfo_groups(stream):
+            if _decode(info['name']) == group:
+                total += (info.get('lag') or 0) + info['pending']
+    return total
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {'count': 0, 'p50_ms': None, 'p99_ms': None}
+    p50, p99 = np.percentile(samples, [50, 99]) * 1000
+    return {'count': len(samples), 'p50_ms': float(p50), 'p99_ms': float(p99)}
+
+def benchmark(service, client, ticks: List[Tick], speed: float = 1.0, use_async: bool = False,
+              sample_interval_sec: float = 0.25, drain_timeout_sec: float = 60.0) -> Dict:
+    """
+    Replays ticks into a set-up LiveInferenceService running on a background
+    thread and reports sustained throughput, consumer backlog and latency from
+    the service's lag observations: input entry to handled, and source tick to
+    published prediction/signal.
+    """
+    lags = defaultdict(list)
+    service.lag_listener = lambda stream, lag: lags[stream].append(lag)
+    target = (lambda: asyncio.run(service.run_async())) if use_async else service.run
+    consumer = threading.Thread(target=target, daemon=True)
+    consumer.start()
+
+    replay_sec = []
+    producer = threading.Thread(target=lambda: replay_sec.append(replay(client, ticks, speed)), daemon=True)
+    start = time.perf_counter()
+    producer.start()
+
+    max_backlog = 0
+    drained = False
+    while time.perf_counter() - start < (ticks[-1][0] / speed if speed > 0 else 0) + drain_timeout_sec:
+        time.sleep(sample_interval_sec)
+        pending = backlog(client, service.group_name)
+        max_backlog = max(max_backlog, pending)
+        if not producer.is_alive() and pending == 0 and not service.repricer.pending:
+            drained = True
+            break
+    elapsed = time.perf_counter() - start
+    service.stop()
+    consumer.join(timeout=service.block_ms / 1000 + 5)
+    producer.join()
+
+    return {
+        'messages': len(ticks),
+        'speed': speed,
+        'drained': drained,
+        'replay_sec': replay_sec[0] if replay_sec else None,
+        'elapsed_sec': elapsed,
+        'offered_rate': len(ticks) / replay_sec[0] if replay_sec else None,
+        'throughput': len(ticks) / elapsed if drained else None,
+        'max_backlog': max_backlog,
+        'final_backlog': backlog(client, service.group_name),
+        'lag': {stream: _percentiles(lags[stream]) for stream in INPUT_STREAMS + OUTPUT_STREAMS}
+    }
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+def _entry_time(msg_id) -> float:
+    return int(_decode(msg_id).split('-', 1)[0]) / 1000.0
+
+class _NoShadowExperiments:
+    def submit_shadow_inference(self, fixture_id, context_data) -> bool:
+        return False
+
+    def close(self):
+        pass
+
+def _print_report(report: Dict):
+    throughput = f"{report['throughput']:.0f} msg/s" if report['throughput'] else "did not drain"
+    speed = f"x{report['speed']:g}" if report['speed'] > 0 else "max"
+    print(f"speed {speed}: {report['messages']} msgs, offered {report['offered_rate']:.0f} msg/s, "
+          f"sustained {throughput}, max backlog {report['max_backlog']}, final backlog {report['final_backlog']}")
+    for stream, stats in report['lag'].items():
+        if stats['count']:
+            print(f"  {stream:<17} n={stats['count']:<7} p50={stats['p50_ms']:.1f}ms p99={stats['p99_ms']:.1f}ms")
+
+def main(argv: Optional[Sequence[str]] = None):
+    """
+    python -m src.backtesting.replay [--speeds 1,10,0] [--redis-url URL] ...
+
+    Without --redis-url the streams live in an in-process fakeredis server
+    (requirements-dev.txt).
+    Each run deletes the live streams first, so never point it at production.
+    """
+    import argparse
+    import contextlib
+    import os
+    from ..live_inference import LiveInferenceService
+
+    parser = argparse.ArgumentParser(description="Replay live traffic into LiveInferenceService and benchmark it")
+    parser.add_argument('--redis-url', help="Local/dedicated Redis; defaults to an in-process stand-in")
+    parser.add_argument('--traffic', help="JSONL recording to replay instead of synthetic traffic")
+    parser.add_argument('--record', help="Capture the input streams at --redis-url to this JSONL file and exit")
+    parser.add_argument('--count', type=int, help="Max entries to record")
+    parser.add_argument('--fixtures', type=int, default=20)
+    parser.add_argument('--odds-interval', type=float, default=5.0, help="Seconds between quotes per book")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--speeds', default='10,0', help="Comma-separated speed multiples; 0 replays flat out")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--async', dest='use_async', action='store_true', help="Benchmark run_async() (needs --redis-url)")
+    parser.add_argument('--shadow', action='store_true', help="Keep shadow experiments on (needs the database)")
+    parser.add_argument('--verbose', action='store_true', help="Show the service's own output")
+    args = parser.parse_args(argv)
+
+    if args.redis_url:
+        import redis
+        client = redis.from_url(args.redis_url)
+    elif args.record or args.use_async:
+        parser.error("--record and --async need --redis-url")
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            parser.error("the in-process stand-in needs fakeredis (pip install -r requirements-dev.txt); "
+                         "or pass --redis-url")
+        client = fakeredis.FakeRedis()
+
+    if args.record:
+        ticks = record_traffic(client, args.count)
+        save_traffic(args.record, ticks)
+        print(f"Recorded {len(ticks)} ticks to {args.record}")
+        return
+
+    if args.traffic:
+        ticks = load_traffic(args.traffic)
+    else:
+        ticks = synthesize_traffic(args.fixtures, args.seed, args.odds_interval)
+    print(f"Replaying {len(ticks)} ticks spanning {ticks[-1][0]:.0f}s")
+
+    for speed in (float(s) for s in args.speeds.split(',')):
+        client.delete(*INPUT_STREAMS, *OUTPUT_STREAMS, 'live_regime_state')
+        service = LiveInferenceService(args.redis_url or 'redis://in-process', batch_size=args.batch_size,
+                                       block_ms=100, redis_client=client,
+                                       experiment_manager=None if args.shadow else _NoShadowExperiments())
+        service.snapshots.clear()
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+        with quiet:
+            service.setup()
+            report = benchmark(service, client, ticks, speed, args.use_async)
+        _print_report(report)
+
+if __name__ == "__main__":
+    main()
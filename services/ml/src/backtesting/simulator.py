@@ -1,6 +1,62 @@
+import os
 import pandas as pd
 import numpy as np
-from typing import List, Dict, Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Callable, Optional, Sequence
+from .order_book import OrderBook
+
+def _simulate_log_paths(rng: np.random.Generator, n_paths: int, n_steps: int, win_rate: float,
+                        odds: float, stake_fraction: float, black_swan_prob: float,
+                        black_swan_loss: float) -> np.ndarray:
+    """
+    Log bankroll growth (relative to the start) after each step, shape (n_paths, n_steps).
+    """
+    wins = rng.random((n_paths, n_steps)) < win_rate
+    swans = rng.random((n_paths, n_steps)) < black_swan_prob
+    log_returns = np.where(wins, np.log1p(stake_fraction * (odds - 1)), np.log1p(-stake_fraction))
+    log_returns += swans * np.log1p(-black_swan_loss)
+    return np.cumsum(log_returns, axis=1, out=log_returns)
+
+def _monte_carlo_chunk(seed: np.random.SeedSequence, n_paths: int, n_steps: int, params: Dict,
+                       log_ruin: float, bin_edges: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Process-pool entry point: simulates one chunk of paths and reduces it to
+    mergeable statistics, so full paths never leave the chunk.
+    """
+    log_paths = _simulate_log_paths(np.random.default_rng(seed), n_paths, n_steps, **params)
+    n_bins = len(bin_edges) - 1
+
+    # Per-step histogram of log bankroll; counts from every chunk simply add up
+    bins = np.clip(np.searchsorted(bin_edges, log_paths, side='right') - 1, 0, n_bins - 1)
+    bins += np.arange(n_steps) * n_bins
+    step_counts = np.bincount(bins.ravel(), minlength=n_steps * n_bins).reshape(n_steps, n_bins)
+
+    peaks = np.maximum(np.maximum.accumulate(log_paths, axis=1), 0.0)
+    max_drawdown = 1 - np.exp((log_paths - peaks).min(axis=1))
+
+    below = log_paths <= log_ruin
+    ruined = below.any(axis=1)
+    time_to_ruin = np.where(ruined, below.argmax(axis=1) + 1, 0)
+    return {
+        'step_counts': step_counts,
+        'max_drawdown': max_drawdown,
+        'time_to_ruin': time_to_ruin[ruined],
+        'final_log': log_paths[:, -1]
+    }
+
+def _histogram_percentiles(counts: np.ndarray, bin_edges: np.ndarray, q: Sequence[float]) -> np.ndarray:
+    """
+    Percentiles q (0-100) of each row of counts, interpolated linearly inside bins.
+    """
+    cum = np.cumsum(counts, axis=1)
+    result = np.empty((len(counts), len(q)))
+    for row, (c, total) in enumerate(zip(cum, cum[:, -1])):
+        targets = np.asarray(q) / 100 * total
+        i = np.minimum(np.searchsorted(c, targets, side='left'), len(c) - 1)
+        before = np.where(i > 0, c[i - 1], 0)
+        frac = np.where(counts[row, i] > 0, (targets - before) / np.maximum(counts[row, i], 1), 0.0)
+        result[row] = bin_edges[i] + np.clip(frac, 0, 1) * (bin_edges[i + 1] - bin_edges[i])
+    return result
 
 class BacktestingSimulator:
     def __init__(self, initial_bankroll: float = 10000, commission: float = 0.02):
@@ -8,6 +64,7 @@ class BacktestingSimulator:
         self.bankroll = initial_bankroll
         self.commission = commission
         self.results = []
+        self.batch_results: List[pd.DataFrame] = [] # run_batch() output, kept as frames
 
     def run(self, df: pd.DataFrame, predict_fn: Callable, simulate_liquidity: bool = False) -> pd.DataFrame:
         """
@@ -17,7 +74,7 @@ class BacktestingSimulator:
         """
         df = df.sort_values('date')
         
-        # simulated_liquidity: {fixture_id: {selection: {price: volume}}}
+        # simulated_liquidity: {fixture_id: {selection: OrderBook}}
         self.sim_liquidity = {}
 
         for index, row in df.iterrows():
@@ -36,7 +93,8 @@ class BacktestingSimulator:
                 
                 # 2b. Microstructure aware execution
                 if simulate_liquidity:
-                    odds = self._execute_with_liquidity(row['fixture_id'], sel_name, raw_odds, stake)
+                    odds = self._execute_with_liquidity(row['fixture_id'], sel_name, raw_odds, stake,
+                                                        now=pd.Timestamp(row['date']).timestamp())
                     if odds == 0: continue # No fill
                 else:
                     odds = raw_odds
@@ -65,64 +123,136 @@ class BacktestingSimulator:
         
         return pd.DataFrame(self.results)
 
-    def _execute_with_liquidity(self, fixture_id, selection, base_odds, stake):
+    def run_batch(self, df: pd.DataFrame, predict_batch_fn: Callable) -> pd.DataFrame:
+        """
+        Array version of run() for large backtests (no liquidity simulation).
+        predict_batch_fn receives the date-sorted df and returns, row for row,
+        'recommended_bet' (0, 1, 2 or None/NaN for no bet) and 'suggested_stake'
+        as a DataFrame or dict of arrays.
+
+        Fractional stakes compound, so the bankroll after each bet is
+        bankroll * cumprod(1 + stake_fraction * return), which gives the same
+        bets, stakes and profits as the per-row loop up to float rounding.
+        """
+        df = df.sort_values('date')
+        predictions = predict_batch_fn(df)
+        bet_type = pd.Series(predictions['recommended_bet']).to_numpy(dtype=float, na_value=np.nan)
+        fraction = np.asarray(predictions['suggested_stake'], dtype=float)
+
+        placed = ~np.isnan(bet_type)
+        bets = df[placed]
+        bet_type = bet_type[placed].astype(int)
+        fraction = fraction[placed]
+
+        odds = bets[['home_odds', 'draw_odds', 'away_odds']].to_numpy(dtype=float)[np.arange(len(bets)), bet_type]
+        is_win = bets['result'].to_numpy() == bet_type
+        # Profit per unit staked
+        unit_return = np.where(is_win, (odds - 1) * (1 - self.commission), -1.0)
+
+        bankroll = self.bankroll * np.cumprod(1 + fraction * unit_return)
+        stake = np.concatenate([[self.bankroll], bankroll[:-1]]) * fraction
+        if len(bankroll):
+            self.bankroll = bankroll[-1]
+
+        results = pd.DataFrame({
+            'date': bets['date'].to_numpy(),
+            'home_team': bets['home_team'].to_numpy(),
+            'away_team': bets['away_team'].to_numpy(),
+            'bet_type': bet_type,
+            'odds': odds,
+            'stake': stake,
+            'profit': stake * unit_return,
+            'bankroll': bankroll,
+            'is_win': is_win
+        })
+        if len(results):
+            self.batch_results.append(results)
+        return results
+
+    def _execute_with_liquidity(self, fixture_id, selection, base_odds, stake, now: Optional[float] = None):
         """
         Simulates liquidity consumption and slippage in backtesting.
         """
         if fixture_id not in self.sim_liquidity:
             # Generate a synthetic order book for this fixture/selection
-            levels = 5
-            self.sim_liquidity[fixture_id] = {
-                'home': {base_odds - i*0.02: 1000 * (0.6**i) for i in range(levels)},
-                'draw': {base_odds - i*0.05: 500 * (0.6**i) for i in range(levels)},
-                'away': {base_odds - i*0.05: 500 * (0.6**i) for i in range(levels)}
-            }
-
-        book = self.sim_liquidity[fixture_id].get(selection, {})
-        remaining_stake = stake
-        total_weighted_odds = 0
-
-        sorted_prices = sorted(book.keys(), reverse=True)
-        for price in sorted_prices:
-            vol = book[price]
-            fill = min(remaining_stake, vol)
-            total_weighted_odds += fill * price
-            book[price] -= fill # Consume
-            remaining_stake -= fill
-            if remaining_stake <= 0: break
-
-        if stake > remaining_stake:
-            return total_weighted_odds / (stake - remaining_stake)
-        return 0
+            levels = np.arange(5)
+            self.sim_liquidity[fixture_id] = {}
+            for sel, tick, top in [('home', 0.02, 1000), ('draw', 0.05, 500), ('away', 0.05, 500)]:
+                book = self.sim_liquidity[fixture_id][sel] = OrderBook(now=now)
+                book.update(zip(base_odds - levels * tick, top * 0.6 ** levels), now=now)
+
+        book = self.sim_liquidity[fixture_id].get(selection)
+        if book is None:
+            return 0
+        # Volume taken by earlier bets recovers with simulated time
+        return book.fill(stake, now=now)[1]
 
     def run_monte_carlo(self, n_sims: int = 1000, n_steps: int = 100,
                         avg_win_rate: float = 0.55, avg_odds: float = 1.9,
-                        black_swan_prob: float = 0.01):
+                        black_swan_prob: float = 0.01, seed: Optional[int] = None):
         """
         Runs Monte Carlo simulations including Black Swan scenarios.
+        Returns every path; use run_monte_carlo_summary for large studies.
         """
-        all_paths = []
-        for _ in range(n_sims):
-            path = [self.initial_bankroll]
-            current_bankroll = self.initial_bankroll
-
-            for _ in range(n_steps):
-                # Standard step
-                if np.random.random() < avg_win_rate:
-                    current_bankroll += current_bankroll * 0.02 * (avg_odds - 1)
-                else:
-                    current_bankroll -= current_bankroll * 0.02
+        log_paths = _simulate_log_paths(np.random.default_rng(seed), n_sims, n_steps, avg_win_rate, avg_odds,
+                                        stake_fraction=0.02, black_swan_prob=black_swan_prob, black_swan_loss=0.05)
+        paths = self.initial_bankroll * np.exp(np.hstack([np.zeros((n_sims, 1)), log_paths]))
+        return paths.tolist()
 
-                # Black Swan check (e.g. 5% bankroll wipe)
-                if np.random.random() < black_swan_prob:
-                    current_bankroll *= 0.95
+    def run_monte_carlo_summary(self, n_sims: int = 100000, n_steps: int = 100,
+                                avg_win_rate: float = 0.55, avg_odds: float = 1.9,
+                                black_swan_prob: float = 0.01, stake_fraction: float = 0.02,
+                                black_swan_loss: float = 0.05, ruin_level: float = 0.5,
+                                percentiles: Sequence[float] = (5, 25, 50, 75, 95),
+                                chunk_size: int = 10000, seed: int = 42,
+                                max_workers: Optional[int] = 1, n_bins: int = 4000) -> Dict:
+        """
+        Monte Carlo bankroll study in chunks of chunk_size paths, keeping only
+        summary statistics: per-step percentile bands (from log-bankroll
+        histograms, so accurate to the bin width), the probability of falling to
+        ruin_level x the initial bankroll, time to ruin and the max drawdown and
+        final bankroll distributions.
 
-                path.append(current_bankroll)
-                if current_bankroll <= 0: break
+        Every chunk draws from its own child of SeedSequence(seed), so results
+        are identical for any max_workers.
+        """
+        params = {'win_rate': avg_win_rate, 'odds': avg_odds, 'stake_fraction': stake_fraction,
+                  'black_swan_prob': black_swan_prob, 'black_swan_loss': black_swan_loss}
+        # Histogram range covers every reachable log bankroll
+        best = np.log1p(stake_fraction * (avg_odds - 1))
+        worst = np.log1p(-stake_fraction) + np.log1p(-black_swan_loss)
+        bin_edges = np.linspace(n_steps * min(worst, 0.0), n_steps * max(best, 0.0) + 1e-12, n_bins + 1)
 
-            all_paths.append(path)
+        sizes = [min(chunk_size, n_sims - start) for start in range(0, n_sims, chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        args = [(s, size, n_steps, params, np.log(ruin_level), bin_edges) for s, size in zip(seeds, sizes)]
+        workers = min(max_workers or os.cpu_count() or 1, len(args))
+        if workers <= 1:
+            chunks = [_monte_carlo_chunk(*a) for a in args]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                chunks = list(pool.map(_monte_carlo_chunk, *zip(*args)))
 
-        return all_paths
+        step_counts = sum(c['step_counts'] for c in chunks)
+        max_drawdown = np.concatenate([c['max_drawdown'] for c in chunks])
+        time_to_ruin = np.concatenate([c['time_to_ruin'] for c in chunks])
+        final = self.initial_bankroll * np.exp(np.concatenate([c['final_log'] for c in chunks]))
+
+        bands = self.initial_bankroll * np.exp(_histogram_percentiles(step_counts, bin_edges, percentiles))
+        bands = np.vstack([np.full(len(percentiles), float(self.initial_bankroll)), bands])
+        labels = [f"p{p:g}" for p in percentiles]
+        return {
+            'n_sims': n_sims,
+            'percentile_bands': pd.DataFrame(bands, columns=labels, index=pd.RangeIndex(n_steps + 1, name='step')),
+            'ruin_probability': len(time_to_ruin) / n_sims,
+            'time_to_ruin': {
+                'mean': float(time_to_ruin.mean()) if len(time_to_ruin) else None,
+                'median': float(np.median(time_to_ruin)) if len(time_to_ruin) else None,
+                'counts': np.bincount(time_to_ruin, minlength=n_steps + 1)[1:]
+            },
+            'max_drawdown': dict(zip(labels, np.percentile(max_drawdown, percentiles)), mean=float(max_drawdown.mean())),
+            'final_bankroll': dict(zip(labels, np.percentile(final, percentiles)), mean=float(final.mean()))
+        }
 
     def stress_test(self, strategy_returns: pd.DataFrame, shock_scenario: str = 'LIQUIDITY_CRUNCH'):
         """
@@ -139,9 +269,10 @@ class BacktestingSimulator:
         return strategy_returns
 
     def calculate_metrics(self) -> Dict:
-        if not self.results: return {}
+        if not self.results and not self.batch_results: return {}
         
-        df_res = pd.DataFrame(self.results)
+        frames = ([pd.DataFrame(self.results)] if self.results else []) + self.batch_results
+        df_res = pd.concat(frames, ignore_index=True)
         total_bets = len(df_res)
         win_rate = df_res['is_win'].mean()
         total_profit = df_res['profit'].sum()
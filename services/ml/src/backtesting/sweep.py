@@ -0,0 +1,102 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence
+from .simulator import BacktestingSimulator
+from ..infrastructure.shared_frame import share_frame, attach_frame, release_frame
+
+# Parameters consumed by BacktestingSimulator; everything else goes to the strategy
+SIMULATOR_PARAMS = ('commission', 'initial_bankroll')
+
+def value_bet_strategy(df: pd.DataFrame, ev_threshold: float = 0.05, kelly_fraction: float = 0.25,
+                       max_stake: float = 0.05) -> Dict[str, np.ndarray]:
+    """
+    Batch strategy for BacktestingSimulator.run_batch: backs the selection with
+    the highest EV from the home_prob/draw_prob/away_prob columns when it clears
+    ev_threshold, staking a capped fraction of the Kelly stake.
+    """
+    probs = df[['home_prob', 'draw_prob', 'away_prob']].to_numpy(dtype=float)
+    odds = df[['home_odds', 'draw_odds', 'away_odds']].to_numpy(dtype=float)
+    ev = probs * odds - 1
+    best = ev.argmax(axis=1)
+    rows = np.arange(len(df))
+    best_ev, best_odds = ev[rows, best], odds[rows, best]
+
+    stake = np.minimum(kelly_fraction * best_ev / (best_odds - 1), max_stake)
+    return {
+        'recommended_bet': np.where(best_ev > ev_threshold, best, np.nan),
+        'suggested_stake': stake
+    }
+
+# Per-process dataset, attached once by the pool initializer
+_dataset: Optional[pd.DataFrame] = None
+
+def _init_worker(spec: Dict):
+    global _dataset
+    _dataset = attach_frame(spec)
+
+def _evaluate(strategy: Callable, params: Dict, df: Optional[pd.DataFrame] = None) -> Dict:
+    """
+    Process-pool entry point: one batch backtest of strategy under params.
+    """
+    df = _dataset if df is None else df
+    sim_params = {k: v for k, v in params.items() if k in SIMULATOR_PARAMS}
+    strategy_params = {k: v for k, v in params.items() if k not in SIMULATOR_PARAMS}
+    sim = BacktestingSimulator(**sim_params)
+    sim.run_batch(df, lambda batch: strategy(batch, **strategy_params))
+    return sim.calculate_metrics()
+
+class ParameterSweep:
+    """
+    Backtests a batch strategy over many parameter sets. The historical frame is
+    date-sorted once and placed in shared memory; each pool worker attaches to
+    it once and then evaluates parameter sets with BacktestingSimulator.run_batch.
+    """
+    def __init__(self, df: pd.DataFrame, strategy: Callable = value_bet_strategy,
+                 max_workers: Optional[int] = None):
+        self.df = df.sort_values('date').reset_index(drop=True)
+        self.strategy = strategy
+        self.max_workers = max_workers
+
+    @staticmethod
+    def grid(param_grid: Dict[str, Sequence]) -> List[Dict]:
+        names = list(param_grid)
+        return [dict(zip(names, values)) for values in itertools.product(*(param_grid[n] for n in names))]
+
+    @staticmethod
+    def random(param_space: Dict[str, object], n_iter: int, seed: int = 42) -> List[Dict]:
+        """
+        (low, high) tuples are sampled uniformly, lists by choice.
+        """
+        rng = np.random.default_rng(seed)
+        samples = []
+        for _ in range(n_iter):
+            params = {}
+            for name, space in param_space.items():
+                if isinstance(space, tuple):
+                    params[name] = float(rng.uniform(*space))
+                else:
+                    params[name] = space[rng.integers(len(space))]
+            samples.append(params)
+        return samples
+
+    def run(self, param_sets: List[Dict]) -> pd.DataFrame:
+        """
+        Returns one row per parameter set: the parameters followed by calculate_metrics().
+        """
+        workers = min(self.max_workers or os.cpu_count() or 1, len(param_sets))
+        if workers <= 1:
+            metrics = [_evaluate(self.strategy, params, self.df) for params in param_sets]
+        else:
+            blocks, spec = share_frame(self.df)
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(spec,)) as pool:
+                    chunksize = max(1, len(param_sets) // (workers * 4))
+                    metrics = list(pool.map(_evaluate, itertools.repeat(self.strategy), param_sets,
+                                            chunksize=chunksize))
+            finally:
+                release_frame(blocks)
+
+        return pd.concat([pd.DataFrame(param_sets), pd.DataFrame(metrics)], axis=1)
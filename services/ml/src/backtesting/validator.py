@@ -1,40 +1,100 @@
+import os
 import pandas as pd
-from typing import Callable, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
+from ..infrastructure.shared_frame import share_frame, attach_frame, release_frame
+
+def _predict_window(model, test: pd.DataFrame, predict_fn: Optional[Callable],
+                    predict_batch_fn: Optional[Callable]) -> pd.DataFrame:
+    if predict_batch_fn is not None:
+        preds = pd.DataFrame(predict_batch_fn(model, test)).reset_index(drop=True)
+    else:
+        preds = pd.DataFrame([predict_fn(model, row) for _, row in test.iterrows()])
+    preds['actual'] = test['result'].to_numpy()
+    preds['date'] = test['date'].to_numpy()
+    return preds
+
+# Per-process copy of the validation frame, attached once by the pool initializer
+_frame: Optional[pd.DataFrame] = None
+
+def _init_worker(spec):
+    global _frame
+    _frame = attach_frame(spec)
+
+def _run_fold(train_fn: Callable, predict_fn: Optional[Callable], predict_batch_fn: Optional[Callable],
+              train_stop: int, test_stop: int) -> pd.DataFrame:
+    """
+    Process-pool entry point: trains on rows [0, train_stop) and predicts [train_stop, test_stop).
+    """
+    model = train_fn(_frame.iloc[:train_stop])
+    return _predict_window(model, _frame.iloc[train_stop:test_stop], predict_fn, predict_batch_fn)
 
 class WalkForwardValidator:
-    def __init__(self, train_window_years: int = 3, test_window_months: int = 6):
+    def __init__(self, train_window_years: int = 3, test_window_months: int = 6,
+                 max_workers: Optional[int] = 1):
         self.train_window_years = train_window_years
         self.test_window_months = test_window_months
+        self.max_workers = max_workers
 
-    def validate(self, df: pd.DataFrame, train_fn: Callable, predict_fn: Callable):
+    def _folds(self, dates: pd.Series) -> List[Tuple[pd.Timestamp, pd.Timestamp, int, int]]:
         """
-        Implements walk-forward validation.
+        (test start, test end, train_stop, test_stop) per non-empty test window;
+        rows are date-sorted, so each window is a contiguous slice.
         """
-        df['date'] = pd.to_datetime(df['date'])
-        df = df.sort_values('date')
-        
-        start_date = df['date'].min()
-        end_date = df['date'].max()
-        
-        current_test_start = start_date + pd.DateOffset(years=self.train_window_years)
-        
-        all_results = []
-        
-        while current_test_start < end_date:
+        folds = []
+        current_test_start = dates.iloc[0] + pd.DateOffset(years=self.train_window_years)
+        while current_test_start < dates.iloc[-1]:
             current_test_end = current_test_start + pd.DateOffset(months=self.test_window_months)
-            
-            # Train on everything before current_test_start
-            train_data = df[df['date'] < current_test_start]
-            test_data = df[(df['date'] >= current_test_start) & (df['date'] < current_test_end)]
-            
-            if not test_data.empty:
-                print(f"Validating period: {current_test_start.date()} to {current_test_end.date()}")
-                model = train_fn(train_data)
-                
-                for _, row in test_data.iterrows():
-                    pred = predict_fn(model, row)
-                    all_results.append({**pred, 'actual': row['result'], 'date': row['date']})
-            
+            # Compared as Timestamps, so tz-aware dates keep their timezone
+            train_stop, test_stop = dates.searchsorted([current_test_start, current_test_end])
+            if test_stop > train_stop:
+                folds.append((current_test_start, current_test_end, int(train_stop), int(test_stop)))
             current_test_start = current_test_end
-            
-        return pd.DataFrame(all_results)
+        return folds
+
+    def validate(self, df: pd.DataFrame, train_fn: Callable, predict_fn: Optional[Callable] = None,
+                 predict_batch_fn: Optional[Callable] = None, warm_start: bool = False):
+        """
+        Implements walk-forward validation over expanding training windows.
+
+        predict_batch_fn(model, test_df) predicts a whole test window in one call
+        (DataFrame, dict of columns or list of dicts, row for row); otherwise
+        predict_fn(model, row) is called per match.
+
+        Folds are independent, so with max_workers > 1 they run in a process pool
+        over a shared-memory copy of df (train_fn and the predict function must be
+        picklable). With warm_start, folds run in order instead and
+        train_fn(new_rows, previous_model) only gets the matches added since the
+        previous fold, e.g. for DixonColesModel.partial_fit.
+        """
+        if predict_fn is None and predict_batch_fn is None:
+            raise ValueError("predict_fn or predict_batch_fn is required")
+        df = df.assign(date=pd.to_datetime(df['date'])).sort_values('date', kind='stable').reset_index(drop=True)
+        folds = self._folds(df['date']) if len(df) else []
+        for test_start, test_end, _, _ in folds:
+            print(f"Validating period: {test_start.date()} to {test_end.date()}")
+
+        workers = min(self.max_workers or os.cpu_count() or 1, len(folds))
+        if warm_start:
+            results, model, trained_until = [], None, 0
+            for _, _, train_stop, test_stop in folds:
+                model = train_fn(df.iloc[trained_until:train_stop], model)
+                trained_until = train_stop
+                results.append(_predict_window(model, df.iloc[train_stop:test_stop], predict_fn, predict_batch_fn))
+        elif workers <= 1:
+            results = [_predict_window(train_fn(df.iloc[:train_stop]), df.iloc[train_stop:test_stop],
+                                       predict_fn, predict_batch_fn)
+                       for _, _, train_stop, test_stop in folds]
+        else:
+            blocks, spec = share_frame(df)
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(spec,)) as pool:
+                    # Largest training sets first so the slowest folds don't start last
+                    order = sorted(range(len(folds)), key=lambda i: -folds[i][2])
+                    futures = {i: pool.submit(_run_fold, train_fn, predict_fn, predict_batch_fn,
+                                              folds[i][2], folds[i][3]) for i in order}
+                    results = [futures[i].result() for i in range(len(folds))]
+            finally:
+                release_frame(blocks)
+
+        return pd.concat(results, ignore_index=True) if results else pd.DataFrame()
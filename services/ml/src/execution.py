@@ -1,6 +1,7 @@
 import json
 import time
 import numpy as np
+from .backtesting.order_book import OrderBook
 
 class LiveEVEngine:
     def __init__(self, confidence_threshold=0.75):
@@ -36,7 +37,7 @@ class LiveEVEngine:
 class ExecutionSimulator:
     def __init__(self, base_delay=5.0):
         self.base_delay = base_delay
-        # order_book_cache: {fixture_id: {selection: {price: volume}}}
+        # order_book_cache: {fixture_id: {selection: OrderBook}}
         self.order_book_cache = {}
         self.recovery_rate = 0.1 # 10% volume replenishment per second
 
@@ -45,23 +46,24 @@ class ExecutionSimulator:
             self.order_book_cache[fixture_id] = {}
 
         for sel in market_data:
-            sel_name = sel['selection']
-            if sel_name not in self.order_book_cache[fixture_id]:
-                self.order_book_cache[fixture_id][sel_name] = {}
-
             if 'depth' in sel:
-                for level in sel['depth']:
-                    self.order_book_cache[fixture_id][sel_name][level['price']] = level['volume']
+                book = self.order_book_cache[fixture_id].get(sel['selection'])
+                if book is None:
+                    book = self.order_book_cache[fixture_id][sel['selection']] = OrderBook(self.recovery_rate)
+                book.update((level['price'], level['volume']) for level in sel['depth'])
+
+    def drop_fixture(self, fixture_id: str):
+        self.order_book_cache.pop(fixture_id, None)
 
     def calculate_feasibility(self, fixture_id: str, selection: str, stake: float):
         """
         Estimates fill probability and expected slippage.
         """
-        book = self.order_book_cache.get(fixture_id, {}).get(selection, {})
+        book = self.order_book_cache.get(fixture_id, {}).get(selection)
         if not book:
             return {'fill_prob': 0.1, 'expected_slippage': 0.05}
 
-        available_volume = sum(book.values())
+        available_volume = book.available()
         if available_volume >= stake:
             return {'fill_prob': 0.95, 'expected_slippage': 0.01}
         else:
@@ -75,26 +77,10 @@ class ExecutionSimulator:
         actual_delay = self.base_delay + np.random.uniform(0, 3)
 
         # 2. Market Impact and Liquidity Consumption
-        book = self.order_book_cache.get(fixture_id, {}).get(selection, {})
+        book = self.order_book_cache.get(fixture_id, {}).get(selection)
         if book:
-            # Consume liquidity from the book
-            remaining_stake = stake
-            total_weighted_odds = 0
-
-            # Sort prices descending (best odds first)
-            sorted_prices = sorted(book.keys(), reverse=True)
-            for price in sorted_prices:
-                vol = book[price]
-                fill = min(remaining_stake, vol)
-                total_weighted_odds += fill * price
-                book[price] -= fill # Consume
-                remaining_stake -= fill
-                if remaining_stake <= 0: break
-
-            if stake > remaining_stake:
-                executed_odds = total_weighted_odds / (stake - remaining_stake)
-            else:
-                executed_odds = 0 # No fill
+            # Consume liquidity from the book, best odds first (0 if nothing fills)
+            _, executed_odds = book.fill(stake)
         else:
             # Fallback to simple slippage model
             slippage = np.random.uniform(0, 0.05)
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+def share_frame(df: pd.DataFrame) -> Tuple[List[shared_memory.SharedMemory], Dict]:
+    """
+    Copies every column into its own shared memory block, for process pools
+    that read the same frame. Datetimes travel as int64 nanoseconds (UTC for
+    tz-aware columns), nullable numeric and boolean columns as float with NaN,
+    strings and categoricals as factorized codes. Datetime and extension dtypes
+    are restored by attach_frame; extension dtypes that cannot make the round
+    trip raise TypeError.
+
+    Returns the blocks, which the caller must pass to release_frame, and a
+    picklable spec for attach_frame.
+    """
+    blocks, spec = [], {}
+    try:
+        for name in df.columns:
+            column, kind, categories, restore = df[name], 'numeric', None, None
+            if pd.api.types.is_datetime64_any_dtype(column):
+                restore = column.dtype
+                if isinstance(column.dtype, pd.DatetimeTZDtype):
+                    column = column.dt.tz_convert('UTC').dt.tz_localize(None)
+                values, kind = column.to_numpy().astype('datetime64[ns]').view(np.int64), 'datetime'
+            elif isinstance(column.dtype, pd.api.extensions.ExtensionDtype):
+                restore = column.dtype
+                if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+                    values = column.to_numpy(dtype=float, na_value=np.nan)
+                elif isinstance(column.dtype, (pd.StringDtype, pd.CategoricalDtype)):
+                    values, categories = pd.factorize(column)
+                    kind, categories = 'categorical', list(categories)
+                else:
+                    raise TypeError(f"Column {name!r} has dtype {column.dtype}, which cannot be shared")
+            else:
+                values = column.to_numpy()
+                if values.dtype == object:
+                    values, categories = pd.factorize(column)
+                    kind, categories = 'categorical', list(categories)
+            values = np.ascontiguousarray(values)
+            shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+            blocks.append(shm)
+            np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+            spec[name] = (shm.name, len(values), values.dtype.str, kind, categories, restore)
+    except Exception:
+        release_frame(blocks)
+        raise
+    return blocks, spec
+
+def attach_frame(spec: Dict, start: int = 0, stop: Optional[int] = None) -> pd.DataFrame:
+    """
+    Copies rows [start, stop) of a shared frame into this process.
+    """
+    columns = {}
+    for name, (shm_name, length, dtype, kind, categories, restore) in spec.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            values = np.ndarray((length,), dtype=np.dtype(dtype), buffer=shm.buf)[start:stop].copy()
+        finally:
+            shm.close()
+        if kind == 'datetime':
+            values = pd.Series(values.view('datetime64[ns]'))
+            if isinstance(restore, pd.DatetimeTZDtype):
+                values = values.dt.tz_localize('UTC').dt.tz_convert(restore.tz)
+        elif kind == 'categorical':
+            # Missing values are coded -1, which picks the trailing None
+            values = np.asarray(categories + [None], dtype=object)[values]
+        if restore is not None:
+            values = pd.Series(values).astype(restore)
+        columns[name] = values
+    return pd.DataFrame(columns)
+
+def release_frame(blocks: List[shared_memory.SharedMemory]):
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
@@ -1,6 +1,9 @@
+import os
 import redis
 import json
 import time
+import asyncio
+import heapq
 from .models.live_engine import LiveMatchStateEngine
 from .models.dixon_coles import DixonColesModel
 from .execution import LiveEVEngine, ExecutionSimulator
@@ -8,141 +11,804 @@ from .risk import LiveRiskManager, RegimeDetector
 from .sharp_money import SharpMoneyEngine
 from .market_intelligence import MarketIntelligenceEngine
 from .research.experimentation import ExperimentManager
+from .sharding import ConsistentHashRing, ShardCoordinator
+from .match_state import MatchStateStore, RedisSnapshotSink, FileSnapshotSink, FINISHED_STATUSES
+from .repricing import RepricingScheduler
+from prometheus_client import Histogram, start_http_server
+from typing import Dict, Optional
+
+# Metrics
+stage_latency = Histogram('ml_live_stage_seconds', 'Time spent per message in each live inference stage',
+                          ['stream', 'stage'],
+                          buckets=(1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+stream_lag = Histogram('ml_live_lag_seconds', 'Time from the source stream entry ID to handling (input streams) or publish (output streams)',
+                       ['stream'],
+                       buckets=(1e-3, 5e-3, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+
+GROUP_NAME = 'ml_service_group'
+# Stream label for coalesced re-prices, which are not tied to the message being handled
+REPRICING_LABEL = 'repricing'
+
+STAGES = ('match_state', 'repricing', 'sharp_engine', 'market_intel', 'ev_engine',
+          'regime_detector', 'risk_manager', 'execution_sim')
+
+class _Stage:
+    """
+    Reusable timing block; durations add up until the message is observed.
+    """
+    __slots__ = ('name', 'total', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.total = 0.0
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.total += time.perf_counter() - self.start
 
 class LiveInferenceService:
-    def __init__(self, redis_url: str):
-        self.redis = redis.from_url(redis_url)
+    def __init__(self, redis_url: str, batch_size: int = 500, block_ms: int = 5000,
+                 report_interval_sec: float = 10.0, worker_id: Optional[str] = None,
+                 sharded: bool = False, heartbeat_interval_sec: float = 5.0,
+                 snapshot_interval_sec: float = 30.0, snapshot_dir: Optional[str] = None,
+                 metrics_port: Optional[int] = None, redis_client=None, async_redis_client=None,
+                 experiment_manager: Optional[ExperimentManager] = None):
+        self.redis_url = redis_url
+        self.redis = redis_client or redis.from_url(redis_url)
+        # Client for run_async(), created from redis_url when not given
+        self.async_redis = async_redis_client
         self.event_stream = 'live_events'
         self.odds_stream = 'live_odds'
-        self.group_name = 'ml_service_group'
-        self.consumer_name = 'ml_consumer_1'
+        self.group_name = GROUP_NAME
+        self.consumer_name = worker_id or 'ml_consumer_1'
+        self.batch_size = batch_size
+
+        # Sharded mode: every worker reads the full streams through its own group and
+        # handles only the fixtures it owns on the consistent-hash ring, so a
+        # fixture's events and odds always meet the same in-process state
+        self.shards = None
+        if sharded:
+            self.group_name = _shard_group(self.consumer_name)
+            self.shards = ShardCoordinator(self.redis, self.consumer_name)
+        self.handoff_key = 'live_match_state_handoff'
+        # worker -> {'epoch', 'switches': [[epoch, offsets], ...], 'final'}: how far each worker
+        # had read when it last let go of fixtures, see _hand_over()
+        self.handovers_key = 'live_shard_handovers'
+        # The ring our state is complete for; fixtures that moved to us since are held
+        # back until the worker that owned them there has handed over
+        self._settled = ConsistentHashRing()
+        self._settled_epoch = 0
+        self._waiting = set()
+        # fixtureId -> offsets its previous owner had applied, for taken-over fixtures we have not read past yet
+        self._handed_from: Dict[str, Dict[str, str]] = {}
+        self._switches = []
+        self.regime_key = 'live_regime_state'
+        self.heartbeat_interval = heartbeat_interval_sec
+        self._last_heartbeat = 0.0
+        self.block_ms = block_ms
+        self._running = False
+
+        # Publishes produced while handling a batch; flushed in one pipeline with its acks
+        self._outbox = []
+        # Set while _catch_up() re-applies messages whose side effects already happened
+        self._replaying = False
+
+        # Throughput reporting
+        self.report_interval = report_interval_sec
+        self._processed = 0
+        self._last_report = time.time()
+
+        # Latency instrumentation: entry ID time of the message being handled, and of
+        # the first message waiting on each fixture's coalesced re-price
+        self.metrics_port = metrics_port
+        self._stages = {name: _Stage(name) for name in STAGES}
+        self._histograms = {}
+        self._entry_ts = time.time()
+        self._repricing_since = {}
+        # Optional callback(stream, lag_sec) with every lag observation, for replay benchmarks
+        self.lag_listener = None
 
         # Initialize models and engines
         self.pre_match_model = DixonColesModel()
         self.live_engine = LiveMatchStateEngine(self.pre_match_model)
+        # Bursts of events re-price a fixture once; unchanged prices are not republished
+        self.repricer = RepricingScheduler(self.live_engine.predict_live_probs)
         self.ev_engine = LiveEVEngine()
         self.execution_sim = ExecutionSimulator()
         self.risk_manager = LiveRiskManager()
         self.regime_detector = RegimeDetector()
         self.sharp_engine = SharpMoneyEngine()
         self.market_intel = MarketIntelligenceEngine()
-        self.experiment_manager = ExperimentManager()
+        self.experiment_manager = experiment_manager or ExperimentManager()
 
-        # Match states cache: fixtureId -> { score, elapsed, events, current_probs }
-        self.match_states = {}
+        # Bounded in-play state, snapshotted so a restart resumes where it stopped
+        self.match_states = MatchStateStore()
+        self.snapshot_dir = snapshot_dir
+        self.snapshots = self._snapshot_sink(self.consumer_name)
+        self.snapshot_interval = snapshot_interval_sec
+        self._last_snapshot = time.time()
+
+    def _snapshot_sink(self, worker_id: str):
+        if self.snapshot_dir:
+            return FileSnapshotSink(os.path.join(self.snapshot_dir, f"{worker_id}.snapshot"))
+        return RedisSnapshotSink(self.redis, f"live_match_state_snapshot:{worker_id}")
+
+    def _create_groups(self):
+        # A new shard worker starts from new messages; state for its fixtures is handed over
+        start_id = '$' if self.shards else '0'
+        for stream in (self.event_stream, self.odds_stream):
+            try:
+                self.redis.xgroup_create(stream, self.group_name, id=start_id, mkstream=True)
+            except redis.exceptions.ResponseError:
+                pass # Already exists
 
     def setup(self):
+        self._create_groups()
+        self._restore()
+        if self.shards:
+            self._maintain_shards(force=True)
+        self._catch_up()
+
+    def _restore(self):
+        raw = self.snapshots.load()
+        if not raw:
+            return
+        try:
+            self.match_states.load_bytes(raw)
+            print(f"Restored {len(self.match_states)} match states from snapshot")
+        except Exception as e:
+            print(f"Ignoring unreadable snapshot: {e}")
+
+    def _last_delivered(self, stream: str) -> Optional[str]:
+        groups = self.redis.xinfo_groups(stream)
+        group = next((g for g in groups if _decode(g['name']) == self.group_name), None)
+        return _decode(group['last-delivered-id']) if group else None
+
+    def _applied_until(self, stream: str) -> Optional[str]:
+        """
+        Upper bound for catch-up: everything the group delivered, minus pending
+        entries, which run() re-handles (and publishes) itself.
+        """
+        last = self._last_delivered(stream)
+        if last is None:
+            return None
+        pending = self.redis.xpending(stream, self.group_name)
+        if pending['pending']:
+            return '(' + _decode(pending['min'])
+        return last
+
+    def _positions(self) -> Dict[str, str]:
+        """
+        Last message id read per stream, for handoffs.
+        """
+        positions = {}
+        for stream in self._streams():
+            position = self.match_states.offsets.get(stream) or self._last_delivered(stream)
+            if position:
+                positions[stream] = position
+        return positions
+
+    def _stream_range(self, stream: str, start: Optional[str], end: Optional[str]):
+        """
+        Yields (stream, id, fields) for messages in (start, end], a page at a time.
+        """
+        while start and end:
+            messages = self.redis.xrange(stream, min='(' + start, max=end, count=self.batch_size)
+            if not messages:
+                return
+            for msg_id, data in messages:
+                yield stream, msg_id, data
+            start = _decode(messages[-1][0])
+
+    def _catch_up(self):
+        """
+        Re-applies messages acked after the snapshot was taken, merged across
+        streams by entry ID so events and odds interleave as they were first
+        handled. Their publishes and shadow runs already went out, so the
+        outbox is discarded, shadow inference is skipped and nothing is
+        recorded in the latency metrics.
+        """
+        ranges = []
+        for stream in self._streams():
+            start = self.match_states.offsets.get(stream)
+            ranges.append(self._stream_range(stream, start, self._applied_until(stream) if start else None))
+        merged = heapq.merge(*ranges, key=lambda message: _entry_key(message[1]))
+        replayed = {}
+        batch, size = [], 0
+        self._replaying = True
         try:
-            self.redis.xgroup_create(self.event_stream, self.group_name, id='0', mkstream=True)
-        except redis.exceptions.ResponseError:
-            pass # Already exists
+            for stream, msg_id, data in merged:
+                # Consecutive messages of one stream share a run, so _process_batch keeps their order
+                if batch and batch[-1][0] == stream:
+                    batch[-1][1].append((msg_id, data))
+                else:
+                    batch.append((stream, [(msg_id, data)]))
+                replayed[stream] = replayed.get(stream, 0) + 1
+                size += 1
+                if size == self.batch_size:
+                    self._process_batch([(s.encode(), messages) for s, messages in batch])
+                    self._outbox = []
+                    batch, size = [], 0
+            if batch:
+                self._process_batch([(s.encode(), messages) for s, messages in batch])
+                self._outbox = []
+        finally:
+            self._replaying = False
+            # Stage time spent replaying must not be charged to the next live message
+            for stage in self._stages.values():
+                stage.total = 0.0
+        for stream, count in replayed.items():
+            print(f"Caught up {count} messages on {stream} since snapshot")
+
+    def _maintenance_due(self) -> bool:
+        now = time.time()
+        return (now - self._last_snapshot >= self.snapshot_interval or
+                (self.shards is not None and (now - self._last_heartbeat >= self.heartbeat_interval or
+                                              bool(self._waiting))))
+
+    def _maintain(self):
+        self._maintain_shards()
+        self._maintain_store()
+
+    def _maintain_store(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._last_snapshot < self.snapshot_interval:
+            return
+        self._last_snapshot = now
+        for fixture_id in self.match_states.evict(now):
+            self.sharp_engine.drop_fixture(fixture_id)
+            self.regime_detector.drop_fixture(fixture_id)
+            self.execution_sim.drop_fixture(fixture_id)
+            self.repricer.forget(fixture_id)
+            self._repricing_since.pop(fixture_id, None)
+        self.snapshots.save(self.match_states.to_bytes())
+
+        # Regime of every open fixture in one vectorized pass, for the dashboard
+        regimes = self.regime_detector.scores(now)
+        if len(regimes):
+            self.redis.hset(self.regime_key, mapping={fid: json.dumps(row) for fid, row in
+                                                      regimes.astype(object).to_dict(orient='index').items()})
+
+    def _maintain_shards(self, force: bool = False):
+        if not self.shards:
+            return
+        now = time.time()
+        if force or now - self._last_heartbeat >= self.heartbeat_interval:
+            self._last_heartbeat = now
+            if self.shards.heartbeat():
+                self._switch_ring()
+            self._adopt_handed_over()
+        elif self._waiting:
+            # Pick fixtures up as soon as their previous owner hands over
+            self._adopt_handed_over()
+
+    def _switch_ring(self):
+        """
+        Moves to the ring of a new epoch: cleans up after expired workers, hands
+        over fixtures we lost and starts waiting for the ones we gained.
+        """
+        print(f"Shard ring changed for {self.consumer_name} (epoch {self.shards.epoch}): {self.shards.ring.nodes}")
+        # We may have been expired ourselves (e.g. a long pause) and had our groups dropped
+        self._create_groups()
+        for worker_id in self.shards.departed:
+            self._collect_departed(worker_id)
+
+        self._switches = (self._switches + [[self.shards.epoch, self._positions()]])[-8:]
+        if self.shards.joined_from is not None:
+            # (Re)joining: whatever we restored is handed over like a departed worker's
+            # snapshot, and every fixture we own now was someone else's
+            self._hand_over(list(self.match_states), overwrite=False)
+            self._settle(self.shards.joined_from, self.shards.epoch - 1)
+        else:
+            if not self._settled.nodes:
+                # Restarted before our membership expired: the restored snapshot is ours
+                self._settle(self.shards.ring.nodes, self.shards.epoch)
+            self._hand_over([f for f in self.match_states if not self.shards.owns(f)])
+        self._waiting = set(self._settled.nodes) - {self.consumer_name}
+
+    def _settle(self, nodes, epoch: int):
+        self._settled = ConsistentHashRing(nodes, vnodes=self.shards.ring.vnodes)
+        self._settled_epoch = epoch
+
+    def _collect_departed(self, worker_id: str):
+        """
+        Cleans up after a worker that expired without shutting down (crash, OOM
+        kill): its last snapshot goes to the handoff hash, where each fixture's
+        new owner adopts it and re-applies what came after the snapshot, and its
+        consumer groups are dropped.
+        """
+        sink = self._snapshot_sink(worker_id)
+        raw = sink.load()
+        store = MatchStateStore(self.match_states.event_capacity)
+        if raw:
+            try:
+                store.load_bytes(raw)
+            except Exception as e:
+                print(f"Ignoring unreadable snapshot of {worker_id}: {e}")
+        # Without a snapshot we cannot tell how far it got; resume from our own position
+        store.offsets = store.offsets or self._positions()
+        record = self.redis.hget(self.handovers_key, worker_id)
+        switches = json.loads(record)['switches'] if record else []
+
+        pipe = self.redis.pipeline(transaction=True)
+        for fixture_id in store:
+            # A handoff already in the hash is newer than the snapshot
+            pipe.hsetnx(self.handoff_key, fixture_id, store.dumps_state(fixture_id))
+        pipe.hset(self.handovers_key, worker_id, json.dumps({
+            'epoch': self.shards.epoch, 'final': True,
+            'switches': (switches + [[self.shards.epoch, store.offsets]])[-8:]}))
+        pipe.execute()
+        if len(store):
+            print(f"Handed over {len(store)} match states of departed worker {worker_id}")
+        sink.clear()
+        for stream in (self.event_stream, self.odds_stream):
+            try:
+                self.redis.xgroup_destroy(stream, _shard_group(worker_id))
+            except redis.exceptions.ResponseError:
+                pass
+
+    def _hand_over(self, fixture_ids, overwrite: bool = True, final: bool = False):
+        """
+        Publishes state for fixtures we no longer own, each with the offsets it
+        reflects, then our handover record for the current epoch. The record
+        tells new owners we have let go of everything we lost, including
+        fixtures we never had state for.
+        """
+        pipe = self.redis.pipeline(transaction=True)
+        for fixture_id in fixture_ids:
+            raw = self.match_states.dumps_state(fixture_id)
+            if overwrite:
+                pipe.hset(self.handoff_key, fixture_id, raw)
+            else:
+                pipe.hsetnx(self.handoff_key, fixture_id, raw)
+            self.match_states.pop(fixture_id)
+            self.repricer.forget(fixture_id)
+            self._repricing_since.pop(fixture_id, None)
+            self._handed_from.pop(fixture_id, None)
+        pipe.hset(self.handovers_key, self.consumer_name, json.dumps({
+            'epoch': self.shards.epoch, 'final': final, 'switches': self._switches}))
+        pipe.execute()
+
+    def _awaiting(self, fixture_id: str) -> bool:
+        return fixture_id not in self.match_states and self._settled.owner(fixture_id) in self._waiting
+
+    def _handed_over_before(self, fixture_id: str, stream: str, msg_id) -> bool:
+        since = self._handed_from.get(fixture_id)
+        return since is not None and stream in since and _entry_key(msg_id) <= _entry_key(since[stream])
+
+    def _adopt_handed_over(self):
+        """
+        Takes over fixtures whose previous owner has handed over for our epoch.
+        Handed-over state is adopted as is and only messages after its offsets
+        are applied, so none is applied twice or lost. Fixtures the previous
+        owner had no state for get every message after the point it let go.
+        """
+        offsets = self.match_states.offsets
+        for fixture_id, since in list(self._handed_from.items()):
+            if all(s in offsets and _entry_key(offsets[s]) >= _entry_key(since[s]) for s in since):
+                del self._handed_from[fixture_id]
+
+        ready = {}
+        if self._waiting:
+            workers = sorted(self._waiting)
+            for worker_id, raw in zip(workers, self.redis.hmget(self.handovers_key, workers)):
+                record = json.loads(raw) if raw else None
+                # Final records come from workers that left the ring, so no later epoch will follow
+                if record and (record['epoch'] >= self.shards.epoch or record['final']):
+                    ready[worker_id] = record
+            self._waiting -= set(ready)
+
+        adopted = {}
+        taken = []
+        for key, raw in self.redis.hgetall(self.handoff_key).items():
+            fixture_id = key.decode()
+            if not self.shards.owns(fixture_id) or self._awaiting(fixture_id):
+                continue
+            taken.append(fixture_id)
+            # State we have been handling is newer than, say, a departed worker's snapshot
+            if fixture_id in self.match_states:
+                continue
+            state, since = self.match_states.loads_state(raw)
+            self.match_states.put(fixture_id, state)
+            self._handed_from[fixture_id] = since
+            adopted.setdefault(json.dumps(since, sort_keys=True), set()).add(fixture_id)
+        if taken:
+            self.redis.hdel(self.handoff_key, *taken)
+
+        for since, fixture_ids in adopted.items():
+            self._resume(json.loads(since), fixture_ids.__contains__)
+        for worker_id, record in ready.items():
+            switches = record['switches']
+            since = next((o for epoch, o in switches if epoch > self._settled_epoch), switches[-1][1])
+            fresh = {}
+            def gained(fixture_id, worker_id=worker_id, fresh=fresh):
+                if fixture_id not in fresh:
+                    fresh[fixture_id] = (fixture_id not in self.match_states and self.shards.owns(fixture_id) and
+                                         self._settled.owner(fixture_id) == worker_id)
+                return fresh[fixture_id]
+            self._resume(since, gained)
+        if not self._waiting and self._settled_epoch != self.shards.epoch:
+            self._settle(self.shards.ring.nodes, self.shards.epoch)
+
+    def _resume(self, since: Dict[str, str], wanted):
+        """
+        Applies, in entry order, the messages of taken-over fixtures (wanted(fixtureId))
+        from after since up to where our group has read. Nobody has published
+        for them yet, so their publishes go out now.
+        """
+        ranges = [self._stream_range(stream, since.get(stream), self._applied_until(stream))
+                  for stream in self._streams()]
+        for stream, msg_id, data in heapq.merge(*ranges, key=lambda message: _entry_key(message[1])):
+            fixture_id = _decode(data[b'fixtureId'])
+            if not wanted(fixture_id):
+                continue
+            self._entry_ts = _entry_time(msg_id)
+            try:
+                if stream == self.event_stream:
+                    self._handle_event(fixture_id, data)
+                else:
+                    self._handle_odds(fixture_id, data)
+            except Exception as e:
+                print(f"Inference Error on {stream} {msg_id}: {e}")
+        for fixture_id in self.repricer.due():
+            self._reprice(fixture_id)
+        pipe = self.redis.pipeline(transaction=False)
+        published = self._queue_flush(pipe, {})
+        pipe.execute()
+        self._outbox = []
+        self._observe_published(published)
+        for stage in self._stages.values():
+            stage.total = 0.0
+
+    def stop(self):
+        """
+        Makes run()/run_async() return after the current read (at most block_ms).
+        """
+        self._running = False
+
+    def shutdown(self):
+        """
+        Scale-down: leave the ring, hand every fixture over and drop our groups.
+        Unsharded workers just write a final snapshot.
+        """
+        self.experiment_manager.close()
+        if not self.shards:
+            self._maintain_store(force=True)
+            return
+        self.shards.leave()
+        self._switches = (self._switches + [[self.shards.epoch, self._positions()]])[-8:]
+        self._hand_over(list(self.match_states), final=True)
+        # State now lives with the other workers; a stale snapshot must not come back
+        self.snapshots.clear()
+        for stream in (self.event_stream, self.odds_stream):
+            try:
+                self.redis.xgroup_destroy(stream, self.group_name)
+            except redis.exceptions.ResponseError:
+                pass
+
+    def _streams(self, last_id: str = '>'):
+        return {self.event_stream: last_id, self.odds_stream: last_id}
+
+    def _process_batch(self, streams) -> dict:
+        """
+        Handles one XREADGROUP response. Returns message ids to ack per stream;
+        publishes are queued in the outbox.
+        """
+        acks = {}
+        for stream_name, messages in streams:
+            stream = stream_name.decode()
+            for msg_id, data in messages:
+                self._entry_ts = _entry_time(msg_id)
+                start = time.perf_counter()
+                try:
+                    fixture_id = data[b'fixtureId'].decode()
+                    if self.shards and not self.shards.owns(fixture_id):
+                        pass # Another worker's fixture
+                    elif self.shards and self._awaiting(fixture_id):
+                        pass # Applied by _adopt_handed_over() once its previous owner has handed over
+                    elif self.shards and self._handed_over_before(fixture_id, stream, msg_id):
+                        pass # Already applied by the worker that handed it over
+                    elif stream == self.event_stream:
+                        self._handle_event(fixture_id, data)
+                    elif stream == self.odds_stream:
+                        self._handle_odds(fixture_id, data)
+                except Exception as e:
+                    # A malformed message would fail again on redelivery
+                    print(f"Inference Error on {stream} {msg_id}: {e}")
+                acks.setdefault(stream, []).append(msg_id)
+                if not self._replaying:
+                    self._observe(stream, time.perf_counter() - start)
+            if messages:
+                self.match_states.offsets[stream] = _decode(messages[-1][0])
+
+        for fixture_id in self.repricer.due():
+            self._reprice(fixture_id)
+        # Windows close on a timer, whichever stream's read woke us up
+        if not self._replaying:
+            self._observe(REPRICING_LABEL)
+        return acks
+
+    def _histogram(self, stream: str, stage: Optional[str] = None):
+        key = (stream, stage)
+        child = self._histograms.get(key)
+        if child is None:
+            child = self._histograms[key] = (stage_latency.labels(stream, stage) if stage
+                                             else stream_lag.labels(stream))
+        return child
+
+    def _observe(self, stream: str, handle_sec: Optional[float] = None):
+        """
+        Records the stage durations accumulated since the last call, plus total
+        handling time and entry-to-handled lag when closing out a message.
+        """
+        for stage in self._stages.values():
+            if stage.total:
+                self._histogram(stream, stage.name).observe(stage.total)
+                stage.total = 0.0
+        if handle_sec is not None:
+            self._histogram(stream, 'handle').observe(handle_sec)
+            self._observe_lag(stream, time.time() - self._entry_ts)
+
+    def _observe_published(self, published):
+        now = time.time()
+        for stream, source_ts in published:
+            self._observe_lag(stream, now - source_ts)
+
+    def _observe_lag(self, stream: str, lag: float):
+        self._histogram(stream).observe(lag)
+        if self.lag_listener:
+            self.lag_listener(stream, lag)
+
+    def _start_metrics_server(self):
+        if self.metrics_port:
+            start_http_server(self.metrics_port)
+            print(f"Serving live metrics on :{self.metrics_port}/metrics")
+
+    def _read_block_ms(self) -> int:
+        # Wake up in time for the next coalesced re-price
+        due = self.repricer.next_due()
+        if due is None:
+            return self.block_ms
+        return max(1, min(self.block_ms, int((due - time.time()) * 1000) + 1))
+
+    def _publish(self, stream: str, fields: dict, source_ts: Optional[float] = None):
+        self._outbox.append((stream, fields, self._entry_ts if source_ts is None else source_ts))
+
+    def _queue_flush(self, pipe, acks: dict):
+        """
+        Queues the outbox and acks on pipe; returns (stream, source entry time) per
+        publish. The outbox is cleared once the pipeline has executed.
+        """
+        # Publishes go first so a crash before the acks means redelivery, never loss
+        for stream, fields, _ in self._outbox:
+            pipe.xadd(stream, fields)
+        for stream, ids in acks.items():
+            pipe.xack(stream, self.group_name, *ids)
+        return [(stream, source_ts) for stream, _, source_ts in self._outbox]
+
+    def _discard_outbox(self):
+        """
+        Drops publishes that never reached Redis after a failed round trip. Their
+        fixtures forget the last published prices, so re-handling the still
+        pending messages publishes them again.
+        """
+        for stream, fields, _ in self._outbox:
+            if stream == 'live_predictions':
+                self.repricer.forget(fields['fixtureId'])
+        self._outbox = []
+
+    def _record_throughput(self, count: int):
+        self._processed += count
+        now = time.time()
+        if now - self._last_report >= self.report_interval:
+            rate = self._processed / (now - self._last_report)
+            print(f"Throughput: {rate:.1f} msg/s")
+            self._processed = 0
+            self._last_report = now
+
+    def _handle_batch(self, streams):
+        acks = self._process_batch(streams)
+        pipe = self.redis.pipeline(transaction=False)
+        published = self._queue_flush(pipe, acks)
+        pipe.execute()
+        self._outbox = []
+        self._observe_published(published)
+        self._record_throughput(sum(len(ids) for ids in acks.values()))
 
     def run(self):
         print("ML Live Inference Service running...")
-        while True:
+        self._start_metrics_server()
+        # Re-handle anything delivered to us but never acked before a restart
+        last_id = '0'
+        self._running = True
+        while self._running:
             try:
+                # A ring change since our last heartbeat applies from the next batch on
+                if self.shards and not self.shards.is_current(self.redis.get(self.shards.epoch_key)):
+                    self._maintain_shards(force=True)
+                self._maintain()
                 # Read from both streams
                 streams = self.redis.xreadgroup(self.group_name, self.consumer_name,
-                                               {self.event_stream: '>', self.odds_stream: '>'},
-                                               count=10, block=5000)
-                if not streams:
+                                               self._streams(last_id),
+                                               count=self.batch_size, block=self._read_block_ms())
+                if last_id == '0' and not any(messages for _, messages in streams or []):
+                    last_id = '>'
+                    continue
+                if not streams and not self.repricer.pending:
                     continue
 
-                for stream_name, messages in streams:
-                    for msg_id, data in messages:
-                        fixture_id = data[b'fixtureId'].decode()
-
-                        if stream_name.decode() == self.event_stream:
-                            self._handle_event(fixture_id, data)
-                        elif stream_name.decode() == self.odds_stream:
-                            self._handle_odds(fixture_id, data)
-
-                        self.redis.xack(stream_name, self.group_name, msg_id)
+                self._handle_batch(streams or [])
             except Exception as e:
                 print(f"Inference Error: {e}")
+                # Unacked messages stay pending; re-read them instead of waiting for new ones
+                self._discard_outbox()
+                last_id = '0'
                 time.sleep(1)
 
+    async def run_async(self):
+        """
+        asyncio mode: one pipelined round trip per batch for all XADDs and a single
+        multi-id XACK per stream, so Redis latency no longer caps throughput.
+        Heartbeats and snapshots still use the blocking client, in a worker
+        thread. The async client is closed on exit.
+        """
+        import redis.asyncio as aioredis
+
+        client = self.async_redis or aioredis.from_url(self.redis_url)
+        print("ML Live Inference Service running (async)...")
+        self._start_metrics_server()
+        last_id = '0'
+        self._running = True
+        try:
+            while self._running:
+                try:
+                    if self.shards and not self.shards.is_current(await client.get(self.shards.epoch_key)):
+                        await asyncio.to_thread(self._maintain_shards, True)
+                    if self._maintenance_due():
+                        await asyncio.to_thread(self._maintain)
+                    streams = await client.xreadgroup(self.group_name, self.consumer_name,
+                                                      self._streams(last_id),
+                                                      count=self.batch_size, block=self._read_block_ms())
+                    if last_id == '0' and not any(messages for _, messages in streams or []):
+                        last_id = '>'
+                        continue
+                    if not streams and not self.repricer.pending:
+                        continue
+
+                    acks = self._process_batch(streams or [])
+                    async with client.pipeline(transaction=False) as pipe:
+                        published = self._queue_flush(pipe, acks)
+                        await pipe.execute()
+                    self._outbox = []
+                    self._observe_published(published)
+                    self._record_throughput(sum(len(ids) for ids in acks.values()))
+                except Exception as e:
+                    print(f"Inference Error: {e}")
+                    self._discard_outbox()
+                    last_id = '0'
+                    await asyncio.sleep(1)
+        finally:
+            await client.aclose()
+
     def _handle_event(self, fixture_id, data):
         event_type = data[b'type'].decode()
         event_data = json.loads(data[b'data'].decode())
 
-        if fixture_id not in self.match_states:
-            self.match_states[fixture_id] = {'score': [0, 0], 'elapsed': 0, 'events': [], 'current_probs': None}
+        with self._stages['match_state']:
+            state = self.match_states.touch(fixture_id)
+            state.events.append({'type': event_type, 'data': event_data})
 
-        state = self.match_states[fixture_id]
-        state['events'].append({'type': event_type, 'data': event_data})
+            # Update elapsed time if available in event
+            if 'elapsed' in event_data:
+                state.elapsed = event_data['elapsed']
 
-        # Update elapsed time if available in event
-        if 'elapsed' in event_data:
-            state['elapsed'] = event_data['elapsed']
+            if event_type == 'GOAL':
+                state.score = event_data['score']
 
-        if event_type == 'GOAL':
-            state['score'] = event_data['score']
+            if event_data.get('status') in FINISHED_STATUSES:
+                state.finished = True
+
+        # Goals re-price at the end of this batch; other events coalesce for a short window
+        self.repricer.mark(fixture_id, urgent=event_type == 'GOAL' or state.current_probs is None)
+        self._repricing_since.setdefault(fixture_id, self._entry_ts)
+
+    def _reprice(self, fixture_id):
+        source_ts = self._repricing_since.pop(fixture_id, self._entry_ts)
+        state = self.match_states.get(fixture_id)
+        if state is None:
+            return
 
         # Re-calculate probabilities
-        probs = self.live_engine.predict_live_probs('Home', 'Away', state['score'], state['elapsed'])
-        state['current_probs'] = probs
+        with self._stages['repricing']:
+            probs = self.repricer.price('Home', 'Away', state.score, state.elapsed)
+            state.current_probs = probs
+            if not self.repricer.should_publish(fixture_id, probs):
+                return
         print(f"Updated Probs for {fixture_id}: {probs}")
 
-        # Run shadow experiments
-        self.experiment_manager.run_shadow_inference(fixture_id, {
-            'home_team': 'Home',
-            'away_team': 'Away',
-            'score': state['score'],
-            'elapsed': state['elapsed']
-        })
+        # Run shadow experiments in the background
+        if not self._replaying:
+            self.experiment_manager.submit_shadow_inference(fixture_id, {
+                'home_team': 'Home',
+                'away_team': 'Away',
+                'score': state.score,
+                'elapsed': state.elapsed
+            })
 
         # Publish to internal live_predictions stream
-        self.redis.xadd('live_predictions', {
+        self._publish('live_predictions', {
             'fixtureId': fixture_id,
             'probs': json.dumps(probs),
             'timestamp': str(time.time())
-        })
+        }, source_ts)
 
     def _handle_odds(self, fixture_id, data):
         bookmaker = data[b'bookmaker'].decode()
+        market = data[b'market'].decode() if b'market' in data else '1X2'
         market_odds = json.loads(data[b'values'].decode())
         state = self.match_states.get(fixture_id)
+        stages = self._stages
+        # Signals must not be priced off probabilities still waiting in the coalescing window
+        if self.repricer.take(fixture_id):
+            self._reprice(fixture_id)
 
         # Update order book depth if available
         if bookmaker == 'Betfair':
-            self.execution_sim.update_order_book(fixture_id, market_odds)
+            with stages['execution_sim']:
+                self.execution_sim.update_order_book(fixture_id, market_odds)
 
         # Track prices for leadership and intelligence
-        for selection_odds in market_odds:
-            sel = selection_odds['selection']
-            price = selection_odds['odds']
+        with stages['sharp_engine']:
+            for selection_odds in market_odds:
+                self.sharp_engine.add_price(fixture_id, bookmaker, selection_odds['selection'], selection_odds['odds'])
+
+        # Regime is tracked on the exchange we execute against
+        if bookmaker == 'Betfair':
+            with stages['regime_detector']:
+                for selection_odds in market_odds:
+                    self.regime_detector.update(fixture_id, selection_odds['selection'], selection_odds['odds'], market=market)
 
-            self.sharp_engine.add_price(fixture_id, bookmaker, sel, price)
-            self.market_intel.update_consensus(fixture_id, bookmaker, sel, price)
+        with stages['market_intel']:
+            for selection_odds in market_odds:
+                sel = selection_odds['selection']
+                price = selection_odds['odds']
+                self.market_intel.update_consensus(fixture_id, bookmaker, sel, price)
 
-            # Detect shading/staleness for soft books
-            if bookmaker not in ['Pinnacle', 'Betfair']:
-                intel = self.market_intel.detect_shading(fixture_id, bookmaker, sel, price)
-                if intel and intel['is_stale']:
-                    print(f"STALE LINE DETECTED: {bookmaker} {fixture_id} {sel} @ {price}")
+                # Detect shading/staleness for soft books
+                if bookmaker not in ['Pinnacle', 'Betfair']:
+                    intel = self.market_intel.detect_shading(fixture_id, bookmaker, sel, price)
+                    if intel and intel['is_stale']:
+                        print(f"STALE LINE DETECTED: {bookmaker} {fixture_id} {sel} @ {price}")
 
-        if not state or not state['current_probs']:
+        if not state or not state.current_probs:
             return
 
-        # Periodically check for sharp signals (e.g., if we see Betfair movement)
-        if bookmaker == 'Betfair':
-            for sel in ['home', 'draw', 'away']:
-                leadership = self.sharp_engine.detect_leadership(fixture_id, sel, 'Betfair', 'Pinnacle')
+        # On sharp-book movement, check it against every other book from the running lead-lag sums
+        if bookmaker in ['Pinnacle', 'Betfair']:
+            with stages['sharp_engine']:
+                leaderships = self.sharp_engine.pair_leaderships(fixture_id, leader=bookmaker)
+            for (sel, _, follower), leadership in leaderships.items():
                 if leadership and leadership['leadership_score'] > 0.7:
-                    print(f"SHARP SIGNAL: Betfair leading Pinnacle for {fixture_id} {sel}")
+                    print(f"SHARP SIGNAL: {bookmaker} leading {follower} for {fixture_id} {sel}")
 
-        ev_signals = self.ev_engine.calculate_ev(state['current_probs'], market_odds)
+        with stages['ev_engine']:
+            ev_signals = self.ev_engine.calculate_ev(state.current_probs, market_odds)
 
         for signal in ev_signals:
             if signal['ev'] > 0.05: # 5% EV threshold
                 # Risk check
-                is_unstable = self.regime_detector.is_unstable(fixture_id, signal['odds'])
+                with stages['regime_detector']:
+                    is_unstable = self.regime_detector.is_unstable(fixture_id, signal['selection'], market=market)
                 if is_unstable:
                     print(f"Risk Block: Unstable market for {fixture_id}")
                     continue
 
-                passed, reason = self.risk_manager.check_signal(fixture_id, signal, {})
+                with stages['risk_manager']:
+                    passed, reason = self.risk_manager.check_signal(fixture_id, signal, {})
                 if not passed:
                     print(f"Risk Block: {reason}")
                     continue
@@ -150,20 +816,72 @@ class LiveInferenceService:
                 print(f"LIVE EV SIGNAL: {fixture_id} {signal}")
 
                 # Simulate execution
-                exec_result = self.execution_sim.simulate_execution(
-                    fixture_id, signal['selection'], signal['odds']
-                )
+                with stages['execution_sim']:
+                    exec_result = self.execution_sim.simulate_execution(
+                        fixture_id, signal['selection'], signal['odds']
+                    )
 
                 # Publish signal and execution result
-                self.redis.xadd('live_signals', {
+                self._publish('live_signals', {
                     'fixtureId': fixture_id,
                     'signal': json.dumps(signal),
                     'execution': json.dumps(exec_result),
                     'timestamp': str(time.time())
                 })
 
-if __name__ == "__main__":
-    import os
-    service = LiveInferenceService(os.getenv('REDIS_URL', 'redis://localhost:6379'))
+def _shard_group(worker_id: str) -> str:
+    # Sharded workers each read the full streams through their own group
+    return f"{GROUP_NAME}:{worker_id}"
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+def _entry_key(msg_id):
+    # Orders entry IDs numerically, across streams
+    ms, seq = _decode(msg_id).split('-', 1)
+    return int(ms), int(seq)
+
+def _entry_time(msg_id) -> float:
+    # Stream entry IDs are <milliseconds>-<sequence>
+    return int(_decode(msg_id).split('-', 1)[0]) / 1000.0
+
+def _exit_on_sigterm(*_):
+    raise SystemExit()
+
+def _run_worker(worker_id: Optional[str] = None, metrics_port: Optional[int] = None):
+    import signal
+    service = LiveInferenceService(os.getenv('REDIS_URL', 'redis://localhost:6379'),
+                                   batch_size=int(os.getenv('LIVE_BATCH_SIZE', '500')),
+                                   worker_id=worker_id, sharded=worker_id is not None,
+                                   snapshot_dir=os.getenv('LIVE_SNAPSHOT_DIR'),
+                                   metrics_port=metrics_port)
     service.setup()
-    service.run()
+    # Hand fixtures over on scale-down (SIGTERM from the orchestrator)
+    signal.signal(signal.SIGTERM, _exit_on_sigterm)
+    try:
+        if os.getenv('LIVE_INFERENCE_MODE', 'sync') == 'async':
+            asyncio.run(service.run_async())
+        else:
+            service.run()
+    finally:
+        service.shutdown()
+
+if __name__ == "__main__":
+    import signal
+    import socket
+    import multiprocessing
+
+    # Each worker process serves its own /metrics on consecutive ports
+    metrics_port = int(os.getenv('LIVE_METRICS_PORT', '9108'))
+    if os.getenv('LIVE_SHARDED', '0') == '1':
+        # One shard worker per process; more pods add more members to the same ring
+        base_id = os.getenv('LIVE_WORKER_ID', socket.gethostname())
+        n_workers = int(os.getenv('LIVE_WORKERS', '1'))
+        workers = [multiprocessing.Process(target=_run_worker, args=(f"{base_id}-{i}", metrics_port + i)) for i in range(n_workers)]
+        for w in workers:
+            w.start()
+        signal.signal(signal.SIGTERM, lambda *_: [w.terminate() for w in workers])
+        for w in workers:
+            w.join()
+    else:
+        _run_worker(metrics_port=metrics_port)
@@ -1,9 +1,10 @@
-from fastapi import FastAPI, Response
-from pydantic import BaseModel
-from typing import List
+from fastapi import FastAPI, HTTPException, Response
+from pydantic import BaseModel, Field
+from typing import List, Literal
 import pandas as pd
 import numpy as np
 from .models.dixon_coles import DixonColesModel
+from .models.market_pricing import MarketPricingEngine
 from .features.engine import FeatureEngine
 from .ai.reasoning import ReasoningEngine
 from prometheus_client import generate_latest, CONTENT_TYPE_LATEST, Counter, Histogram
@@ -15,6 +16,7 @@ prediction_counter = Counter('ml_predictions_total', 'Total predictions made')
 inference_latency = Histogram('ml_inference_latency_seconds', 'Inference latency')
 
 model = DixonColesModel()
+market_engine = MarketPricingEngine()
 engine = FeatureEngine()
 reasoning_engine = ReasoningEngine()
 
@@ -22,6 +24,9 @@ class PredictionRequest(BaseModel):
     home_team: str
     away_team: str
 
+class BatchPredictionRequest(BaseModel):
+    fixtures: List[PredictionRequest] = Field(..., min_length=1)
+
 @app.get("/health")
 def health():
     return {"status": "ok", "service": "ml"}
@@ -31,53 +36,7 @@ def predict(request: PredictionRequest):
     prediction_counter.inc()
     probs_matrix = model.predict_probs(request.home_team, request.away_team)
 
-    # 1X2 Probs
-    home_win_prob = np.sum(np.tril(probs_matrix, -1))
-    draw_prob = np.sum(np.diag(probs_matrix))
-    away_win_prob = np.sum(np.triu(probs_matrix, 1))
-
-    # O/U 2.5 Probs
-    over_2_5_prob = 0
-    for i in range(probs_matrix.shape[0]):
-        for j in range(probs_matrix.shape[1]):
-            if i + j > 2.5:
-                over_2_5_prob += probs_matrix[i, j]
-    under_2_5_prob = 1 - over_2_5_prob
-
-    # BTTS Probs
-    btts_yes_prob = np.sum(probs_matrix[1:, 1:])
-    btts_no_prob = 1 - btts_yes_prob
-
-    # Team O/U 1.5 Probs
-    home_over_1_5_prob = np.sum(probs_matrix[2:, :])
-    home_under_1_5_prob = 1 - home_over_1_5_prob
-
-    away_over_1_5_prob = np.sum(probs_matrix[:, 2:])
-    away_under_1_5_prob = 1 - away_over_1_5_prob
-
-    markets = {
-        "1X2": {
-            "HOME": float(home_win_prob),
-            "DRAW": float(draw_prob),
-            "AWAY": float(away_win_prob)
-        },
-        "OVER_UNDER_2_5": {
-            "OVER": float(over_2_5_prob),
-            "UNDER": float(under_2_5_prob)
-        },
-        "BTTS": {
-            "YES": float(btts_yes_prob),
-            "NO": float(btts_no_prob)
-        },
-        "HOME_OVER_UNDER_1_5": {
-            "OVER": float(home_over_1_5_prob),
-            "UNDER": float(home_under_1_5_prob)
-        },
-        "AWAY_OVER_UNDER_1_5": {
-            "OVER": float(away_over_1_5_prob),
-            "UNDER": float(away_under_1_5_prob)
-        }
-    }
+    markets = market_engine.price(probs_matrix)
     
     # Feature snapshot for traceability
     features = {
@@ -92,11 +51,61 @@ def predict(request: PredictionRequest):
         "snapshot": features
     }
 
+@app.post("/predict/batch")
+def predict_batch(request: BatchPredictionRequest, format: Literal["columnar", "arrow", "json"] = "columnar"):
+    """
+    Prices a whole fixture list in one pass. The default response is columnar:
+    one list per market selection, aligned with the fixture lists. "arrow"
+    returns the same columns as an Arrow IPC stream, "json" one record per fixture.
+    """
+    home_teams = [f.home_team for f in request.fixtures]
+    away_teams = [f.away_team for f in request.fixtures]
+    prediction_counter.inc(len(home_teams))
+
+    with inference_latency.time():
+        try:
+            probs = model.predict_probs_batch(home_teams, away_teams)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=e.args[0])
+        markets = market_engine.price(probs)
+
+    if format == "json":
+        return [
+            {
+                "markets": {name: {sel: float(p[i]) for sel, p in sels.items()} for name, sels in markets.items()},
+                "snapshot": {"home_team": home_teams[i], "away_team": away_teams[i], "model_type": "Dixon-Coles"}
+            }
+            for i in range(len(home_teams))
+        ]
+
+    columns = {"home_team": home_teams, "away_team": away_teams}
+    if format == "arrow":
+        import pyarrow as pa
+        for name, sels in markets.items():
+            for sel, p in sels.items():
+                columns[f"{name}.{sel}"] = p.astype(np.float32)
+        table = pa.table(columns)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type="application/vnd.apache.arrow.stream")
+
+    return {
+        "fixtures": columns,
+        "markets": {name: {sel: p.tolist() for sel, p in sels.items()} for name, sels in markets.items()},
+        "model_type": "Dixon-Coles",
+        "timestamp": pd.Timestamp.now().isoformat()
+    }
+
 @app.post("/train")
-def train(fixtures: List[dict]):
+def train(fixtures: List[dict], incremental: bool = False):
     df = pd.DataFrame(fixtures)
-    model.fit(df)
-    return {"status": "trained", "teams_count": len(model.teams)}
+    if incremental and model.params is not None:
+        # Warm-started refit on new results only
+        model.partial_fit(df)
+    else:
+        model.fit(df)
+    return {"status": "trained", "teams_count": len(model.teams), "incremental": incremental}
 
 @app.get("/metrics")
 def metrics():
@@ -0,0 +1,189 @@
+import json
+import math
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# API-Football status codes for a completed match
+FINISHED_STATUSES = frozenset({'FT', 'AET', 'PEN'})
+
+_MAGIC = b'MST1'
+_ID_LEN = struct.Struct('<H')
+_COUNT = struct.Struct('<I')
+# home score, away score, elapsed, p(home), p(draw), p(away), last update, finished, events blob length
+_RECORD = struct.Struct('<HHfddddBI')
+
+class MatchState:
+    """
+    In-play state of one fixture. events is a ring holding only the most recent
+    events, so a long match cannot grow the record.
+    """
+    __slots__ = ('score', 'elapsed', 'events', 'current_probs', 'last_update', 'finished')
+
+    def __init__(self, event_capacity: int = 32):
+        self.score = [0, 0]
+        self.elapsed = 0
+        self.events = deque(maxlen=event_capacity)
+        self.current_probs: Optional[Dict[str, float]] = None
+        self.last_update = time.time()
+        self.finished = False
+
+class MatchStateStore:
+    """
+    Bounded fixtureId -> MatchState map. Finished fixtures are evicted after a
+    grace period and idle ones after idle_timeout_sec. offsets holds the last
+    applied message id per stream, so a snapshot says exactly where to resume.
+    """
+    def __init__(self, event_capacity: int = 32, idle_timeout_sec: float = 3 * 3600,
+                 finished_ttl_sec: float = 600):
+        self.event_capacity = event_capacity
+        self.idle_timeout = idle_timeout_sec
+        self.finished_ttl = finished_ttl_sec
+        self.offsets: Dict[str, str] = {}
+        self._states: Dict[str, MatchState] = {}
+
+    def __contains__(self, fixture_id) -> bool:
+        return fixture_id in self._states
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._states))
+
+    def get(self, fixture_id: str) -> Optional[MatchState]:
+        return self._states.get(fixture_id)
+
+    def touch(self, fixture_id: str) -> MatchState:
+        """
+        State for an incoming event, created on first sight and marked as active.
+        """
+        state = self._states.get(fixture_id)
+        if state is None:
+            state = self._states[fixture_id] = MatchState(self.event_capacity)
+        state.last_update = time.time()
+        return state
+
+    def put(self, fixture_id: str, state: MatchState):
+        self._states[fixture_id] = state
+
+    def pop(self, fixture_id: str) -> Optional[MatchState]:
+        return self._states.pop(fixture_id, None)
+
+    def evict(self, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        expired = [fid for fid, s in self._states.items()
+                   if now - s.last_update > (self.finished_ttl if s.finished else self.idle_timeout)]
+        for fid in expired:
+            del self._states[fid]
+        return expired
+
+    # Binary encoding: fixed-width struct fields plus a JSON blob for the event ring
+
+    def _pack(self, fixture_id: str, state: MatchState) -> bytes:
+        fid = fixture_id.encode()
+        events = json.dumps(list(state.events), separators=(',', ':')).encode()
+        probs = state.current_probs or {}
+        return b''.join([
+            _ID_LEN.pack(len(fid)), fid,
+            _RECORD.pack(state.score[0], state.score[1], state.elapsed,
+                         probs.get('home', math.nan), probs.get('draw', math.nan), probs.get('away', math.nan),
+                         state.last_update, state.finished, len(events)),
+            events
+        ])
+
+    def _unpack(self, buf: bytes, pos: int):
+        (n,) = _ID_LEN.unpack_from(buf, pos)
+        pos += _ID_LEN.size
+        fixture_id = buf[pos:pos + n].decode()
+        pos += n
+        home, away, elapsed, p_home, p_draw, p_away, last_update, finished, n_events = _RECORD.unpack_from(buf, pos)
+        pos += _RECORD.size
+
+        state = MatchState(self.event_capacity)
+        state.score = [home, away]
+        state.elapsed = int(elapsed) if elapsed.is_integer() else elapsed
+        if not math.isnan(p_home):
+            state.current_probs = {'home': p_home, 'draw': p_draw, 'away': p_away}
+        state.last_update = last_update
+        state.finished = bool(finished)
+        state.events.extend(json.loads(buf[pos:pos + n_events]))
+        return fixture_id, state, pos + n_events
+
+    def dumps_state(self, fixture_id: str) -> bytes:
+        """
+        One fixture's state for a handoff, with the current offsets: its next
+        owner applies only messages after them.
+        """
+        offsets = json.dumps(self.offsets).encode()
+        return zlib.compress(_COUNT.pack(len(offsets)) + offsets + self._pack(fixture_id, self._states[fixture_id]))
+
+    def loads_state(self, raw: bytes) -> Tuple[MatchState, Dict[str, str]]:
+        buf = zlib.decompress(raw)
+        (n,) = _COUNT.unpack_from(buf, 0)
+        offsets = json.loads(buf[_COUNT.size:_COUNT.size + n])
+        return self._unpack(buf, _COUNT.size + n)[1], offsets
+
+    def to_bytes(self) -> bytes:
+        offsets = json.dumps(self.offsets).encode()
+        parts = [_COUNT.pack(len(offsets)), offsets, _COUNT.pack(len(self._states))]
+        parts.extend(self._pack(fid, state) for fid, state in self._states.items())
+        return _MAGIC + zlib.compress(b''.join(parts))
+
+    def load_bytes(self, raw: bytes):
+        """
+        Replaces the store contents (states and offsets) with a to_bytes() snapshot.
+        """
+        if raw[:len(_MAGIC)] != _MAGIC:
+            raise ValueError("Not a match state snapshot")
+        buf = zlib.decompress(raw[len(_MAGIC):])
+        (n,) = _COUNT.unpack_from(buf, 0)
+        pos = _COUNT.size
+        offsets = json.loads(buf[pos:pos + n])
+        pos += n
+        (count,) = _COUNT.unpack_from(buf, pos)
+        pos += _COUNT.size
+
+        states = {}
+        for _ in range(count):
+            fixture_id, state, pos = self._unpack(buf, pos)
+            states[fixture_id] = state
+        self.offsets, self._states = offsets, states
+
+class RedisSnapshotSink:
+    def __init__(self, redis_client, key: str):
+        self.redis = redis_client
+        self.key = key
+
+    def save(self, payload: bytes):
+        self.redis.set(self.key, payload)
+
+    def load(self) -> Optional[bytes]:
+        return self.redis.get(self.key)
+
+    def clear(self):
+        self.redis.delete(self.key)
+
+class FileSnapshotSink:
+    def __init__(self, path: str):
+        self.path = path
+
+    def save(self, payload: bytes):
+        # Write-then-rename so a crash mid-write keeps the previous snapshot
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(payload)
+        os.replace(tmp, self.path)
+
+    def load(self) -> Optional[bytes]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -1,87 +1,310 @@
 import numpy as np
 import pandas as pd
 from scipy.optimize import minimize
+from scipy.special import gammaln, xlogy
 from scipy.stats import poisson
+from typing import Optional
 
 class DixonColesModel:
-    def __init__(self):
+    # Goal cap of the default scoreline matrices, pass tol to size them adaptively
+    DEFAULT_MAX_GOALS = 10
+
+    def __init__(self, xi: float = 0.0, max_history_days: Optional[int] = None):
         self.teams = []
         self.params = None
         self.team_index = {}
+        # Exponential time-decay per day (Dixon & Coles, 1997); 0 weights all matches equally
+        self.xi = xi
+        self.max_history_days = max_history_days
+        # Matches the current params were fitted on, kept for incremental refits
+        self.history = None
+        # Precomputed scoreline matrices, see precompute()
+        self._score_tensor = None
+        self._row_cache = None
+        self._cache_goals = None
+
+    def _tau(self, home_goals, away_goals, lambda_h, lambda_a, rho):
+        """
+        Array-wise Dixon-Coles low-score correction. Returns tau and its partial
+        derivatives w.r.t. log(lambda_h), log(lambda_a) and rho, divided by tau.
+        """
+        is_00 = (home_goals == 0) & (away_goals == 0)
+        is_01 = (home_goals == 0) & (away_goals == 1)
+        is_10 = (home_goals == 1) & (away_goals == 0)
+        is_11 = (home_goals == 1) & (away_goals == 1)
+
+        tau = np.ones_like(lambda_h)
+        tau = np.where(is_00, 1 - lambda_h * lambda_a * rho, tau)
+        tau = np.where(is_01, 1 + lambda_h * rho, tau)
+        tau = np.where(is_10, 1 + lambda_a * rho, tau)
+        tau = np.where(is_11, 1 - rho, tau)
+
+        # Avoid log(0); clamped entries have no gradient
+        clipped = tau < 1e-10
+        tau = np.maximum(tau, 1e-10)
+        inv_tau = np.where(clipped, 0.0, 1.0 / tau)
 
-    def _rho_correction(self, x, y, lambda_x, lambda_y, rho):
-        if x == 0 and y == 0:
-            return 1 - lambda_x * lambda_y * rho
-        elif x == 0 and y == 1:
-            return 1 + lambda_x * rho
-        elif x == 1 and y == 0:
-            return 1 + lambda_y * rho
-        elif x == 1 and y == 1:
-            return 1 - rho
-        return 1
-
-    def _log_likelihood(self, params, home_teams, away_teams, home_goals, away_goals):
+        d_eta_h = np.where(is_00, -lambda_h * lambda_a * rho, 0.0) + np.where(is_01, lambda_h * rho, 0.0)
+        d_eta_a = np.where(is_00, -lambda_h * lambda_a * rho, 0.0) + np.where(is_10, lambda_a * rho, 0.0)
+        d_rho = (np.where(is_00, -lambda_h * lambda_a, 0.0) + np.where(is_01, lambda_h, 0.0) +
+                 np.where(is_10, lambda_a, 0.0) + np.where(is_11, -1.0, 0.0))
+
+        return tau, d_eta_h * inv_tau, d_eta_a * inv_tau, d_rho * inv_tau
+
+    def _log_likelihood_and_grad(self, params, home_teams, away_teams, home_goals, away_goals, weights=None):
+        """
+        Negative log-likelihood and its exact gradient, vectorized over matches.
+        """
         nt = len(self.teams)
         attack = params[:nt]
         defense = params[nt:2*nt]
         home_adv = params[2*nt]
         rho = params[2*nt+1]
-        
-        log_l = 0
-        for i in range(len(home_goals)):
-            h_idx = home_teams[i]
-            a_idx = away_teams[i]
-            
-            lambda_h = np.exp(attack[h_idx] + defense[a_idx] + home_adv)
-            lambda_a = np.exp(attack[a_idx] + defense[h_idx])
-            
-            tau = self._rho_correction(home_goals[i], away_goals[i], lambda_h, lambda_a, rho)
-            
-            # Avoid log(0)
-            tau = max(1e-10, tau)
-            
-            log_l += np.log(tau) + poisson.logpmf(home_goals[i], lambda_h) + poisson.logpmf(away_goals[i], lambda_a)
-            
-        return -log_l
+
+        eta_h = attack[home_teams] + defense[away_teams] + home_adv
+        eta_a = attack[away_teams] + defense[home_teams]
+
+        # SLSQP line searches can probe extreme steps; let those evaluate to inf
+        with np.errstate(over='ignore', invalid='ignore'):
+            lambda_h = np.exp(eta_h)
+            lambda_a = np.exp(eta_a)
+
+            tau, dtau_h, dtau_a, dtau_rho = self._tau(home_goals, away_goals, lambda_h, lambda_a, rho)
+
+            # Poisson log-pmf via gammaln
+            log_l = (np.log(tau)
+                     + home_goals * eta_h - lambda_h - gammaln(home_goals + 1)
+                     + away_goals * eta_a - lambda_a - gammaln(away_goals + 1))
+
+        # d(log_l)/d(eta) per match, scattered back onto team parameters
+        g_h = home_goals - lambda_h + dtau_h
+        g_a = away_goals - lambda_a + dtau_a
+
+        if weights is not None:
+            log_l = weights * log_l
+            g_h = weights * g_h
+            g_a = weights * g_a
+            dtau_rho = weights * dtau_rho
+
+        grad = np.zeros_like(params, dtype=float)
+        grad[:nt] = np.bincount(home_teams, weights=g_h, minlength=nt) + np.bincount(away_teams, weights=g_a, minlength=nt)
+        grad[nt:2*nt] = np.bincount(away_teams, weights=g_h, minlength=nt) + np.bincount(home_teams, weights=g_a, minlength=nt)
+        grad[2*nt] = np.sum(g_h)
+        grad[2*nt+1] = np.sum(dtau_rho)
+
+        return -np.sum(log_l), -grad
+
+    def _log_likelihood(self, params, home_teams, away_teams, home_goals, away_goals, weights=None):
+        return self._log_likelihood_and_grad(params, home_teams, away_teams, home_goals, away_goals, weights)[0]
+
+    def _trim_history(self, df):
+        if not self.max_history_days or 'date' not in df.columns:
+            return df.reset_index(drop=True)
+        dates = pd.to_datetime(df['date'])
+        cutoff = dates.max() - pd.Timedelta(days=self.max_history_days)
+        return df[dates >= cutoff].reset_index(drop=True)
+
+    def _time_weights(self, df):
+        if not self.xi or 'date' not in df.columns:
+            return None
+        dates = pd.to_datetime(df['date'])
+        age_days = (dates.max() - dates).dt.total_seconds().values / 86400.0
+        return np.exp(-self.xi * age_days)
 
     def fit(self, df):
+        df = self._trim_history(df)
         self.teams = sorted(list(set(df['home_team'].unique()) | set(df['away_team'].unique())))
         self.team_index = {team: i for i, team in enumerate(self.teams)}
         
         nt = len(self.teams)
-        home_teams = df['home_team'].map(self.team_index).values
-        away_teams = df['away_team'].map(self.team_index).values
-        home_goals = df['home_goals'].values
-        away_goals = df['away_goals'].values
-        
         init_params = np.zeros(2 * nt + 2)
         init_params[2*nt] = 0.1 
         
-        cons = [{'type': 'eq', 'fun': lambda x: np.mean(x[:nt])}]
+        return self._optimize(df, init_params)
+
+    def partial_fit(self, df):
+        """
+        Incremental refit on newly finished matches. Warm-starts from the current
+        params, adds any newly seen (e.g. promoted) teams and refits over the
+        retained, time-decayed history.
+        """
+        if self.params is None:
+            return self.fit(df)
+
+        history = pd.concat([self.history, df], ignore_index=True) if self.history is not None else df
+        history = self._trim_history(history)
+
+        old_nt = len(self.teams)
+        seen = set(history['home_team'].unique()) | set(history['away_team'].unique())
+        for team in sorted(seen - set(self.team_index)):
+            self.team_index[team] = len(self.teams)
+            self.teams.append(team)
+
+        # New teams start at the league average (0 on the log scale)
+        nt = len(self.teams)
+        init_params = np.zeros(2 * nt + 2)
+        init_params[:old_nt] = self.params[:old_nt]
+        init_params[nt:nt+old_nt] = self.params[old_nt:2*old_nt]
+        init_params[2*nt:] = self.params[2*old_nt:]
+        init_params[:nt] -= np.mean(init_params[:nt])
+
+        return self._optimize(history, init_params)
+
+    def _match_arrays(self, df):
+        home_teams = df['home_team'].map(self.team_index).values.astype(np.int64)
+        away_teams = df['away_team'].map(self.team_index).values.astype(np.int64)
+        home_goals = df['home_goals'].values.astype(float)
+        away_goals = df['away_goals'].values.astype(float)
+        # Optimize the weighted mean log-likelihood: the gradient stays O(1)
+        # regardless of sample size, so the first solver steps do not overshoot
+        weights = self._time_weights(df)
+        if weights is None:
+            weights = np.ones(len(df))
+        weights = weights / np.sum(weights)
+        return home_teams, away_teams, home_goals, away_goals, weights
+
+    def _set_params(self, params, df):
+        self.params = params
+        self._score_tensor = None
+        self._row_cache = None
+        self._cache_goals = None
+        self.history = df[[c for c in ['id', 'home_team', 'away_team', 'home_goals', 'away_goals', 'date'] if c in df.columns]]
+
+    def _optimize(self, df, init_params):
+        nt = len(self.teams)
+        args = self._match_arrays(df)
+        
+        cons_jac = np.zeros(2 * nt + 2)
+        cons_jac[:nt] = 1.0 / nt
+        cons = [{'type': 'eq', 'fun': lambda x: np.mean(x[:nt]), 'jac': lambda x: cons_jac}]
         
-        res = minimize(self._log_likelihood, init_params, args=(home_teams, away_teams, home_goals, away_goals),
-                       constraints=cons, method='SLSQP')
+        # Keep rho in a range where tau stays a valid correction; with an exact
+        # gradient SLSQP will otherwise follow the clamp in _tau off to infinity
+        bounds = [(None, None)] * (2 * nt + 1) + [(-1.0, 1.0)]
+
+        res = minimize(self._log_likelihood_and_grad, init_params, args=args,
+                       jac=True, bounds=bounds, constraints=cons, method='SLSQP',
+                       options={'ftol': 1e-9, 'maxiter': 500})
         
-        self.params = res.x
+        self._set_params(res.x, df)
         return res
 
-    def predict_probs(self, home_team, away_team, max_goals=10):
-        h_idx = self.team_index[home_team]
-        a_idx = self.team_index[away_team]
+    def _unpack(self):
         nt = len(self.teams)
-        
-        attack = self.params[:nt]
-        defense = self.params[nt:2*nt]
-        home_adv = self.params[2*nt]
-        rho = self.params[2*nt+1]
-        
+        return self.params[:nt], self.params[nt:2*nt], self.params[2*nt], self.params[2*nt+1]
+
+    def expected_goals(self, h_idx, a_idx):
+        """
+        Home and away scoring rates for team indices (scalars or arrays).
+        """
+        attack, defense, home_adv, _ = self._unpack()
         lambda_h = np.exp(attack[h_idx] + defense[a_idx] + home_adv)
         lambda_a = np.exp(attack[a_idx] + defense[h_idx])
-        
-        probs = np.zeros((max_goals + 1, max_goals + 1))
-        for x in range(max_goals + 1):
-            for y in range(max_goals + 1):
-                tau = self._rho_correction(x, y, lambda_h, lambda_a, rho)
-                probs[x, y] = max(0, tau) * poisson.pmf(x, lambda_h) * poisson.pmf(y, lambda_a)
-                
-        return probs / np.sum(probs)
+        return lambda_h, lambda_a
+
+    @classmethod
+    def goals_for_tolerance(cls, max_lambda, tol=None):
+        """
+        Smallest goal cap whose truncated Poisson tail stays below tol. Without
+        a tol the fixed DEFAULT_MAX_GOALS cap (11x11 matrices) is kept.
+        """
+        if tol is None:
+            return cls.DEFAULT_MAX_GOALS
+        return max(2, int(poisson.ppf(1 - tol, np.max(max_lambda))))
+
+    @staticmethod
+    def score_matrices(lambda_h, lambda_a, rho, max_goals):
+        """
+        Scoreline matrices for arrays of rates, shape lambda.shape + (G+1, G+1).
+        Built as outer products of Poisson pmfs; the Dixon-Coles correction only
+        touches the 2x2 low-score corner.
+        """
+        lambda_h = np.asarray(lambda_h, dtype=float)[..., None]
+        lambda_a = np.asarray(lambda_a, dtype=float)[..., None]
+        goals = np.arange(max_goals + 1)
+        log_fact = gammaln(goals + 1)
+        pmf_h = np.exp(xlogy(goals, lambda_h) - lambda_h - log_fact)
+        pmf_a = np.exp(xlogy(goals, lambda_a) - lambda_a - log_fact)
+
+        probs = pmf_h[..., :, None] * pmf_a[..., None, :]
+
+        lh, la = lambda_h[..., 0], lambda_a[..., 0]
+        probs[..., 0, 0] *= np.maximum(0, 1 - lh * la * rho)
+        probs[..., 0, 1] *= np.maximum(0, 1 + lh * rho)
+        probs[..., 1, 0] *= np.maximum(0, 1 + la * rho)
+        probs[..., 1, 1] *= max(0, 1 - rho)
+
+        return probs / probs.sum(axis=(-2, -1), keepdims=True)
+
+    def precompute(self, max_goals=None, tol=None, lazy=False):
+        """
+        Caches scoreline matrices for every (home, away) pair after fit so serving
+        a fixture is an array lookup. The full (teams x teams x goals x goals)
+        float32 tensor is built eagerly; with lazy=True rows are built per home
+        team on first use instead, which suits very large team sets.
+        """
+        nt = len(self.teams)
+        attack, defense, home_adv, rho = self._unpack()
+        lambda_h = np.exp(attack[:, None] + defense[None, :] + home_adv)
+        lambda_a = np.exp(attack[None, :] + defense[:, None])
+
+        self._cache_goals = max_goals or self.goals_for_tolerance(np.maximum(lambda_h, lambda_a), tol)
+        if lazy:
+            self._score_tensor = None
+            self._row_cache = {}
+        else:
+            self._score_tensor = self.score_matrices(lambda_h, lambda_a, rho, self._cache_goals).astype(np.float32)
+            self._row_cache = None
+        return self._cache_goals
+
+    def _cached_row(self, h_idx):
+        row = self._row_cache.get(h_idx)
+        if row is None:
+            a_idx = np.arange(len(self.teams))
+            lambda_h, lambda_a = self.expected_goals(h_idx, a_idx)
+            row = self.score_matrices(lambda_h, lambda_a, self.params[-1], self._cache_goals).astype(np.float32)
+            self._row_cache[h_idx] = row
+        return row
+
+    def predict_probs(self, home_team, away_team, max_goals=None, tol=None):
+        h_idx = self.team_index[home_team]
+        a_idx = self.team_index[away_team]
+
+        if max_goals is None or max_goals == self._cache_goals:
+            if self._score_tensor is not None:
+                return self._score_tensor[h_idx, a_idx]
+            if self._row_cache is not None:
+                return self._cached_row(h_idx)[a_idx]
+
+        lambda_h, lambda_a = self.expected_goals(h_idx, a_idx)
+        if max_goals is None:
+            max_goals = self.goals_for_tolerance(max(lambda_h, lambda_a), tol)
+
+        return self.score_matrices(lambda_h, lambda_a, self.params[-1], max_goals)
+
+    def predict_probs_batch(self, home_teams, away_teams, max_goals=None, tol=None):
+        """
+        Stacked scoreline matrices (n_fixtures, G+1, G+1) for lists of team names,
+        sharing one goal cap so markets can be derived for all fixtures at once.
+        """
+        teams = pd.Index(self.teams)
+        h_idx = teams.get_indexer(home_teams)
+        a_idx = teams.get_indexer(away_teams)
+        if (h_idx < 0).any() or (a_idx < 0).any():
+            unknown = set(np.asarray(home_teams)[h_idx < 0]) | set(np.asarray(away_teams)[a_idx < 0])
+            raise KeyError(f"Unknown teams: {sorted(str(t) for t in unknown)}")
+        if len(h_idx) == 0:
+            goals = max_goals or self._cache_goals or self.goals_for_tolerance(0.0, tol)
+            return np.zeros((0, goals + 1, goals + 1))
+
+        if max_goals is None or max_goals == self._cache_goals:
+            if self._score_tensor is not None:
+                return self._score_tensor[h_idx, a_idx]
+            if self._row_cache is not None:
+                return np.stack([self._cached_row(h)[a] for h, a in zip(h_idx, a_idx)])
+
+        lambda_h, lambda_a = self.expected_goals(h_idx, a_idx)
+        if max_goals is None:
+            max_goals = self.goals_for_tolerance(np.maximum(lambda_h, lambda_a), tol)
+
+        return self.score_matrices(lambda_h, lambda_a, self.params[-1], max_goals)
@@ -1,10 +1,14 @@
 import xgboost as xgb
 import pandas as pd
 import numpy as np
-from typing import List, Dict
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Dict, Optional, Union
 
 class GBMModel:
-    def __init__(self, params: Dict = None):
+    def __init__(self, params: Dict = None, nthread: Optional[int] = None):
         self.params = params or {
             'objective': 'multi:softprob',
             'num_class': 3,
@@ -16,17 +20,94 @@ class GBMModel:
         }
         self.model = None
         self.features = []
+        self.nthread = nthread
 
     def fit(self, X: pd.DataFrame, y: pd.Series):
         self.features = X.columns.tolist()
         dtrain = xgb.DMatrix(X, label=y)
-        self.model = xgb.train(self.params, dtrain, num_boost_round=100)
+        params = dict(self.params)
+        if self.nthread:
+            params['nthread'] = self.nthread
+        self.model = xgb.train(params, dtrain, num_boost_round=100)
 
-    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
-        dtest = xgb.DMatrix(X[self.features])
-        return self.model.predict(dtest)
+    def set_threads(self, nthread: int):
+        """
+        Serving thread count; 1 is usually best for single-row in-play scoring.
+        """
+        self.nthread = nthread
+        if self.model is not None:
+            self.model.set_param({'nthread': nthread})
+
+    def _as_matrix(self, X: Union[pd.DataFrame, np.ndarray, Dict]) -> np.ndarray:
+        """
+        Contiguous float32 rows in training feature order. NumPy input is assumed
+        to be ordered already; dicts are treated as a single row.
+        """
+        if isinstance(X, pd.DataFrame):
+            return X[self.features].to_numpy(dtype=np.float32)
+        if isinstance(X, dict):
+            return np.fromiter((X[f] for f in self.features), dtype=np.float32, count=len(self.features))[None, :]
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        return X[None, :] if X.ndim == 1 else X
+
+    def predict_proba(self, X: Union[pd.DataFrame, np.ndarray, Dict]) -> np.ndarray:
+        # In-place prediction skips DMatrix construction
+        return self.model.inplace_predict(self._as_matrix(X))
 
     def get_feature_importance(self) -> Dict:
         if self.model:
             return self.model.get_score(importance_type='gain')
         return {}
+
+class GBMMicroBatcher:
+    """
+    Gathers concurrent single-row requests into one booster call. A request waits
+    at most max_wait_ms for others to join before the batch is scored.
+    """
+    def __init__(self, model: GBMModel, max_batch: int = 256, max_wait_ms: float = 2.0):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def submit(self, row: Union[Dict, np.ndarray]) -> Future:
+        future = Future()
+        self._queue.put((self.model._as_matrix(row)[0], future))
+        return future
+
+    def predict(self, row: Union[Dict, np.ndarray]) -> np.ndarray:
+        return self.submit(row).result()
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            try:
+                while len(batch) < self.max_batch:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                    if item is None:
+                        self._score(batch)
+                        return
+                    batch.append(item)
+            except queue.Empty:
+                pass
+            self._score(batch)
+
+    def _score(self, batch: List):
+        rows, futures = zip(*batch)
+        try:
+            probs = self.model.predict_proba(np.stack(rows))
+            for future, p in zip(futures, probs):
+                future.set_result(p)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
@@ -1,14 +1,17 @@
 import numpy as np
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence
 import pandas as pd
 from .dixon_coles import DixonColesModel
+from .market_pricing import MarketPricingEngine
 
 class LiveMatchStateEngine:
-    def __init__(self, pre_match_model: DixonColesModel):
+    def __init__(self, pre_match_model: DixonColesModel, tables: Optional["LiveOutcomeTables"] = None):
         self.pre_match_model = pre_match_model
         # Bayesian priors for goal intensity
         self.alpha_correction = 1.0
         self.beta_correction = 1.0
+        # Built on first lookup
+        self.tables = tables or LiveOutcomeTables()
 
     def update_state(self, current_score: List[int], elapsed_minutes: float, events: List[Dict]):
         """
@@ -48,52 +51,113 @@ class LiveMatchStateEngine:
 
         return 1.0 + min(0.5, score)
 
-    def predict_live_probs(self, home_team: str, away_team: str,
-                           current_score: List[int], elapsed_minutes: float):
+    def _remaining_intensity(self, home_team: str, away_team: str, elapsed_minutes: float):
         # Remaining expected goals based on Dixon-Coles parameters
         # lambda_h = alpha_h * beta_a * rho
         # lambda_a = alpha_a * beta_h
-
-        # Get pre-match parameters
-        # For now, let's assume we have them or use a fallback
-        lambda_h = 1.35 # Mock
-        lambda_a = 1.10 # Mock
+        model = self.pre_match_model
+        if (model is not None and model.params is not None and
+                home_team in model.team_index and away_team in model.team_index):
+            lambda_h, lambda_a = model.expected_goals(model.team_index[home_team], model.team_index[away_team])
+        else:
+            lambda_h = 1.35 # Mock
+            lambda_a = 1.10 # Mock
 
         remaining_ratio = max(0, (95 - elapsed_minutes) / 90.0)
 
         # Adjusted lambdas for remaining time
-        adj_lambda_h = lambda_h * remaining_ratio
-        adj_lambda_a = lambda_a * remaining_ratio
-
-        # Poisson probabilities for remaining goals
-        from scipy.stats import poisson
-
-        max_goals = 10
-        h_probs = [poisson.pmf(i, adj_lambda_h) for i in range(max_goals)]
-        a_probs = [poisson.pmf(i, adj_lambda_a) for i in range(max_goals)]
-
-        # Joint probability matrix for remaining goals
-        prob_matrix = np.outer(h_probs, a_probs)
+        return lambda_h * remaining_ratio, lambda_a * remaining_ratio
 
-        # Final match outcome probabilities given current score
-        home_win = 0.0
-        draw = 0.0
-        away_win = 0.0
-
-        for i in range(max_goals):
-            for j in range(max_goals):
-                final_h = current_score[0] + i
-                final_a = current_score[1] + j
-
-                if final_h > final_a:
-                    home_win += prob_matrix[i, j]
-                elif final_h == final_a:
-                    draw += prob_matrix[i, j]
-                else:
-                    away_win += prob_matrix[i, j]
+    def predict_live_markets(self, home_team: str, away_team: str,
+                             current_score: List[int], elapsed_minutes: float) -> Dict:
+        adj_lambda_h, adj_lambda_a = self._remaining_intensity(home_team, away_team, elapsed_minutes)
+        return self.tables.lookup(adj_lambda_h, adj_lambda_a, current_score)
 
+    def predict_live_probs(self, home_team: str, away_team: str,
+                           current_score: List[int], elapsed_minutes: float):
+        markets = self.predict_live_markets(home_team, away_team, current_score, elapsed_minutes)
         return {
-            "home": home_win,
-            "draw": draw,
-            "away": away_win
+            "home": markets["1X2"]["HOME"],
+            "draw": markets["1X2"]["DRAW"],
+            "away": markets["1X2"]["AWAY"]
         }
+
+class LiveOutcomeTables:
+    """
+    In-play outcome probabilities precomputed on a grid of remaining goal
+    intensities (lambda_h, lambda_a) and current goal difference, so an update is
+    a few array reads, interpolated bilinearly. Accuracy is bounded by lambda_step.
+    """
+    def __init__(self, max_lambda: float = 4.0, lambda_step: float = 0.025, max_goals: int = 15,
+                 max_diff: int = 8, total_lines: Sequence[float] = (0.5, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5)):
+        self.max_lambda = max_lambda
+        self.lambda_step = lambda_step
+        self.max_goals = max_goals
+        self.max_diff = min(max_diff, max_goals - 1)
+        self.total_lines = np.asarray(total_lines, dtype=float)
+        # outcomes[i, j, d + max_diff] = (home, draw, away) given current diff d
+        self.outcomes = None
+        # total_tail[i, j, k] = P(remaining goals > k)
+        self.total_tail = None
+
+    def build(self, market_engine: Optional[MarketPricingEngine] = None, chunk_size: int = 16):
+        market_engine = market_engine or MarketPricingEngine()
+        grid = np.arange(0, self.max_lambda + self.lambda_step / 2, self.lambda_step)
+        n = len(grid)
+        g = self.max_goals
+        diffs = np.arange(-self.max_diff, self.max_diff + 1)
+        max_total = int(np.floor(self.total_lines.max()))
+
+        self.outcomes = np.empty((n, n, len(diffs), 3), dtype=np.float32)
+        self.total_tail = np.empty((n, n, max_total + 1), dtype=np.float32)
+
+        for start in range(0, n, chunk_size):
+            rows = slice(start, start + chunk_size)
+            probs = DixonColesModel.score_matrices(grid[rows, None], grid[None, :], 0.0, g)
+            diff_dist, total_dist = market_engine.distributions(probs)
+            diff_cdf = np.cumsum(diff_dist, axis=-1)
+
+            # Home wins when current diff d plus remaining diff is positive
+            idx = g - diffs
+            self.outcomes[rows, :, :, 0] = 1.0 - diff_cdf[..., idx]
+            self.outcomes[rows, :, :, 1] = diff_dist[..., idx]
+            self.outcomes[rows, :, :, 2] = diff_cdf[..., idx - 1]
+            self.total_tail[rows] = 1.0 - np.cumsum(total_dist, axis=-1)[..., :max_total + 1]
+        return self
+
+    def lookup(self, lambda_h: float, lambda_a: float, current_score: List[int]) -> Dict:
+        if self.outcomes is None:
+            self.build()
+
+        # Bilinear interpolation between the four surrounding grid points
+        last = self.outcomes.shape[0] - 1
+        x = min(lambda_h / self.lambda_step, last)
+        y = min(lambda_a / self.lambda_step, last)
+        i, j = min(int(x), last - 1), min(int(y), last - 1)
+        fx, fy = x - i, y - j
+        w00, w01, w10, w11 = (1 - fx) * (1 - fy), (1 - fx) * fy, fx * (1 - fy), fx * fy
+
+        def interpolate(table, *index):
+            return (w00 * table[(i, j) + index] + w01 * table[(i, j + 1) + index] +
+                    w10 * table[(i + 1, j) + index] + w11 * table[(i + 1, j + 1) + index])
+
+        h, a = int(current_score[0]), int(current_score[1])
+        d = min(max(h - a, -self.max_diff), self.max_diff)
+
+        home, draw, away = interpolate(self.outcomes, d + self.max_diff)
+        markets = {"1X2": {"HOME": float(home), "DRAW": float(draw), "AWAY": float(away)}}
+
+        # Over the line once remaining goals exceed line - current total
+        needed = np.floor(self.total_lines - (h + a)).astype(int)
+        tail = interpolate(self.total_tail)
+        overs = np.where(needed < 0, 1.0, tail[np.maximum(needed, 0)])
+        for line, over in zip(self.total_lines, overs):
+            key = MarketPricingEngine.line_key(line)
+            markets[f"OVER_UNDER_{key}"] = {"OVER": float(over), "UNDER": float(1.0 - over)}
+
+        # Remaining goals are independent Poisson, so BTTS is closed-form
+        home_scores = 1.0 if h > 0 else 1.0 - np.exp(-lambda_h)
+        away_scores = 1.0 if a > 0 else 1.0 - np.exp(-lambda_a)
+        btts = float(home_scores * away_scores)
+        markets["BTTS"] = {"YES": btts, "NO": 1.0 - btts}
+        return markets
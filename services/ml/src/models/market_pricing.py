@@ -0,0 +1,156 @@
+import numpy as np
+from typing import Dict, Sequence, Tuple
+
+class MarketPricingEngine:
+    """
+    Derives every market we price from a scoreline matrix in one vectorized pass.
+    Accepts a single (G+1, G+1) matrix or a stack of shape (..., G+1, G+1); market
+    values are floats for a single matrix and arrays over the leading axes otherwise.
+    """
+    def __init__(self,
+                 total_lines: Sequence[float] = (0.5, 1.5, 2.5, 3.5, 4.5, 5.5, 6.5),
+                 team_total_lines: Sequence[float] = (0.5, 1.5, 2.5, 3.5),
+                 handicap_lines: Sequence[float] = tuple(np.arange(-3.0, 3.25, 0.25)),
+                 correct_score_max: int = 5,
+                 margin_max: int = 3):
+        self.total_lines = np.asarray(total_lines, dtype=float)
+        self.team_total_lines = np.asarray(team_total_lines, dtype=float)
+        self.handicap_lines = np.asarray(handicap_lines, dtype=float)
+        self.correct_score_max = correct_score_max
+        self.margin_max = margin_max
+        # Index layouts per matrix size: {size: (diff_onehot, total_onehot)}
+        self._layouts = {}
+
+    @staticmethod
+    def line_key(line: float, signed: bool = False) -> str:
+        text = f"{line:+g}" if signed else f"{line:g}"
+        return text.replace('.', '_')
+
+    def _layout(self, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One-hot maps from flattened scorelines to goal difference (index i - j + G)
+        and total goals (index i + j), so both distributions are a single matmul.
+        """
+        if size not in self._layouts:
+            g = size - 1
+            i, j = np.indices((size, size))
+            diff = np.zeros((size * size, 2 * g + 1))
+            diff[np.arange(size * size), (i - j + g).ravel()] = 1
+            total = np.zeros((size * size, 2 * g + 1))
+            total[np.arange(size * size), (i + j).ravel()] = 1
+            self._layouts[size] = (diff, total)
+        return self._layouts[size]
+
+    def distributions(self, probs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Goal difference distribution (index k -> home - away = k - G) and total
+        goals distribution (index k -> k goals) of square scoreline matrices.
+        """
+        size = probs.shape[-1]
+        diff_map, total_map = self._layout(size)
+        flat = probs.reshape(probs.shape[:-2] + (size * size,))
+        return flat @ diff_map, flat @ total_map
+
+    @staticmethod
+    def _tail_above(cdf: np.ndarray, lines: np.ndarray) -> np.ndarray:
+        """
+        P(X > line) for half-integer lines, given cdf[..., k] = P(X <= k).
+        """
+        idx = np.clip(np.floor(lines).astype(int), -1, cdf.shape[-1] - 1)
+        below = np.where(idx >= 0, cdf[..., np.maximum(idx, 0)], 0.0)
+        return 1.0 - below
+
+    def _handicap(self, diff_cdf: np.ndarray, g: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Push-adjusted home/away probabilities for Asian handicap lines (home handicap).
+        Quarter lines split the stake over the two neighbouring lines, so the fair
+        price is 1 + L / W with W, L the average win/loss probabilities of the halves.
+        """
+        halves = np.stack([self.handicap_lines - 0.25, self.handicap_lines + 0.25], axis=-1)
+        is_quarter = np.isclose(np.mod(self.handicap_lines, 0.5), 0.25)
+        halves = np.where(is_quarter[:, None], halves, self.handicap_lines[:, None])
+
+        # Home wins when diff + h > 0, loses when diff + h < 0
+        win_below = np.floor(-halves).astype(int)         # diff <= this -> not a win
+        lose_below = np.ceil(-halves).astype(int) - 1     # diff <= this -> a loss
+
+        def cdf_at(k):
+            idx = np.clip(k + g, -1, diff_cdf.shape[-1] - 1)
+            return np.where(idx >= 0, diff_cdf[..., np.maximum(idx, 0)], 0.0)
+
+        win = (1.0 - cdf_at(win_below)).mean(axis=-1)
+        lose = cdf_at(lose_below).mean(axis=-1)
+        decided = np.maximum(win + lose, 1e-12)
+        return win / decided, lose / decided
+
+    def price(self, probs: np.ndarray, current_score: Sequence[int] = (0, 0)) -> Dict[str, Dict]:
+        """
+        probs: scoreline matrix (or stack of them) over goals still to be scored.
+        current_score: goals already scored, so in-play matrices price final-score markets.
+        """
+        probs = np.asarray(probs, dtype=float)
+        h0, a0 = int(current_score[0]), int(current_score[1])
+        if h0 or a0:
+            pad = [(0, 0)] * (probs.ndim - 2) + [(h0, 0), (a0, 0)]
+            probs = np.pad(probs, pad)
+        # Square matrices keep difference and total indices symmetric
+        if probs.shape[-1] != probs.shape[-2]:
+            n = max(probs.shape[-2:])
+            pad = [(0, 0)] * (probs.ndim - 2) + [(0, n - probs.shape[-2]), (0, n - probs.shape[-1])]
+            probs = np.pad(probs, pad)
+
+        size = probs.shape[-1]
+        g = size - 1
+        lead = probs.shape[:-2]
+        diff_dist, total_dist = self.distributions(probs)
+        total_cdf = np.cumsum(total_dist, axis=-1)
+        diff_cdf = np.cumsum(diff_dist, axis=-1)
+        home_cdf = np.cumsum(probs.sum(axis=-1), axis=-1)
+        away_cdf = np.cumsum(probs.sum(axis=-2), axis=-1)
+
+        home_win = 1.0 - diff_cdf[..., g]
+        draw = diff_dist[..., g]
+        away_win = diff_cdf[..., g - 1]
+
+        overs = self._tail_above(total_cdf, self.total_lines)
+        home_overs = self._tail_above(home_cdf, self.team_total_lines)
+        away_overs = self._tail_above(away_cdf, self.team_total_lines)
+        btts = 1.0 - probs[..., 0, :].sum(axis=-1) - probs[..., :, 0].sum(axis=-1) + probs[..., 0, 0]
+        ah_home, ah_away = self._handicap(diff_cdf, g)
+
+        markets = {
+            "1X2": {"HOME": home_win, "DRAW": draw, "AWAY": away_win},
+            "DOUBLE_CHANCE": {"1X": home_win + draw, "X2": draw + away_win, "12": home_win + away_win},
+            "BTTS": {"YES": btts, "NO": 1.0 - btts},
+        }
+
+        for k, line in enumerate(self.total_lines):
+            markets[f"OVER_UNDER_{self.line_key(line)}"] = {"OVER": overs[..., k], "UNDER": 1.0 - overs[..., k]}
+
+        for k, line in enumerate(self.team_total_lines):
+            key = self.line_key(line)
+            markets[f"HOME_OVER_UNDER_{key}"] = {"OVER": home_overs[..., k], "UNDER": 1.0 - home_overs[..., k]}
+            markets[f"AWAY_OVER_UNDER_{key}"] = {"OVER": away_overs[..., k], "UNDER": 1.0 - away_overs[..., k]}
+
+        for k, line in enumerate(self.handicap_lines):
+            markets[f"ASIAN_HANDICAP_{self.line_key(line, signed=True)}"] = {"HOME": ah_home[..., k], "AWAY": ah_away[..., k]}
+
+        # Winning margin: exact margins up to margin_max, the rest bucketed
+        m = min(self.margin_max, g)
+        margin = {"DRAW": draw}
+        for k in range(1, m):
+            margin[f"HOME_{k}"] = diff_dist[..., g + k]
+            margin[f"AWAY_{k}"] = diff_dist[..., g - k]
+        margin[f"HOME_{m}+"] = 1.0 - diff_cdf[..., g + m - 1]
+        margin[f"AWAY_{m}+"] = diff_cdf[..., g - m]
+        markets["WINNING_MARGIN"] = margin
+
+        c = min(self.correct_score_max, g)
+        shown = probs[..., :c + 1, :c + 1]
+        correct_score = {f"{i}-{j}": shown[..., i, j] for i in range(h0, c + 1) for j in range(a0, c + 1)}
+        correct_score["OTHER"] = 1.0 - shown.sum(axis=(-2, -1))
+        markets["CORRECT_SCORE"] = correct_score
+
+        if not lead:
+            markets = {name: {sel: float(p) for sel, p in sels.items()} for name, sels in markets.items()}
+        return markets
@@ -0,0 +1,142 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+from .dixon_coles import DixonColesModel
+from ..infrastructure.shared_frame import share_frame, attach_frame, release_frame
+
+# Columns shipped to workers through shared memory; id stays in the model
+# history so retrains can tell which fixtures are new
+_SHARED_COLUMNS = ['id', 'home_team', 'away_team', 'home_goals', 'away_goals', 'date']
+
+def _fit_league(model: DixonColesModel, spec: Dict, start: int, stop: int, incremental: bool) -> DixonColesModel:
+    """
+    Process-pool entry point: copies one league's fixtures out of shared memory and fits its model.
+    """
+    df = attach_frame(spec, start, stop)
+    if incremental:
+        model.partial_fit(df)
+    else:
+        model.fit(df)
+    return model
+
+class MultiLeagueDixonColesModel:
+    """
+    Independent Dixon-Coles models per competition, fitted in parallel across a
+    process pool. predict_probs routes each fixture to the league both teams play in.
+    """
+    def __init__(self, league_column: str = 'leagueId', xi: float = 0.0,
+                 max_history_days: Optional[int] = None, max_workers: Optional[int] = None):
+        self.league_column = league_column
+        self.xi = xi
+        self.max_history_days = max_history_days
+        self.max_workers = max_workers
+        self.models: Dict[str, DixonColesModel] = {}
+        # team -> leagues it has been fitted in, largest league first
+        self.team_leagues: Dict[str, List[str]] = {}
+
+    @property
+    def teams(self) -> List[str]:
+        return sorted(self.team_leagues)
+
+    @property
+    def history(self) -> Optional[pd.DataFrame]:
+        histories = [m.history.assign(**{self.league_column: league})
+                     for league, m in self.models.items() if m.history is not None]
+        return pd.concat(histories, ignore_index=True) if histories else None
+
+    def fit(self, df: pd.DataFrame):
+        self.models = {}
+        return self._fit_partitions(df, incremental=False)
+
+    def partial_fit(self, df: pd.DataFrame):
+        """
+        Warm-started refit of every league with new matches; unseen leagues get a full fit.
+        """
+        return self._fit_partitions(df, incremental=True)
+
+    def _fit_partitions(self, df: pd.DataFrame, incremental: bool):
+        # Nothing new (e.g. a scheduled retrain with no finished matches): keep the current models
+        if df.empty:
+            return {}
+        df = df.sort_values(self.league_column, kind='stable').reset_index(drop=True)
+        leagues = df[self.league_column].astype(str).values
+        boundaries = np.flatnonzero(leagues[1:] != leagues[:-1]) + 1
+        starts = np.concatenate([[0], boundaries]).astype(int)
+        stops = np.concatenate([boundaries, [len(df)]]).astype(int)
+
+        shared = df[[c for c in _SHARED_COLUMNS if c in df.columns]]
+        if 'date' in shared.columns:
+            shared = shared.assign(date=pd.to_datetime(shared['date']))
+
+        blocks, spec = share_frame(shared)
+        try:
+            jobs = []
+            for start, stop in zip(starts, stops):
+                league = leagues[start]
+                model = self.models.get(league) if incremental else None
+                warm = model is not None
+                if not warm:
+                    model = DixonColesModel(xi=self.xi, max_history_days=self.max_history_days)
+                jobs.append((league, (model, spec, start, stop, warm)))
+
+            if self.max_workers == 1 or len(jobs) <= 1:
+                fitted = [_fit_league(*args) for _, args in jobs]
+            else:
+                workers = min(self.max_workers or os.cpu_count() or 1, len(jobs))
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    futures = [pool.submit(_fit_league, *args) for _, args in jobs]
+                    fitted = [f.result() for f in futures]
+        finally:
+            release_frame(blocks)
+
+        for (league, _), model in zip(jobs, fitted):
+            self.models[league] = model
+        self._index_teams()
+        return {league: len(self.models[league].teams) for league, _ in jobs}
+
+    def _index_teams(self):
+        self.team_leagues = {}
+        sizes = {league: len(m.history) if m.history is not None else 0 for league, m in self.models.items()}
+        for league in sorted(self.models, key=lambda l: -sizes[l]):
+            for team in self.models[league].teams:
+                self.team_leagues.setdefault(team, []).append(league)
+
+    def league_for(self, home_team: str, away_team: str) -> str:
+        away_leagues = set(self.team_leagues.get(away_team, []))
+        for league in self.team_leagues.get(home_team, []):
+            if league in away_leagues:
+                return league
+        raise KeyError(f"No league with both {home_team} and {away_team}")
+
+    def precompute(self, max_goals=None, tol=None, lazy=False):
+        for model in self.models.values():
+            model.precompute(max_goals=max_goals, tol=tol, lazy=lazy)
+
+    def predict_probs(self, home_team, away_team, max_goals=None, tol=None, league: Optional[str] = None):
+        league = league or self.league_for(home_team, away_team)
+        return self.models[league].predict_probs(home_team, away_team, max_goals=max_goals, tol=tol)
+
+    def predict_probs_batch(self, home_teams, away_teams, max_goals=None, tol=None):
+        """
+        Groups fixtures by league and stacks the results with one shared goal cap.
+        """
+        leagues = np.array([self.league_for(h, a) for h, a in zip(home_teams, away_teams)], dtype=object)
+        home_teams, away_teams = np.asarray(home_teams, dtype=object), np.asarray(away_teams, dtype=object)
+
+        if max_goals is None:
+            max_lambda = 0.0
+            for league in set(leagues):
+                model = self.models[league]
+                mask = leagues == league
+                lambda_h, lambda_a = model.expected_goals(pd.Index(model.teams).get_indexer(home_teams[mask]),
+                                                          pd.Index(model.teams).get_indexer(away_teams[mask]))
+                max_lambda = max(max_lambda, np.max(lambda_h), np.max(lambda_a))
+            max_goals = DixonColesModel.goals_for_tolerance(max_lambda, tol)
+
+        probs = np.empty((len(leagues), max_goals + 1, max_goals + 1))
+        for league in set(leagues):
+            mask = leagues == league
+            probs[mask] = self.models[league].predict_probs_batch(home_teams[mask], away_teams[mask], max_goals=max_goals)
+        return probs
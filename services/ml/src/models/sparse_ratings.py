@@ -0,0 +1,100 @@
+import numpy as np
+import scipy.sparse as sp
+from scipy.optimize import minimize
+from scipy.special import gammaln
+from typing import Optional
+from .dixon_coles import DixonColesModel
+
+class SparseDixonColesModel(DixonColesModel):
+    """
+    Dixon-Coles fitted through sparse design matrices, for global models over
+    thousands of teams. The sum-to-zero attack constraint and the rho range are
+    handled by reparameterization (attack_last = -sum(others), rho = tanh(r)), so
+    an unconstrained Newton-CG with sparse Hessian-vector products (or L-BFGS-B)
+    replaces SLSQP and memory stays linear in matches plus teams.
+
+    Parameters are stored in the same layout as DixonColesModel, so prediction,
+    precompute and partial_fit work unchanged.
+    """
+    def __init__(self, xi: float = 0.0, max_history_days: Optional[int] = None, solver: str = 'newton-cg'):
+        super().__init__(xi=xi, max_history_days=max_history_days)
+        self.solver = solver
+
+    def _reparameterization(self, nt: int) -> sp.csr_matrix:
+        """
+        Maps free parameters [attack_1..attack_{nt-1}, defense, home_adv] to
+        [attack, defense, home_adv] with attack summing to zero.
+        """
+        centering = sp.vstack([sp.identity(nt - 1), -np.ones((1, nt - 1))])
+        return sp.block_diag([centering, sp.identity(nt), sp.identity(1)], format='csr')
+
+    def _design(self, home_teams, away_teams, nt):
+        n = len(home_teams)
+        rows = np.arange(n)
+        shape = (n, 2 * nt + 1)
+        x_home = sp.csr_matrix((np.ones(3 * n), (np.concatenate([rows, rows, rows]),
+                                np.concatenate([home_teams, nt + away_teams, np.full(n, 2 * nt)]))), shape=shape)
+        x_away = sp.csr_matrix((np.ones(2 * n), (np.concatenate([rows, rows]),
+                                np.concatenate([away_teams, nt + home_teams]))), shape=shape)
+        return x_home, x_away
+
+    def _optimize(self, df, init_params):
+        nt = len(self.teams)
+        home_teams, away_teams, home_goals, away_goals, weights = self._match_arrays(df)
+
+        reparam = self._reparameterization(nt)
+        x_home, x_away = self._design(home_teams, away_teams, nt)
+        x_home, x_away = (x_home @ reparam).tocsr(), (x_away @ reparam).tocsr()
+        gammaln_h = gammaln(home_goals + 1)
+        gammaln_a = gammaln(away_goals + 1)
+
+        def unpack(x):
+            return x[:-1], np.tanh(x[-1])
+
+        def objective(x):
+            beta, rho = unpack(x)
+            with np.errstate(over='ignore', invalid='ignore'):
+                eta_h = x_home @ beta
+                eta_a = x_away @ beta
+                lambda_h, lambda_a = np.exp(eta_h), np.exp(eta_a)
+                tau, dtau_h, dtau_a, dtau_rho = self._tau(home_goals, away_goals, lambda_h, lambda_a, rho)
+                log_l = (np.log(tau)
+                         + home_goals * eta_h - lambda_h - gammaln_h
+                         + away_goals * eta_a - lambda_a - gammaln_a)
+
+            g_h = weights * (home_goals - lambda_h + dtau_h)
+            g_a = weights * (away_goals - lambda_a + dtau_a)
+            grad = np.empty_like(x)
+            grad[:-1] = x_home.T @ g_h + x_away.T @ g_a
+            grad[-1] = np.sum(weights * dtau_rho) * (1 - rho ** 2)
+            return -np.sum(weights * log_l), -grad
+
+        def hessp(x, v):
+            # Fisher information product: X' diag(w * lambda) X v for the Poisson
+            # terms, outer-product curvature for rho; positive definite by construction
+            beta, rho = unpack(x)
+            lambda_h, lambda_a = np.exp(x_home @ beta), np.exp(x_away @ beta)
+            _, _, _, dtau_rho = self._tau(home_goals, away_goals, lambda_h, lambda_a, rho)
+            out = np.empty_like(v)
+            out[:-1] = (x_home.T @ (weights * lambda_h * (x_home @ v[:-1])) +
+                        x_away.T @ (weights * lambda_a * (x_away @ v[:-1])))
+            out[-1] = (np.sum(weights * dtau_rho ** 2) * (1 - rho ** 2) ** 2 + 1e-8) * v[-1]
+            return out
+
+        # Free parameters from the stored layout (attack already centred)
+        x0 = np.empty(2 * nt + 1)
+        x0[:nt - 1] = init_params[:nt - 1] - np.mean(init_params[:nt])
+        x0[nt - 1:2 * nt - 1] = init_params[nt:2 * nt]
+        x0[2 * nt - 1] = init_params[2 * nt]
+        x0[2 * nt] = np.arctanh(np.clip(init_params[2 * nt + 1], -0.999, 0.999))
+
+        if self.solver == 'newton-cg':
+            res = minimize(objective, x0, jac=True, hessp=hessp, method='Newton-CG',
+                           options={'xtol': 1e-8, 'maxiter': 200})
+        else:
+            res = minimize(objective, x0, jac=True, method='L-BFGS-B',
+                           options={'ftol': 1e-12, 'gtol': 1e-8, 'maxiter': 2000})
+
+        beta, rho = unpack(res.x)
+        self._set_params(np.concatenate([reparam @ beta, [rho]]), df)
+        return res
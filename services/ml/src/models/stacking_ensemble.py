@@ -1,14 +1,15 @@
 from sklearn.linear_model import LogisticRegression
 from sklearn.isotonic import IsotonicRegression
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 class StackingEnsemble:
     def __init__(self):
-        self.meta_model = LogisticRegression(multi_class='multinomial', solver='lbfgs')
+        # lbfgs fits a multinomial model for multi-class targets
+        self.meta_model = LogisticRegression(solver='lbfgs')
         self.is_fitted = False
 
-    def fit(self, base_predictions: np.ndarray, y: np.Series):
+    def fit(self, base_predictions: np.ndarray, y: np.ndarray):
         """
         base_predictions: array of shape (n_samples, n_base_models * 3)
         y: actual results [0, 1, 2]
@@ -19,20 +20,25 @@ class StackingEnsemble:
     def predict_proba(self, base_predictions: np.ndarray) -> np.ndarray:
         if not self.is_fitted:
             # Fallback to simple average if not fitted
-            n_models = base_predictions.shape[1] // 3
-            avg_probs = np.zeros((base_predictions.shape[0], 3))
-            for i in range(n_models):
-                avg_probs += base_predictions[:, i*3:(i+1)*3]
-            return avg_probs / n_models
-            
+            return _average_base_models(base_predictions)
+
         return self.meta_model.predict_proba(base_predictions)
 
+    def compile(self, calibrator: Optional["ProbabilityCalibrator"] = None) -> "CompiledEnsemble":
+        """
+        Exports the meta-model (and optionally a calibrator) to plain arrays for serving.
+        """
+        if not self.is_fitted:
+            return CompiledEnsemble(calibrator=calibrator.compile() if calibrator else None)
+        return CompiledEnsemble(coef=self.meta_model.coef_, intercept=self.meta_model.intercept_,
+                                calibrator=calibrator.compile() if calibrator else None)
+
 class ProbabilityCalibrator:
     def __init__(self, method='isotonic'):
         self.method = method
         self.regressors = []
 
-    def fit(self, probs: np.ndarray, y: np.Series):
+    def fit(self, probs: np.ndarray, y: np.ndarray):
         """
         probs: (n_samples, 3)
         y: (n_samples,) binary for each class (one-vs-rest calibration)
@@ -46,11 +52,88 @@ class ProbabilityCalibrator:
 
     def calibrate(self, probs: np.ndarray) -> np.ndarray:
         if not self.regressors: return probs
-        
+
         calibrated = np.zeros_like(probs)
         for i in range(3):
             calibrated[:, i] = self.regressors[i].transform(probs[:, i])
-            
+
         # Re-normalize
         row_sums = calibrated.sum(axis=1)
         return calibrated / row_sums[:, np.newaxis]
+
+    def compile(self) -> "CompiledCalibrator":
+        return CompiledCalibrator([ir.X_thresholds_ for ir in self.regressors],
+                                  [ir.y_thresholds_ for ir in self.regressors])
+
+def _average_base_models(base_predictions: np.ndarray) -> np.ndarray:
+    n_models = base_predictions.shape[1] // 3
+    return base_predictions.reshape(base_predictions.shape[0], n_models, 3).mean(axis=1)
+
+class CompiledCalibrator:
+    """
+    Isotonic calibration as threshold arrays. np.interp clips at the ends exactly
+    like IsotonicRegression(out_of_bounds='clip'), so outputs match calibrate().
+    """
+    def __init__(self, x_thresholds: List[np.ndarray], y_thresholds: List[np.ndarray]):
+        self.x_thresholds = [np.asarray(x, dtype=float) for x in x_thresholds]
+        self.y_thresholds = [np.asarray(y, dtype=float) for y in y_thresholds]
+
+    def calibrate(self, probs: np.ndarray) -> np.ndarray:
+        if not self.x_thresholds: return probs
+
+        calibrated = np.empty(probs.shape, dtype=float)
+        for i, (x, y) in enumerate(zip(self.x_thresholds, self.y_thresholds)):
+            calibrated[:, i] = np.interp(probs[:, i], x, y)
+        return calibrated / calibrated.sum(axis=1, keepdims=True)
+
+class CompiledEnsemble:
+    """
+    Dependency-free stacking inference over raw coefficient matrices, with an
+    optional compiled calibrator. Round-trips through a plain .npz via save/load.
+    """
+    def __init__(self, coef: Optional[np.ndarray] = None, intercept: Optional[np.ndarray] = None,
+                 calibrator: Optional[CompiledCalibrator] = None):
+        self.coef = None if coef is None else np.ascontiguousarray(coef, dtype=float)
+        self.intercept = None if intercept is None else np.asarray(intercept, dtype=float)
+        self.calibrator = calibrator
+
+    def predict_proba(self, base_predictions: np.ndarray) -> np.ndarray:
+        base_predictions = np.asarray(base_predictions, dtype=float)
+        if self.coef is None:
+            probs = _average_base_models(base_predictions)
+        elif self.coef.shape[0] == 1:
+            # Binary meta-model: sklearn uses the logistic of a single logit
+            p1 = 1.0 / (1.0 + np.exp(-(base_predictions @ self.coef[0] + self.intercept[0])))
+            probs = np.column_stack([1.0 - p1, p1])
+        else:
+            logits = base_predictions @ self.coef.T + self.intercept
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+
+        if self.calibrator is not None:
+            probs = self.calibrator.calibrate(probs)
+        return probs
+
+    def save(self, path: str):
+        arrays = {}
+        if self.coef is not None:
+            arrays['coef'] = self.coef
+            arrays['intercept'] = self.intercept
+        if self.calibrator is not None:
+            for i, (x, y) in enumerate(zip(self.calibrator.x_thresholds, self.calibrator.y_thresholds)):
+                arrays[f'x_thresholds_{i}'] = x
+                arrays[f'y_thresholds_{i}'] = y
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledEnsemble":
+        with np.load(path, allow_pickle=False) as data:
+            n_classes = sum(1 for key in data.files if key.startswith('x_thresholds_'))
+            calibrator = None
+            if n_classes:
+                calibrator = CompiledCalibrator([data[f'x_thresholds_{i}'] for i in range(n_classes)],
+                                                [data[f'y_thresholds_{i}'] for i in range(n_classes)])
+            if 'coef' in data.files:
+                return cls(data['coef'], data['intercept'], calibrator)
+            return cls(calibrator=calibrator)
@@ -0,0 +1,76 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+class RepricingScheduler:
+    """
+    Coalesces live re-pricing per fixture. Events mark a fixture dirty and it is
+    priced once when its window_ms coalescing window closes (immediately for
+    urgent marks such as goals). Prices are memoized by (teams, score, elapsed
+    bucket) and computed at the bucket midpoint, so a served price is at most
+    elapsed_bucket / 2 minutes off in time decay. A result is only worth
+    publishing when some outcome probability moved by more than threshold
+    since the last publish.
+    """
+    def __init__(self, price_fn: Callable[[str, str, List[int], float], Dict[str, float]],
+                 window_ms: float = 250.0, elapsed_bucket: float = 1.0, threshold: float = 0.005,
+                 memo_size: int = 10000):
+        self.price_fn = price_fn
+        self.window = window_ms / 1000.0
+        self.elapsed_bucket = elapsed_bucket
+        self.threshold = threshold
+        self.memo_size = memo_size
+        self._memo: "OrderedDict[tuple, Dict[str, float]]" = OrderedDict()
+        self._pending: Dict[str, float] = {} # fixtureId -> due time
+        self._published: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def mark(self, fixture_id: str, urgent: bool = False, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        due = now if urgent else now + self.window
+        # A later event never pushes back an update that is already waiting
+        if due < self._pending.get(fixture_id, float('inf')):
+            self._pending[fixture_id] = due
+
+    def next_due(self) -> Optional[float]:
+        return min(self._pending.values()) if self._pending else None
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        ready = [fid for fid, due in self._pending.items() if due <= now]
+        for fid in ready:
+            del self._pending[fid]
+        return ready
+
+    def take(self, fixture_id: str) -> bool:
+        """
+        Claims a pending update ahead of its window, for readers that need fresh probabilities now.
+        """
+        return self._pending.pop(fixture_id, None) is not None
+
+    def price(self, home_team: str, away_team: str, score: Sequence[int], elapsed: float) -> Dict[str, float]:
+        bucket = (elapsed // self.elapsed_bucket) * self.elapsed_bucket
+        key = (home_team, away_team, tuple(score), bucket)
+        probs = self._memo.get(key)
+        if probs is not None:
+            self._memo.move_to_end(key)
+            return probs
+        # Any elapsed in the bucket may hit this entry; the midpoint halves the worst-case error
+        probs = self._memo[key] = self.price_fn(home_team, away_team, list(score), bucket + self.elapsed_bucket / 2)
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return probs
+
+    def should_publish(self, fixture_id: str, probs: Dict[str, float]) -> bool:
+        last = self._published.get(fixture_id)
+        if last is not None and all(abs(probs[k] - last[k]) <= self.threshold for k in probs):
+            return False
+        self._published[fixture_id] = probs
+        return True
+
+    def forget(self, fixture_id: str):
+        self._pending.pop(fixture_id, None)
+        self._published.pop(fixture_id, None)
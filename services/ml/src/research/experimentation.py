@@ -1,20 +1,105 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from ..infrastructure.registry import ModelRegistry
 from ..infrastructure.database import SessionLocal
 from sqlalchemy import text
+from collections import deque
 import json
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+class ShadowPredictionWriter:
+    """
+    Buffers shadow predictions and writes them with one multi-row INSERT every
+    batch_rows rows or flush_ms milliseconds, whichever comes first.
+    """
+    def __init__(self, batch_rows: int = 200, flush_ms: float = 500.0, session_factory=SessionLocal):
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_ms / 1000.0
+        self.session_factory = session_factory
+        self._rows: List[Tuple] = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def add(self, fixture_id: str, experiment_id: str, model_version: str, probs: Dict):
+        with self._cond:
+            self._rows.append((fixture_id, f"shadow_{model_version}_{experiment_id}",
+                               probs['home'], probs['draw'], probs['away']))
+            if len(self._rows) >= self.batch_rows:
+                self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while len(self._rows) < self.batch_rows and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                # At most batch_rows per INSERT; a backlog goes out over the next passes
+                rows, self._rows = self._rows[:self.batch_rows], self._rows[self.batch_rows:]
+                closed = self._closed and not self._rows
+            if rows:
+                self._write(rows)
+            if closed:
+                return
+
+    def _write(self, rows: List[Tuple]):
+        db = self.session_factory()
+        try:
+            # We log shadow predictions to the Prediction table but with a clear modelVersion tag
+            values, params = [], {}
+            for i, (fixture_id, model_version, home, draw, away) in enumerate(rows):
+                values.append(f"(gen_random_uuid(), :fixture_id_{i}, :model_version_{i}, :home_{i}, :draw_{i}, :away_{i}, 0, 0, 'NONE', NOW())")
+                params.update({f"fixture_id_{i}": fixture_id, f"model_version_{i}": model_version,
+                               f"home_{i}": home, f"draw_{i}": draw, f"away_{i}": away})
+            query = text("""
+                INSERT INTO "Prediction" (id, "fixtureId", "modelVersion", "homeProb", "drawProb", "awayProb", ev, confidence, "recommendedBet", "createdAt")
+                VALUES """ + ",\n".join(values))
+            db.execute(query, params)
+            db.commit()
+        except Exception as e:
+            logger.error(f"Error logging {len(rows)} shadow predictions: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
 class ExperimentManager:
-    def __init__(self):
+    """
+    Shadow experiments run off the live path: submit_shadow_inference only
+    enqueues, a small thread pool evaluates the shadow models and the writer
+    batches their predictions into the database. The queue is bounded and
+    drops the oldest request when full, so it never blocks production scoring.
+    """
+    def __init__(self, workers: int = 2, queue_size: int = 1000, batch_rows: int = 200, flush_ms: float = 500.0,
+                 session_factory=SessionLocal):
         self.registry = ModelRegistry()
+        self.session_factory = session_factory
         self.shadow_models = {}
         self._load_active_experiments()
 
+        self.dropped = 0
+        self._tasks = deque(maxlen=queue_size)
+        self._tasks_ready = threading.Condition()
+        self._closed = False
+        self._writer = ShadowPredictionWriter(batch_rows, flush_ms, session_factory)
+        self._workers = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
     def _load_active_experiments(self):
-        db = SessionLocal()
+        db = self.session_factory()
         try:
             query = text("""
                 SELECT e.*, ma.path, ma.name as model_name
@@ -37,6 +122,45 @@ class ExperimentManager:
         finally:
             db.close()
 
+    def submit_shadow_inference(self, fixture_id: str, context_data: Dict[str, Any]) -> bool:
+        """
+        Queues a shadow run without waiting for it. Returns False if there is nothing to run.
+        """
+        if not self.shadow_models:
+            return False
+        with self._tasks_ready:
+            # Checked under the lock: once close() has set it, workers may already have exited
+            if self._closed:
+                return False
+            if len(self._tasks) == self._tasks.maxlen:
+                self.dropped += 1
+            self._tasks.append((fixture_id, dict(context_data)))
+            self._tasks_ready.notify()
+        return True
+
+    def _work(self):
+        while True:
+            with self._tasks_ready:
+                while not self._tasks and not self._closed:
+                    self._tasks_ready.wait()
+                if not self._tasks:
+                    return
+                fixture_id, context_data = self._tasks.popleft()
+            self.run_shadow_inference(fixture_id, context_data)
+
+    def close(self):
+        """
+        Drains queued shadow runs and flushes pending predictions.
+        """
+        with self._tasks_ready:
+            self._closed = True
+            self._tasks_ready.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self._writer.close()
+        if self.dropped:
+            logger.warning(f"Dropped {self.dropped} shadow inference requests under load")
+
     def run_shadow_inference(self, fixture_id: str, context_data: Dict[str, Any]):
         results = {}
         for exp_id, shadow in self.shadow_models.items():
@@ -56,29 +180,7 @@ class ExperimentManager:
                     probs = {"home": 0.33, "draw": 0.33, "away": 0.34} # Fallback
 
                 results[exp_id] = probs
-                self._log_shadow_prediction(fixture_id, exp_id, shadow['name'], probs)
+                self._writer.add(fixture_id, exp_id, shadow['name'], probs)
             except Exception as e:
                 logger.error(f"Shadow inference failed for experiment {exp_id}: {e}")
         return results
-
-    def _log_shadow_prediction(self, fixture_id: str, experiment_id: str, model_version: str, probs: Dict):
-        db = SessionLocal()
-        try:
-            # We log shadow predictions to the Prediction table but with a clear modelVersion tag
-            query = text("""
-                INSERT INTO "Prediction" (id, "fixtureId", "modelVersion", "homeProb", "drawProb", "awayProb", ev, confidence, "recommendedBet", "createdAt")
-                VALUES (gen_random_uuid(), :fixture_id, :model_version, :home, :draw, :away, 0, 0, 'NONE', NOW())
-            """)
-            db.execute(query, {
-                "fixture_id": fixture_id,
-                "model_version": f"shadow_{model_version}_{experiment_id}",
-                "home": probs['home'],
-                "draw": probs['draw'],
-                "away": probs['away']
-            })
-            db.commit()
-        except Exception as e:
-            logger.error(f"Error logging shadow prediction: {e}")
-            db.rollback()
-        finally:
-            db.close()
@@ -54,13 +54,68 @@ def ingest_data(context: Dict) -> Dict:
     finally:
         db.close()
 
+def _new_matches(df: pd.DataFrame, history: pd.DataFrame, league_column: str = 'leagueId') -> pd.DataFrame:
+    """
+    Rows of df the model has not trained on. Fixtures are matched on id, so
+    results that finish late or out of order are still picked up; rows older
+    than the history a league retains (max_history_days) stay excluded. Models
+    saved without ids fall back to each league's latest trained date.
+    """
+    keep = pd.Series(True, index=df.index)
+    if 'date' in df.columns and 'date' in history.columns:
+        dates, trained = pd.to_datetime(df['date']), pd.to_datetime(history['date'])
+        if league_column in df.columns and league_column in history.columns:
+            by_league = trained.groupby(history[league_column])
+            oldest, latest = df[league_column].map(by_league.min()), df[league_column].map(by_league.max())
+        else:
+            oldest = pd.Series(trained.min(), index=df.index)
+            latest = pd.Series(trained.max(), index=df.index)
+        # Leagues the model has never seen map to NaT and are new in full
+        keep &= oldest.isna() | (dates >= oldest)
+        if 'id' not in history.columns:
+            keep &= latest.isna() | (dates > latest)
+    if 'id' in df.columns and 'id' in history.columns:
+        keep &= ~df['id'].isin(history['id'])
+    return df[keep]
+
 def train_model(context: Dict) -> Dict:
-    df = context["data"]
+    df = context["data"].rename(columns={"homeScore": "home_goals", "awayScore": "away_goals"})
     # For now, we use a placeholder for actual training logic
     # In reality, this would import DixonColesModel or GBMModel
     from ..models.dixon_coles import DixonColesModel
-    model = DixonColesModel()
-    model.fit(df)
+    from ..models.multi_league import MultiLeagueDixonColesModel
+    from ..models.sparse_ratings import SparseDixonColesModel
+
+    # Independent per-competition models, fitted in parallel, unless disabled.
+    # A global model across all tiers uses the sparse fitter to bound memory.
+    per_league = context.get("per_league", "leagueId" in df.columns)
+    if per_league:
+        model_cls = MultiLeagueDixonColesModel
+    elif context.get("sparse", False):
+        model_cls = SparseDixonColesModel
+    else:
+        model_cls = DixonColesModel
+
+    # Warm-start from the last registered model when available
+    model = None
+    if context.get("warm_start", True):
+        try:
+            model = ModelRegistry().load_model("dixon_coles_retrained")
+        except Exception as e:
+            logger.info(f"No previous model to warm-start from, running a full fit: {e}")
+
+    if isinstance(model, model_cls) and getattr(model, 'history', None) is not None:
+        df = _new_matches(df, model.history)
+        if df.empty:
+            logger.info("No newly finished matches since the previous fit, keeping the model")
+        else:
+            model.partial_fit(df)
+    else:
+        kwargs = {"xi": context.get("xi", 0.0), "max_history_days": context.get("max_history_days")}
+        if per_league:
+            kwargs["max_workers"] = context.get("max_workers")
+        model = model_cls(**kwargs)
+        model.fit(df)
     return {"model": model}
 
 def validate_model(context: Dict) -> Dict:
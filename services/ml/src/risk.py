@@ -1,4 +1,8 @@
+import math
 import time
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
 
 class LiveRiskManager:
     def __init__(self, drawdown_threshold=0.15, exposure_limit=0.05):
@@ -30,28 +34,129 @@ class LiveRiskManager:
         return True, "Risk check passed"
 
 class RegimeDetector:
-    def __init__(self):
-        self.odds_history = {}
+    """
+    Streaming price regime per (fixture, market, selection). Each tick updates an
+    EWMA of squared log returns and a time-decayed count of jumps (moves above
+    jump_threshold) in O(1). State lives in flat NumPy arrays, so every open
+    fixture can be scored in one vectorized pass.
+    """
+    def __init__(self, span_ticks: int = 20, jump_threshold: float = 0.10, jump_halflife_sec: float = 60.0,
+                 vol_threshold: float = 0.05, min_updates: int = 5, initial_capacity: int = 256):
+        self.alpha = 2.0 / (span_ticks + 1)
+        self.jump_threshold = jump_threshold
+        self.jump_halflife = jump_halflife_sec
+        self.vol_threshold = vol_threshold
+        self.min_updates = min_updates
 
-    def is_unstable(self, fixture_id: str, current_odds: float):
-        if fixture_id not in self.odds_history:
-            self.odds_history[fixture_id] = []
+        self.price = np.zeros(initial_capacity)
+        self.variance = np.zeros(initial_capacity)  # EWMA of squared log returns
+        self.jumps = np.zeros(initial_capacity)     # Decayed jump count as of updated
+        self.total_jumps = np.zeros(initial_capacity, dtype=np.int64)
+        self.updated = np.zeros(initial_capacity)
+        self.count = np.zeros(initial_capacity, dtype=np.int64)
+        self.fixture = np.full(initial_capacity, -1, dtype=np.int64) # -1 marks a free row
 
-        history = self.odds_history[fixture_id]
-        history.append((time.time(), current_odds))
+        self.rows: Dict[Tuple[str, str, str], int] = {}
+        self.fixture_codes: Dict[str, int] = {}
+        self.fixture_names: List[Optional[str]] = []
+        self._fixture_keys: Dict[str, List[Tuple[str, str, str]]] = {}
+        self._free: List[int] = []
+        self._free_codes: List[int] = []
+        self._next_row = 0
 
-        # Keep last 10 updates
-        if len(history) > 10:
-            history.pop(0)
+    def _grow(self):
+        n = len(self.price)
+        for name in ('price', 'variance', 'jumps', 'total_jumps', 'updated', 'count'):
+            arr = getattr(self, name)
+            setattr(self, name, np.concatenate([arr, np.zeros(n, dtype=arr.dtype)]))
+        self.fixture = np.concatenate([self.fixture, np.full(n, -1, dtype=np.int64)])
 
-        if len(history) < 5:
+    def _row(self, fixture_id: str, market: str, selection: str) -> int:
+        row = self.rows.get((fixture_id, market, selection))
+        if row is not None:
+            return row
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self._next_row == len(self.price):
+                self._grow()
+            row = self._next_row
+            self._next_row += 1
+        code = self.fixture_codes.get(fixture_id)
+        if code is None:
+            if self._free_codes:
+                code = self._free_codes.pop()
+                self.fixture_names[code] = fixture_id
+            else:
+                code = len(self.fixture_names)
+                self.fixture_names.append(fixture_id)
+            self.fixture_codes[fixture_id] = code
+        self.rows[(fixture_id, market, selection)] = row
+        self._fixture_keys.setdefault(fixture_id, []).append((fixture_id, market, selection))
+        self.fixture[row] = code
+        return row
+
+    def update(self, fixture_id: str, selection: str, price: float, market: str = '1X2',
+               timestamp: Optional[float] = None):
+        now = time.time() if timestamp is None else timestamp
+        row = self._row(fixture_id, market, selection)
+        if self.count[row]:
+            prev = self.price[row]
+            r = math.log(price / prev)
+            self.variance[row] += self.alpha * (r * r - self.variance[row])
+            self.jumps[row] *= 0.5 ** ((now - self.updated[row]) / self.jump_halflife)
+            # Check for rapid movement (> 10% in one update)
+            if abs(price - prev) / prev > self.jump_threshold:
+                self.jumps[row] += 1.0
+                self.total_jumps[row] += 1
+        self.price[row] = price
+        self.updated[row] = now
+        self.count[row] += 1
+
+    def is_unstable(self, fixture_id: str, selection: str, market: str = '1X2', now: Optional[float] = None) -> bool:
+        row = self.rows.get((fixture_id, market, selection))
+        if row is None or self.count[row] < self.min_updates:
             return False
+        now = time.time() if now is None else now
+        jumps = self.jumps[row] * 0.5 ** ((now - self.updated[row]) / self.jump_halflife)
+        return bool(jumps >= 0.5 or math.sqrt(self.variance[row]) > self.vol_threshold)
+
+    def scores(self, now: Optional[float] = None) -> pd.DataFrame:
+        """
+        Regime of every open fixture: the highest selection volatility, the
+        decayed jump intensity summed over selections, total jumps and whether
+        any selection is unstable.
+        """
+        now = time.time() if now is None else now
+        rows = np.flatnonzero(self.fixture[:self._next_row] >= 0)
+        codes = self.fixture[rows]
+        n = len(self.fixture_names)
 
-        # Check for rapid movement (> 10% in last minute)
-        recent_changes = [abs(history[i][1] - history[i-1][1])/history[i-1][1]
-                         for i in range(1, len(history))]
+        vol = np.sqrt(self.variance[rows])
+        jumps = self.jumps[rows] * 0.5 ** ((now - self.updated[rows]) / self.jump_halflife)
+        warm = self.count[rows] >= self.min_updates
+        unstable = warm & ((jumps >= 0.5) | (vol > self.vol_threshold))
 
-        if max(recent_changes) > 0.10:
-            return True
+        max_vol = np.zeros(n)
+        np.maximum.at(max_vol, codes, np.where(warm, vol, 0.0))
+        present = np.bincount(codes, minlength=n) > 0
+        df = pd.DataFrame({
+            'volatility': max_vol,
+            'jump_intensity': np.bincount(codes, weights=jumps, minlength=n),
+            'jumps': np.bincount(codes, weights=self.total_jumps[rows], minlength=n).astype(np.int64),
+            'unstable': np.bincount(codes, weights=unstable, minlength=n) > 0
+        }, index=pd.Index(self.fixture_names, name='fixture_id'))
+        return df[present]
 
-        return False
+    def drop_fixture(self, fixture_id: str):
+        code = self.fixture_codes.pop(fixture_id, None)
+        if code is None:
+            return
+        for key in self._fixture_keys.pop(fixture_id):
+            row = self.rows.pop(key)
+            self.fixture[row] = -1
+            self.count[row] = self.total_jumps[row] = 0
+            self.variance[row] = self.jumps[row] = 0.0
+            self._free.append(row)
+        self.fixture_names[code] = None
+        self._free_codes.append(code)
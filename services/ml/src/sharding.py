@@ -0,0 +1,117 @@
+import bisect
+import hashlib
+import time
+from redis.exceptions import WatchError
+from typing import Iterable, List, Optional
+
+class ConsistentHashRing:
+    """
+    Maps keys (fixture ids) to nodes (worker ids) with virtual nodes, so adding or
+    removing a worker only moves the fixtures that hashed next to it.
+    """
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 64):
+        self.vnodes = vnodes
+        self.nodes: List[str] = []
+        self._hashes: List[int] = []
+        self._owners: List[str] = []
+        self.set_nodes(nodes)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+    def set_nodes(self, nodes: Iterable[str]):
+        self.nodes = sorted(set(nodes))
+        points = sorted((self._hash(f"{node}#{i}"), node) for node in self.nodes for i in range(self.vnodes))
+        self._hashes = [h for h, _ in points]
+        self._owners = [node for _, node in points]
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        idx = bisect.bisect(self._hashes, self._hash(key)) % len(self._hashes)
+        return self._owners[idx]
+
+class ShardCoordinator:
+    """
+    Worker membership kept in a Redis sorted set scored by last heartbeat. Every
+    worker builds the same ring from the live members, so ownership agrees
+    without a central router. Each change to the member set increments an
+    epoch in the same transaction, so a ring is identified by its epoch and
+    workers can cheaply check theirs is current.
+    """
+    def __init__(self, redis_client, worker_id: str, members_key: str = 'live_workers',
+                 ttl_sec: float = 15.0, vnodes: int = 64):
+        self.redis = redis_client
+        self.worker_id = worker_id
+        self.members_key = members_key
+        self.epoch_key = f"{members_key}:epoch"
+        self.ttl = ttl_sec
+        self.ring = ConsistentHashRing(vnodes=vnodes)
+        self.epoch = 0
+        # Member set before our last heartbeat (re)joined the ring, None if we were already a member
+        self.joined_from: Optional[List[str]] = None
+        # Workers whose heartbeat expired without a leave(), removed by our last heartbeat
+        self.departed: List[str] = []
+
+    def heartbeat(self) -> bool:
+        """
+        Refreshes our membership and drops expired workers. Returns True if the
+        ring changed, i.e. fixtures may have moved. Expiry runs in one
+        transaction, so each crashed worker shows up in exactly one
+        coordinator's departed list, which then cleans up after it.
+        """
+        with self.redis.pipeline(transaction=True) as pipe:
+            while True:
+                try:
+                    now = time.time()
+                    pipe.watch(self.members_key)
+                    before = [_decode(m) for m in pipe.zrange(self.members_key, 0, -1)]
+                    expired = [_decode(m) for m in pipe.zrangebyscore(self.members_key, 0, now - self.ttl)]
+                    departed = [m for m in expired if m != self.worker_id]
+                    joining = self.worker_id not in before
+                    pipe.multi()
+                    pipe.zadd(self.members_key, {self.worker_id: now})
+                    pipe.zremrangebyscore(self.members_key, 0, now - self.ttl)
+                    if joining or departed:
+                        pipe.incr(self.epoch_key)
+                    pipe.zrange(self.members_key, 0, -1)
+                    pipe.get(self.epoch_key)
+                    members, epoch = pipe.execute()[-2:]
+                    break
+                except WatchError:
+                    continue # Another worker's heartbeat landed first
+        self.joined_from = sorted(before) if joining else None
+        self.departed = departed
+        return self._update(members, epoch)
+
+    def is_current(self, epoch) -> bool:
+        """
+        Whether our ring matches an epoch read from epoch_key.
+        """
+        return int(epoch or 0) == self.epoch
+
+    def _update(self, members, epoch) -> bool:
+        epoch = int(epoch or 0)
+        members = sorted(_decode(m) for m in members)
+        changed = epoch != self.epoch or members != self.ring.nodes
+        self.epoch = epoch
+        if members != self.ring.nodes:
+            self.ring.set_nodes(members)
+        return changed
+
+    def owns(self, fixture_id: str) -> bool:
+        owner = self.ring.owner(fixture_id)
+        # Before the first heartbeat we own nothing rather than everything
+        return owner == self.worker_id
+
+    def leave(self):
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.zrem(self.members_key, self.worker_id)
+        pipe.incr(self.epoch_key)
+        pipe.zrange(self.members_key, 0, -1)
+        _, epoch, members = pipe.execute()
+        self._update(members, epoch)
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
@@ -1,83 +1,368 @@
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 import time
 
+class PriceRingBuffer:
+    """
+    Price history per (fixture, bookmaker, selection) series, stored as rows of
+    fixed-capacity 2-D arrays addressed by integer series ids. A new tick
+    overwrites the oldest one, so appends are O(1) and memory is bounded.
+    """
+    def __init__(self, capacity: int = 1024, initial_series: int = 64):
+        self.capacity = capacity
+        self.times = np.zeros((initial_series, capacity))
+        self.prices = np.zeros((initial_series, capacity))
+        self.heads = np.zeros(initial_series, dtype=np.int64) # Next slot to write
+        self.counts = np.zeros(initial_series, dtype=np.int64)
+        # String -> integer id tables; series ids are keyed by the integer triple
+        self.fixtures: Dict[str, int] = {}
+        self.books: Dict[str, int] = {}
+        self.selections: Dict[str, int] = {}
+        self.series: Dict[Tuple[int, int, int], int] = {}
+        self._free: List[int] = []
+        self._next_row = 0
+        self._next_fixture = 0
+
+    @staticmethod
+    def _intern(table: Dict[str, int], name: str) -> int:
+        return table.setdefault(name, len(table))
+
+    def series_id(self, fixture_id: str, bookmaker: str, selection: str) -> Optional[int]:
+        try:
+            return self.series.get((self.fixtures[fixture_id], self.books[bookmaker], self.selections[selection]))
+        except KeyError:
+            return None
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        if self._next_row == len(self.heads):
+            grow = len(self.heads)
+            self.times = np.vstack([self.times, np.zeros((grow, self.capacity))])
+            self.prices = np.vstack([self.prices, np.zeros((grow, self.capacity))])
+            self.heads = np.concatenate([self.heads, np.zeros(grow, dtype=np.int64)])
+            self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+        self._next_row += 1
+        return self._next_row - 1
+
+    def append(self, fixture_id: str, bookmaker: str, selection: str, timestamp: float, price: float):
+        fixture = self.fixtures.get(fixture_id)
+        if fixture is None:
+            # Fixtures are dropped, so their ids come from a counter rather than the table size
+            fixture = self.fixtures[fixture_id] = self._next_fixture
+            self._next_fixture += 1
+        key = (fixture, self._intern(self.books, bookmaker), self._intern(self.selections, selection))
+        sid = self.series.get(key)
+        if sid is None:
+            sid = self.series[key] = self._allocate()
+        head = self.heads[sid]
+        self.times[sid, head] = timestamp
+        self.prices[sid, head] = price
+        self.heads[sid] = (head + 1) % self.capacity
+        self.counts[sid] = min(self.counts[sid] + 1, self.capacity)
+
+    def drop_fixture(self, fixture_id: str):
+        fixture = self.fixtures.pop(fixture_id, None)
+        if fixture is None:
+            return
+        for key in [k for k in self.series if k[0] == fixture]:
+            sid = self.series.pop(key)
+            self.heads[sid] = self.counts[sid] = 0
+            self._free.append(sid)
+
+    def resample(self, sids: np.ndarray, ts: np.ndarray, floor: float) -> np.ndarray:
+        """
+        Linear interpolation of every series onto the grid ts in one pass (same
+        semantics as np.interp, flat beyond the end points). Ticks older than
+        floor are pinned to it. Rows are laid end to end on one offset time axis
+        so a single searchsorted covers all of them.
+        """
+        cap = self.capacity
+        rows = np.arange(len(sids))
+        # Oldest-first slot order; unfilled slots come first
+        order = (self.heads[sids, None] + np.arange(cap)) % cap
+        times = np.take_along_axis(self.times[sids], order, axis=1)
+        prices = np.take_along_axis(self.prices[sids], order, axis=1)
+        first = np.minimum(cap - self.counts[sids], cap - 1)
+
+        # Unfilled slots copy the first tick so each row stays sorted
+        valid = np.arange(cap) >= first[:, None]
+        rel = np.maximum(times - floor, 0.0)
+        rel = np.where(valid, rel, rel[rows, first][:, None])
+        prices = np.where(valid, prices, prices[rows, first][:, None])
+
+        grid = ts - floor
+        span = max(rel.max(), grid[-1]) + 1.0
+        offsets = (rows * span)[:, None]
+        local = (np.searchsorted((rel + offsets).ravel(), (grid[None, :] + offsets).ravel(), side='right')
+                 .reshape(len(sids), len(ts)) - 1 - (rows * cap)[:, None])
+
+        lo = np.clip(local, 0, cap - 1)
+        hi = np.minimum(lo + 1, cap - 1)
+        t0, t1 = rel[rows[:, None], lo], rel[rows[:, None], hi]
+        p0, p1 = prices[rows[:, None], lo], prices[rows[:, None], hi]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w = np.where(t1 > t0, (grid[None, :] - t0) / (t1 - t0), 0.0)
+        return np.where(local < 0, prices[rows, first][:, None], p0 + w * (p1 - p0))
+
+def lagged_correlations(x: np.ndarray, y: np.ndarray, max_lag: int) -> np.ndarray:
+    """
+    Pearson correlation of x[:, k:] with y[:, :-k] (k > 0) and of x[:, :k] with
+    y[:, -k:] (k < 0) for every lag in [-max_lag, max_lag], for all rows at once.
+    One FFT gives every lagged cross product; cumulative sums give the mean and
+    variance of each overlap. Returns (rows, 2 * max_lag + 1), NaN where an
+    overlap is flat.
+    """
+    n = x.shape[1]
+    # Centering leaves correlations unchanged and avoids cancellation in the sums
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    size = 1 << (2 * n - 1).bit_length()
+    cross = np.fft.irfft(np.fft.rfft(x, size) * np.conj(np.fft.rfft(y, size)), size)
+
+    lags = np.arange(-max_lag, max_lag + 1)
+    m = n - np.abs(lags)
+    sxy = cross[:, lags % size]
+
+    def overlap_sums(v, start, stop):
+        c = np.zeros((v.shape[0], n + 1))
+        c2 = np.zeros((v.shape[0], n + 1))
+        np.cumsum(v, axis=1, out=c[:, 1:])
+        np.cumsum(v * v, axis=1, out=c2[:, 1:])
+        return c[:, stop] - c[:, start], c2[:, stop] - c2[:, start]
+
+    sx, sxx = overlap_sums(x, np.maximum(lags, 0), n + np.minimum(lags, 0))
+    sy, syy = overlap_sums(y, np.maximum(-lags, 0), n - np.maximum(lags, 0))
+
+    var_x = sxx - sx * sx / m
+    var_y = syy - sy * sy / m
+    cov = sxy - sx * sy / m
+    # FFT round-off leaves flat overlaps slightly non-zero
+    eps = 1e-12 * (np.sum(x * x, axis=1, keepdims=True) + np.sum(y * y, axis=1, keepdims=True))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where((var_x > eps) & (var_y > eps), cov / np.sqrt(var_x * var_y), np.nan)
+
+def _leadership(best_lag: int, max_corr: float, resolution: float) -> Dict:
+    return {
+        'lag_sec': float(best_lag * resolution),
+        'correlation': float(max_corr),
+        'leadership_score': float(max_corr * (1 if best_lag > 0 else -1)) # Positive if sharp leads
+    }
+
+class _LeadLagGroup:
+    """
+    Streaming state for one (fixture, selection): the books seen so far, a short
+    ring of grid samples per book and the weighted sums per unordered book pair.
+    """
+    def __init__(self, depth: int, n_lags: int):
+        self.depth = depth
+        self.n_lags = n_lags
+        self.books: Dict[str, int] = {}
+        self.ref = np.empty(0)   # First price per book; samples are stored relative to it
+        self.last = np.empty(0)
+        self.hist = np.empty((0, depth))
+        self.pos = 0             # Ring slot of the newest grid sample
+        self.step = None
+        self.pair_index: Dict[Tuple[int, int], int] = {}
+        self.pair_a = np.empty(0, dtype=np.int64)
+        self.pair_b = np.empty(0, dtype=np.int64)
+        self.weight = np.empty(0)
+        # Sums of x, y, x^2, y^2 and x*y per pair and lag
+        self.stats = np.empty((5, 0, n_lags))
+
+    def add_book(self, bookmaker: str, price: float) -> int:
+        i = self.books[bookmaker] = len(self.books)
+        self.ref = np.append(self.ref, price)
+        self.last = np.append(self.last, 0.0)
+        # Zero history = the first price carried back, like the batch resample's left fill
+        self.hist = np.vstack([self.hist, np.zeros((1, self.depth))])
+        for j in range(i):
+            self.pair_index[(j, i)] = len(self.pair_a)
+            self.pair_a = np.append(self.pair_a, j)
+            self.pair_b = np.append(self.pair_b, i)
+        self.weight = np.concatenate([self.weight, np.zeros(i)])
+        self.stats = np.concatenate([self.stats, np.zeros((5, i, self.n_lags))], axis=1)
+        return i
+
+class StreamingLeadLag:
+    """
+    Online lead-lag for every bookmaker pair. Prices are sampled onto a fixed
+    grid (the last price in each step) and every grid step folds the newest
+    samples into exponentially weighted sums (span of window_size_sec) of x, y,
+    x^2, y^2 and the lagged cross products, for all pairs and lags at once.
+    Ticks within a step are O(1), a step is O(lags) per pair, and a query
+    reads the sums without touching history.
+    """
+    def __init__(self, window_size_sec: int = 300, resolution_sec: int = 1, max_lag_sec: int = 10):
+        self.resolution = resolution_sec
+        self.max_lag = int(max_lag_sec // resolution_sec)
+        self.window_steps = int(window_size_sec // resolution_sec)
+        self.decay = 1.0 - 2.0 / (self.window_steps + 1)
+        # Lag k > 0 pairs the first book's sample k steps back with the second's newest
+        self.lags = np.arange(-self.max_lag, self.max_lag + 1)
+        self._offset_a = np.maximum(self.lags, 0)
+        self._offset_b = np.maximum(-self.lags, 0)
+        self.groups: Dict[Tuple[str, str], _LeadLagGroup] = {}
+        self._fixture_selections: Dict[str, List[str]] = {}
+
+    def update(self, fixture_id: str, bookmaker: str, selection: str, price: float, timestamp: float):
+        group = self.groups.get((fixture_id, selection))
+        if group is None:
+            group = self.groups[(fixture_id, selection)] = _LeadLagGroup(self.max_lag + 1, len(self.lags))
+            self._fixture_selections.setdefault(fixture_id, []).append(selection)
+
+        step = int(timestamp // self.resolution)
+        if group.step is None:
+            group.step = step
+        elif step > group.step:
+            # Older weight has decayed away after a window's worth of steps
+            self._advance(group, min(step - group.step, self.window_steps))
+            group.step = step
+
+        i = group.books.get(bookmaker)
+        if i is None:
+            i = group.add_book(bookmaker, price)
+        group.last[i] = price - group.ref[i]
+
+    def _advance(self, group: _LeadLagGroup, steps: int):
+        for _ in range(steps):
+            group.pos = (group.pos + 1) % group.depth
+            group.hist[:, group.pos] = group.last
+            if not len(group.pair_a):
+                continue
+            x = group.hist[group.pair_a[:, None], (group.pos - self._offset_a) % group.depth]
+            y = group.hist[group.pair_b[:, None], (group.pos - self._offset_b) % group.depth]
+            group.stats *= self.decay
+            group.stats[0] += x
+            group.stats[1] += y
+            group.stats[2] += x * x
+            group.stats[3] += y * y
+            group.stats[4] += x * y
+            group.weight = group.weight * self.decay + 1.0
+
+    def _correlations(self, group: _LeadLagGroup, pairs: np.ndarray) -> np.ndarray:
+        w = group.weight[pairs][:, None]
+        sx, sy, sxx, syy, sxy = group.stats[:, pairs]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            var_x = sxx / w - (sx / w) ** 2
+            var_y = syy / w - (sy / w) ** 2
+            cov = sxy / w - sx * sy / (w * w)
+            # Cancellation leaves flat series slightly non-zero
+            flat = (var_x <= 1e-12 * (sxx / w)) | (var_y <= 1e-12 * (syy / w)) | ~(w > 0)
+            return np.where(flat, np.nan, np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0))
+
+    def _result(self, corr: np.ndarray):
+        if np.isnan(corr[self.max_lag]):
+            return 0.0 # No movement to correlate
+        best = int(np.argmax(np.where(np.isnan(corr), -np.inf, corr)))
+        return _leadership(self.lags[best], corr[best], self.resolution)
+
+    def leadership(self, fixture_id: str, selection: str, sharp_book: str, soft_book: str):
+        """
+        Same result shape as SharpMoneyEngine.detect_leadership, from the running sums.
+        """
+        group = self.groups.get((fixture_id, selection))
+        if group is None or sharp_book not in group.books or soft_book not in group.books or sharp_book == soft_book:
+            return None
+        a, b = group.books[sharp_book], group.books[soft_book]
+        corr = self._correlations(group, np.array([group.pair_index[(min(a, b), max(a, b))]]))[0]
+        # Swapping the books mirrors the lag axis
+        return self._result(corr if a < b else corr[::-1])
+
+    def pair_leaderships(self, fixture_id: str, leader: Optional[str] = None) -> Dict[Tuple[str, str, str], object]:
+        """
+        Leadership of every ordered book pair on a fixture, keyed by
+        (selection, leading book, following book); optionally only pairs led by one book.
+        """
+        results = {}
+        for selection in self._fixture_selections.get(fixture_id, []):
+            group = self.groups[(fixture_id, selection)]
+            if not len(group.pair_a):
+                continue
+            corrs = self._correlations(group, np.arange(len(group.pair_a)))
+            names = list(group.books)
+            for a, b, corr in zip(group.pair_a, group.pair_b, corrs):
+                if leader is None or names[a] == leader:
+                    results[(selection, names[a], names[b])] = self._result(corr)
+                if leader is None or names[b] == leader:
+                    results[(selection, names[b], names[a])] = self._result(corr[::-1])
+        return results
+
+    def drop_fixture(self, fixture_id: str):
+        for selection in self._fixture_selections.pop(fixture_id, []):
+            del self.groups[(fixture_id, selection)]
+
 class SharpMoneyEngine:
-    def __init__(self, window_size_sec: int = 300, resolution_sec: int = 1):
+    def __init__(self, window_size_sec: int = 300, resolution_sec: int = 1, max_lag_sec: int = 10,
+                 capacity: int = 1024):
         self.window_size = window_size_sec
         self.resolution = resolution_sec
-        # price_history: {fixture_id: {bookmaker: [(timestamp, price)]}}
-        self.price_history = {}
+        self.max_lag = int(max_lag_sec // resolution_sec)
+        # Ticks per series kept in memory; older ones are overwritten
+        self.prices = PriceRingBuffer(capacity)
+        # Running lead-lag for every book pair, updated on each tick
+        self.lead_lag = StreamingLeadLag(window_size_sec, resolution_sec, max_lag_sec)
         self.leadership_scores = {}
 
-    def add_price(self, fixture_id: str, bookmaker: str, selection: str, price: float):
-        if fixture_id not in self.price_history:
-            self.price_history[fixture_id] = {}
-
-        key = f"{bookmaker}_{selection}"
-        if key not in self.price_history[fixture_id]:
-            self.price_history[fixture_id][key] = []
+    def add_price(self, fixture_id: str, bookmaker: str, selection: str, price: float,
+                  timestamp: Optional[float] = None):
+        timestamp = time.time() if timestamp is None else timestamp
+        self.prices.append(fixture_id, bookmaker, selection, timestamp, price)
+        self.lead_lag.update(fixture_id, bookmaker, selection, price, timestamp)
 
-        history = self.price_history[fixture_id][key]
-        now = time.time()
-        history.append((now, price))
+    def drop_fixture(self, fixture_id: str):
+        self.prices.drop_fixture(fixture_id)
+        self.lead_lag.drop_fixture(fixture_id)
 
-        # Clean up old data
-        cutoff = now - self.window_size - 60 # Extra buffer
-        while history and history[0][0] < cutoff:
-            history.pop(0)
+    def pair_leaderships(self, fixture_id: str, leader: Optional[str] = None) -> Dict:
+        return self.lead_lag.pair_leaderships(fixture_id, leader)
 
-    def detect_leadership(self, fixture_id: str, selection: str, sharp_book: str, soft_book: str):
+    def detect_leadership(self, fixture_id: str, selection: str, sharp_book: str, soft_book: str,
+                          now: Optional[float] = None):
         """
         Calculates lead-lag relationship using cross-correlation.
         """
-        sharp_key = f"{sharp_book}_{selection}"
-        soft_key = f"{soft_book}_{selection}"
+        return self.detect_leadership_many([(fixture_id, selection, sharp_book, soft_book)], now)[0]
 
-        if (fixture_id not in self.price_history or
-            sharp_key not in self.price_history[fixture_id] or
-            soft_key not in self.price_history[fixture_id]):
-            return None
+    def detect_leadership_many(self, queries: List[Tuple[str, str, str, str]], now: Optional[float] = None) -> List:
+        """
+        Lead-lag for many (fixture, selection, sharp_book, soft_book) queries with
+        one resample and one batched cross-correlation. Each result is None if a
+        book has no prices, 0.0 if either series is flat, else the leadership dict.
+        """
+        results = [None] * len(queries)
+        pairs = []
+        for i, (fixture_id, selection, sharp_book, soft_book) in enumerate(queries):
+            sharp = self.prices.series_id(fixture_id, sharp_book, selection)
+            soft = self.prices.series_id(fixture_id, soft_book, selection)
+            if sharp is not None and soft is not None:
+                pairs.append((i, sharp, soft))
+        if not pairs:
+            return results
 
         # Resample to fixed resolution
-        now = time.time()
+        now = time.time() if now is None else now
         ts = np.arange(now - self.window_size, now, self.resolution)
+        idx, sharp, soft = (np.array(col) for col in zip(*pairs))
+        sids, inverse = np.unique(np.concatenate([sharp, soft]), return_inverse=True)
+        series = self.prices.resample(sids, ts, now - self.window_size - 60) # Extra buffer
+        sharp_series, soft_series = series[inverse[:len(idx)]], series[inverse[len(idx):]]
 
-        def get_series(key):
-            history = self.price_history[fixture_id][key]
-            if not history: return np.zeros_like(ts)
-            h_times, h_prices = zip(*history)
-            # Use last-observation-carried-forward
-            return np.interp(ts, h_times, h_prices, left=h_prices[0])
-
-        sharp_series = get_series(sharp_key)
-        soft_series = get_series(soft_key)
-
-        if np.std(sharp_series) == 0 or np.std(soft_series) == 0:
-            return 0.0 # No movement to correlate
+        moving = (np.std(sharp_series, axis=1) > 0) & (np.std(soft_series, axis=1) > 0)
+        for i in idx[~moving]:
+            results[i] = 0.0 # No movement to correlate
+        if not moving.any():
+            return results
 
-        # Calculate cross-correlation for different lags
-        lags = np.arange(-10, 11) # -10s to +10s
-        correlations = []
-        for lag in lags:
-            if lag == 0:
-                corr = np.corrcoef(sharp_series, soft_series)[0, 1]
-            elif lag > 0:
-                corr = np.corrcoef(sharp_series[lag:], soft_series[:-lag])[0, 1]
-            else: # lag < 0
-                corr = np.corrcoef(sharp_series[:lag], soft_series[-lag:])[0, 1]
-            correlations.append(corr)
-
-        best_lag_idx = np.argmax(correlations)
-        best_lag = lags[best_lag_idx]
-        max_corr = correlations[best_lag_idx]
-
-        return {
-            'lag_sec': float(best_lag),
-            'correlation': float(max_corr),
-            'leadership_score': float(max_corr * (1 if best_lag > 0 else -1)) # Positive if sharp leads
-        }
+        # lagged_correlations pairs sharp[t + k] with soft[t], so its best k is
+        # negative when the soft book follows the sharp one
+        lags = -np.arange(-self.max_lag, self.max_lag + 1)
+        correlations = lagged_correlations(sharp_series[moving], soft_series[moving], self.max_lag)
+        best = np.argmax(np.where(np.isnan(correlations), -np.inf, correlations), axis=1)
+        for i, lag_idx, corr in zip(idx[moving], best, correlations):
+            results[i] = _leadership(lags[lag_idx], corr[lag_idx], self.resolution)
+        return results
 
     def calculate_confidence_score(self, fixture_id: str, current_odds: Dict[str, float], model_prob: float):
         """
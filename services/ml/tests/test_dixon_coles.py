@@ -5,6 +5,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'
 import pandas as pd
 import numpy as np
 from models.dixon_coles import DixonColesModel
+from models.sparse_ratings import SparseDixonColesModel
 
 def test_dixon_coles_fit():
     data = {
@@ -33,5 +34,154 @@ def test_dixon_coles_fit():
     assert np.isclose(home_win + draw + away_win, 1.0)
     print("Test passed!")
 
+def test_dixon_coles_gradient():
+    from scipy.optimize import check_grad
+    rng = np.random.default_rng(0)
+    n = 200
+    home = rng.integers(0, 6, n)
+    away = (home + rng.integers(1, 6, n)) % 6
+    df = pd.DataFrame({
+        'home_team': [f"T{i}" for i in home],
+        'away_team': [f"T{i}" for i in away],
+        'home_goals': rng.poisson(1.4, n),
+        'away_goals': rng.poisson(1.1, n)
+    })
+    model = DixonColesModel()
+    model.fit(df)
+
+    args = (df['home_team'].map(model.team_index).values, df['away_team'].map(model.team_index).values,
+            df['home_goals'].values.astype(float), df['away_goals'].values.astype(float))
+    params = rng.normal(0, 0.2, 14)
+    params[-1] = 0.05
+
+    f = lambda p: model._log_likelihood(p, *args)
+    g = lambda p: model._log_likelihood_and_grad(p, *args)[1]
+    err = check_grad(f, g, params)
+    print(f"Gradient error: {err}")
+    assert err < 1e-3 * np.linalg.norm(g(params))
+
+def test_dixon_coles_partial_fit():
+    rng = np.random.default_rng(1)
+    n = 300
+    home = rng.integers(0, 6, n)
+    away = (home + rng.integers(1, 6, n)) % 6
+    df = pd.DataFrame({
+        'home_team': [f"T{i}" for i in home],
+        'away_team': [f"T{i}" for i in away],
+        'home_goals': rng.poisson(1.4, n),
+        'away_goals': rng.poisson(1.1, n),
+        'date': pd.Timestamp('2023-01-01') + pd.to_timedelta(np.arange(n) * 3, unit='D')
+    })
+    model = DixonColesModel(xi=0.002, max_history_days=600)
+    model.fit(df.iloc[:280])
+    assert len(model.history) < 280 # Old matches trimmed
+
+    new = df.iloc[280:].copy()
+    new.loc[new.index[:2], 'home_team'] = 'Promoted'
+    res = model.partial_fit(new)
+    assert res.success
+    assert model.teams[-1] == 'Promoted'
+    assert len(model.params) == 2 * len(model.teams) + 2
+    assert np.isclose(np.mean(model.params[:len(model.teams)]), 0, atol=1e-6)
+    assert np.isclose(np.sum(model.predict_probs('Promoted', 'T1')), 1.0)
+
+def test_dixon_coles_precompute():
+    data = {
+        'home_team': ['A', 'B', 'C', 'A', 'B', 'C', 'A', 'B', 'C'],
+        'away_team': ['B', 'C', 'A', 'C', 'A', 'B', 'B', 'C', 'A'],
+        'home_goals': [1, 2, 0, 1, 1, 0, 2, 1, 0],
+        'away_goals': [1, 0, 1, 0, 2, 1, 1, 0, 2]
+    }
+    model = DixonColesModel()
+    model.fit(pd.DataFrame(data))
+
+    direct = model.predict_probs('A', 'B', max_goals=8)
+    assert direct.shape == (9, 9)
+
+    model.precompute(max_goals=8)
+    assert model._score_tensor.shape == (3, 3, 9, 9)
+    assert np.allclose(model.predict_probs('A', 'B'), direct, atol=1e-6)
+
+    expected = model.predict_probs('C', 'A', max_goals=9)
+    model.precompute(max_goals=9, lazy=True)
+    assert np.allclose(model.predict_probs('C', 'A'), expected, atol=1e-6)
+
+def test_dixon_coles_default_shape():
+    data = {
+        'home_team': ['A', 'B', 'C', 'A', 'B', 'C', 'A', 'B', 'C'],
+        'away_team': ['B', 'C', 'A', 'C', 'A', 'B', 'B', 'C', 'A'],
+        'home_goals': [1, 2, 0, 1, 1, 0, 2, 1, 0],
+        'away_goals': [1, 0, 1, 0, 2, 1, 1, 0, 2]
+    }
+    model = DixonColesModel()
+    model.fit(pd.DataFrame(data))
+
+    # Typical rates keep the historical 11x11 matrix
+    probs = model.predict_probs('A', 'B')
+    assert probs.shape == (11, 11)
+    assert np.allclose(probs, model.predict_probs('A', 'B', max_goals=10))
+    assert model.predict_probs_batch(['A', 'C'], ['B', 'A']).shape == (2, 11, 11)
+
+    # An explicit tol sizes the matrix to the rates instead
+    model.params[0] += 1.0
+    probs = model.predict_probs('A', 'B', tol=1e-6)
+    assert probs.shape[0] > 11
+    assert model.predict_probs('A', 'B').shape == (11, 11)
+
+    model.precompute()
+    assert model._score_tensor.shape[2:] == (11, 11)
+
+def test_dixon_coles_predict_batch():
+    data = {
+        'home_team': ['A', 'B', 'C', 'A', 'B', 'C', 'A', 'B', 'C'],
+        'away_team': ['B', 'C', 'A', 'C', 'A', 'B', 'B', 'C', 'A'],
+        'home_goals': [1, 2, 0, 1, 1, 0, 2, 1, 0],
+        'away_goals': [1, 0, 1, 0, 2, 1, 1, 0, 2]
+    }
+    model = DixonColesModel()
+    model.fit(pd.DataFrame(data))
+
+    batch = model.predict_probs_batch(['A', 'C', 'B'], ['B', 'A', 'C'], max_goals=10)
+    assert batch.shape == (3, 11, 11)
+    assert np.allclose(batch[1], model.predict_probs('C', 'A', max_goals=10))
+
+    try:
+        model.predict_probs_batch(['A', 'Z'], ['B', 'C'])
+        assert False, "Expected KeyError for unknown team"
+    except KeyError:
+        pass
+
+    assert model.predict_probs_batch([], []).shape == (0, 11, 11)
+    assert model.predict_probs_batch([], [], tol=1e-6).shape[0] == 0
+    model.precompute(lazy=True)
+    assert model.predict_probs_batch([], []).shape == (0, 11, 11)
+
+def test_sparse_dixon_coles_matches_dense():
+    rng = np.random.default_rng(2)
+    n = 400
+    home = rng.integers(0, 8, n)
+    away = (home + rng.integers(1, 8, n)) % 8
+    df = pd.DataFrame({
+        'home_team': [f"T{i}" for i in home],
+        'away_team': [f"T{i}" for i in away],
+        'home_goals': rng.poisson(1.4, n),
+        'away_goals': rng.poisson(1.1, n)
+    })
+    dense = DixonColesModel()
+    dense.fit(df)
+
+    for solver in ['newton-cg', 'l-bfgs-b']:
+        sparse = SparseDixonColesModel(solver=solver)
+        res = sparse.fit(df)
+        assert res.success
+        assert np.isclose(np.mean(sparse.params[:8]), 0, atol=1e-9)
+        assert np.allclose(sparse.params, dense.params, atol=1e-3)
+
 if __name__ == "__main__":
     test_dixon_coles_fit()
+    test_dixon_coles_gradient()
+    test_dixon_coles_partial_fit()
+    test_dixon_coles_precompute()
+    test_dixon_coles_default_shape()
+    test_dixon_coles_predict_batch()
+    test_sparse_dixon_coles_matches_dense()
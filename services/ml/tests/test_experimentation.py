@@ -0,0 +1,126 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Engine is created on import but never connected to; sessions come from FakeSessions
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import time
+import threading
+from src.research.experimentation import ShadowPredictionWriter, ExperimentManager
+
+class FakeSessions:
+    """
+    session_factory stand-in: records the fixture ids of every INSERT, no experiments are active.
+    """
+    def __init__(self):
+        self.writes = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        return self
+
+    def execute(self, query, params=None):
+        if params:
+            with self.lock:
+                self.writes.append([v for k, v in sorted(params.items(), key=lambda kv: int(kv[0].rsplit('_', 1)[1]))
+                                    if k.startswith('fixture_id_')])
+        return []
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+PROBS = {'home': 0.5, 'draw': 0.3, 'away': 0.2}
+
+def wait_for(condition, timeout_sec: float = 5.0) -> bool:
+    deadline = time.time() + timeout_sec
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def test_writer_batches_by_size():
+    sessions = FakeSessions()
+    writer = ShadowPredictionWriter(batch_rows=3, flush_ms=60000, session_factory=sessions)
+    for i in range(7):
+        writer.add(f"F{i}", 'exp', 'v1', PROBS)
+    assert wait_for(lambda: len(sessions.writes) == 2)
+    assert sessions.writes == [['F0', 'F1', 'F2'], ['F3', 'F4', 'F5']]
+
+    # The remainder waits for the interval, or close()
+    writer.close()
+    assert sessions.writes[2:] == [['F6']]
+    print("Shadow writer size batching test passed.")
+
+def test_writer_batches_by_interval():
+    sessions = FakeSessions()
+    writer = ShadowPredictionWriter(batch_rows=100, flush_ms=50, session_factory=sessions)
+    writer.add('F0', 'exp', 'v1', PROBS)
+    writer.add('F1', 'exp', 'v1', PROBS)
+    assert wait_for(lambda: len(sessions.writes) == 1)
+    assert sessions.writes == [['F0', 'F1']]
+    writer.close()
+    assert len(sessions.writes) == 1
+
+def test_experiment_queue_drops_oldest():
+    # No workers, so submitted runs stay queued
+    manager = ExperimentManager(workers=0, queue_size=2, session_factory=FakeSessions())
+    assert not manager.submit_shadow_inference('F0', {})
+
+    manager.shadow_models = {'exp': {'model': object(), 'name': 'shadow', 'experiment_id': 'exp'}}
+    for i in range(3):
+        assert manager.submit_shadow_inference(f"F{i}", {'elapsed': i})
+    assert manager.dropped == 1
+    assert [fixture_id for fixture_id, _ in manager._tasks] == ['F1', 'F2']
+    manager.close()
+    assert not manager.submit_shadow_inference('F3', {})
+
+def test_experiment_close_flushes():
+    sessions = FakeSessions()
+    manager = ExperimentManager(workers=2, batch_rows=1000, flush_ms=60000, session_factory=sessions)
+    manager.shadow_models = {'exp': {'model': object(), 'name': 'shadow', 'experiment_id': 'exp'}}
+    for i in range(50):
+        manager.submit_shadow_inference(f"F{i}", {'elapsed': i})
+    manager.close()
+
+    written = [fixture_id for rows in sessions.writes for fixture_id in rows]
+    assert sorted(written) == sorted(f"F{i}" for i in range(50))
+    print("Experiment manager close test passed.")
+
+def test_experiment_submit_racing_close():
+    sessions = FakeSessions()
+    manager = ExperimentManager(workers=2, batch_rows=50, flush_ms=10, session_factory=sessions)
+    manager.shadow_models = {'exp': {'model': object(), 'name': 'shadow', 'experiment_id': 'exp'}}
+    accepted = []
+
+    def submit(prefix):
+        i = 0
+        while manager.submit_shadow_inference(f"{prefix}{i}", {}):
+            accepted.append(f"{prefix}{i}")
+            i += 1
+
+    submitters = [threading.Thread(target=submit, args=(p,)) for p in 'ab']
+    for t in submitters:
+        t.start()
+    time.sleep(0.05)
+    manager.close()
+    for t in submitters:
+        t.join()
+
+    # Every accepted run was either written or counted as dropped
+    written = [fixture_id for rows in sessions.writes for fixture_id in rows]
+    assert len(written) + manager.dropped == len(accepted)
+    assert set(written) <= set(accepted)
+
+if __name__ == "__main__":
+    test_writer_batches_by_size()
+    test_writer_batches_by_interval()
+    test_experiment_queue_drops_oldest()
+    test_experiment_close_flushes()
+    test_experiment_submit_racing_close()
@@ -0,0 +1,31 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import pandas as pd
+import numpy as np
+import xgboost as xgb
+from concurrent.futures import ThreadPoolExecutor
+from models.gbm_model import GBMModel, GBMMicroBatcher
+
+def test_gbm_inplace_and_micro_batching():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(300, 5)), columns=['a', 'b', 'c', 'd', 'e'])
+    y = rng.integers(0, 3, 300)
+    model = GBMModel(nthread=1)
+    model.fit(X, y)
+
+    expected = model.model.predict(xgb.DMatrix(X.iloc[:20]))
+    # Column order of the frame must not matter
+    assert np.allclose(model.predict_proba(X.iloc[:20][['e', 'd', 'c', 'b', 'a']]), expected)
+    assert np.allclose(model.predict_proba(X.iloc[3].to_dict()), expected[3:4])
+
+    batcher = GBMMicroBatcher(model, max_batch=8, max_wait_ms=5)
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda i: batcher.predict(X.iloc[i].to_numpy()), range(20)))
+    batcher.close()
+    assert np.allclose(np.array(results), expected, atol=1e-6)
+    print("GBM serving test passed.")
+
+if __name__ == "__main__":
+    test_gbm_inplace_and_micro_batching()
@@ -0,0 +1,33 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import numpy as np
+from models.dixon_coles import DixonColesModel
+from models.live_engine import LiveMatchStateEngine, LiveOutcomeTables
+from models.market_pricing import MarketPricingEngine
+
+def test_live_outcome_tables():
+    tables = LiveOutcomeTables().build()
+    pricing = MarketPricingEngine()
+
+    for lambda_h, lambda_a, score in [(0.9, 0.7, (0, 0)), (0.33, 1.21, (2, 1)), (1.7, 0.05, (0, 3))]:
+        exact = pricing.price(DixonColesModel.score_matrices(lambda_h, lambda_a, 0.0, 15), score)
+        lookup = tables.lookup(lambda_h, lambda_a, score)
+        for market in lookup:
+            for sel in lookup[market]:
+                assert abs(lookup[market][sel] - exact[market][sel]) < 1e-3, (market, sel)
+    print("Live outcome tables test passed.")
+
+def test_live_engine_full_time():
+    engine = LiveMatchStateEngine(DixonColesModel())
+    probs = engine.predict_live_probs('Home', 'Away', [2, 1], 95)
+    assert probs == {"home": 1.0, "draw": 0.0, "away": 0.0}
+
+    probs = engine.predict_live_probs('Home', 'Away', [0, 0], 10)
+    assert np.isclose(sum(probs.values()), 1.0, atol=1e-5)
+    print("Live engine test passed.")
+
+if __name__ == "__main__":
+    test_live_outcome_tables()
+    test_live_engine_full_time()
@@ -0,0 +1,325 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+# Engine is created on import but never connected to; shadow experiments are stubbed below
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+import json
+import time
+import asyncio
+import tempfile
+import threading
+import fakeredis
+import redis
+from src.live_inference import LiveInferenceService
+
+class RecordingExperiments:
+    def __init__(self):
+        self.submitted = []
+
+    def submit_shadow_inference(self, fixture_id, context_data) -> bool:
+        self.submitted.append(fixture_id)
+        return True
+
+    def close(self):
+        pass
+
+class RecordingPipeline:
+    def __init__(self):
+        self.commands = []
+
+    def xadd(self, stream, fields):
+        self.commands.append(('xadd', stream))
+
+    def xack(self, stream, group, *ids):
+        self.commands.append(('xack', stream))
+
+def make_service(server, snapshot_dir, **kwargs):
+    kwargs.setdefault('experiment_manager', RecordingExperiments())
+    service = LiveInferenceService('redis://unused', block_ms=50, report_interval_sec=3600,
+                                   redis_client=fakeredis.FakeRedis(server=server),
+                                   snapshot_dir=snapshot_dir, **kwargs)
+    service.setup()
+    return service
+
+def add_goals(client, fixture_ids):
+    for i, fixture_id in enumerate(fixture_ids):
+        client.xadd('live_events', {'fixtureId': fixture_id, 'type': 'GOAL',
+                                    'data': json.dumps({'elapsed': 10 + i, 'score': [1, 0]})})
+
+def drained(client, service, fixture_ids) -> bool:
+    published = {f[b'fixtureId'].decode() for _, f in client.xrange('live_predictions')}
+    return (client.xpending('live_events', service.group_name)['pending'] == 0 and
+            published >= set(fixture_ids))
+
+def wait_for(condition, timeout_sec: float = 10.0) -> bool:
+    deadline = time.time() + timeout_sec
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_publishes_queued_before_acks():
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(fakeredis.FakeServer(), tmp)
+        service._publish('live_predictions', {'fixtureId': 'F1'})
+        service._publish('live_signals', {'fixtureId': 'F1'})
+        pipe = RecordingPipeline()
+        published = service._queue_flush(pipe, {'live_events': ['1-0'], 'live_odds': ['2-0']})
+
+        assert pipe.commands == [('xadd', 'live_predictions'), ('xadd', 'live_signals'),
+                                 ('xack', 'live_events'), ('xack', 'live_odds')]
+        assert [stream for stream, _ in published] == ['live_predictions', 'live_signals']
+        # Kept until the pipeline has executed
+        assert len(service._outbox) == 2
+
+def test_failed_flush_rereads_pending():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    fixture_ids = ['F0', 'F1', 'F2']
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(server, tmp)
+        add_goals(client, fixture_ids)
+
+        # The first publish+ack round trip fails after the batch was handled
+        pipeline, failures = service.redis.pipeline, [1]
+        def flaky_pipeline(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            if failures:
+                failures.pop()
+                def execute(*_):
+                    raise redis.exceptions.ConnectionError("connection reset")
+                pipe.execute = execute
+            return pipe
+        service.redis.pipeline = flaky_pipeline
+
+        consumer = threading.Thread(target=service.run, daemon=True)
+        consumer.start()
+        try:
+            assert wait_for(lambda: drained(client, service, fixture_ids))
+        finally:
+            service.stop()
+            consumer.join(timeout=5)
+        assert not failures
+        assert not consumer.is_alive()
+        assert client.xlen('live_predictions') == len(fixture_ids)
+    print("Failed flush recovery test passed.")
+
+def handle_new(service):
+    streams = service.redis.xreadgroup(service.group_name, service.consumer_name, service._streams(),
+                                       count=service.batch_size)
+    service._handle_batch(streams)
+
+def test_catch_up_skips_shadow_inference():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(server, tmp)
+        add_goals(client, ['F0'])
+        handle_new(service)
+        service._maintain_store(force=True)
+        # Handled and acked after the snapshot, so the restart replays it
+        add_goals(client, ['F1'])
+        handle_new(service)
+        assert service.experiment_manager.submitted == ['F0', 'F1']
+
+        restarted = make_service(server, tmp)
+        assert restarted.match_states.get('F1') is not None
+        assert restarted.experiment_manager.submitted == []
+        assert client.xlen('live_predictions') == 2
+
+        add_goals(client, ['F2'])
+        handle_new(restarted)
+        assert restarted.experiment_manager.submitted == ['F2']
+    print("Catch-up shadow suppression test passed.")
+
+def test_catch_up_replays_in_entry_order():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(server, tmp)
+        # Explicit IDs: entries of two streams added in the same millisecond tie
+        base = int(time.time() * 1000) + 1000
+        def add_odds(seq):
+            return client.xadd('live_odds', {'fixtureId': 'F0', 'bookmaker': 'Pinnacle', 'seq': seq,
+                                             'values': json.dumps([{'selection': 'home', 'odds': 2.0}])},
+                               id=f"{base + seq + 1}-0")
+        add_goals(client, ['F0'])
+        add_odds(-1)
+        handle_new(service)
+        service._maintain_store(force=True)
+        ids = []
+        for i in range(3):
+            ids.append(add_odds(2 * i))
+            ids.append(client.xadd('live_events', {'fixtureId': 'F0', 'type': 'SHOT', 'seq': 2 * i + 1,
+                                                   'data': json.dumps({'elapsed': 20 + i})},
+                                   id=f"{base + 2 * i + 2}-0"))
+        handle_new(service)
+
+        restarted = LiveInferenceService('redis://unused', batch_size=4, report_interval_sec=3600,
+                                         redis_client=fakeredis.FakeRedis(server=server),
+                                         snapshot_dir=tmp, experiment_manager=RecordingExperiments())
+        handled = []
+        restarted._handle_event = restarted._handle_odds = lambda fixture_id, data: handled.append(int(data[b'seq']))
+        restarted.setup()
+        # Interleaved as first handled, across page boundaries of both streams
+        assert handled == list(range(len(ids)))
+        assert restarted.match_states.offsets['live_odds'] == ids[-2].decode()
+        # Replayed messages are not observed as live latency
+        assert restarted._histograms == {}
+    print("Catch-up ordering test passed.")
+
+def test_coalesced_repricing_label():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    with tempfile.TemporaryDirectory() as tmp:
+        service = make_service(server, tmp)
+        add_goals(client, ['F0'])
+        handle_new(service)
+        # Opens a coalescing window that closes while only odds are read
+        client.xadd('live_events', {'fixtureId': 'F0', 'type': 'SHOT', 'data': json.dumps({'elapsed': 30})})
+        handle_new(service)
+        service._histograms.clear()
+        time.sleep(service.repricer.window)
+        client.xadd('live_odds', {'fixtureId': 'F1', 'bookmaker': 'Pinnacle',
+                                  'values': json.dumps([{'selection': 'home', 'odds': 2.0}])})
+        handle_new(service)
+        assert ('repricing', 'repricing') in service._histograms
+        assert not any(stream == 'live_events' for stream, _ in service._histograms)
+    print("Coalesced repricing label test passed.")
+
+def test_crashed_worker_state_adopted():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    survivor = make_service(server, None, worker_id='w1', sharded=True)
+    crashed = make_service(server, None, worker_id='w2', sharded=True)
+    survivor._maintain_shards(force=True)
+    assert survivor.shards.ring.nodes == ['w1', 'w2']
+    # w2 takes its fixtures once w1 has handed over for the new ring
+    crashed._maintain_shards()
+
+    fixture_ids = [f"F{i}" for i in range(20)]
+    add_goals(client, fixture_ids)
+    handle_new(survivor)
+    handle_new(crashed)
+    theirs = list(crashed.match_states)
+    assert theirs and not set(theirs) & set(survivor.match_states)
+    crashed._maintain_store(force=True)
+
+    # w2 dies without shutdown(); its heartbeat expires
+    client.zadd(survivor.shards.members_key, {'w2': time.time() - 60})
+    survivor._maintain_shards(force=True)
+    assert survivor.shards.ring.nodes == ['w1']
+    assert set(survivor.match_states) == set(fixture_ids)
+    assert survivor.match_states.get(theirs[0]).score == [1, 0]
+    assert client.hlen(survivor.handoff_key) == 0
+    assert client.get('live_match_state_snapshot:w2') is None
+    for stream in ('live_events', 'live_odds'):
+        assert [g['name'] for g in client.xinfo_groups(stream)] == [survivor.group_name.encode()]
+    print("Crashed worker cleanup test passed.")
+
+def add_score(client, fixture_ids, home_goals):
+    for fixture_id in fixture_ids:
+        client.xadd('live_events', {'fixtureId': fixture_id, 'type': 'GOAL',
+                                    'data': json.dumps({'elapsed': 10 * home_goals, 'score': [home_goals, 0]})})
+
+def test_scale_up_with_messages_in_flight():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    fixture_ids = [f"F{i}" for i in range(20)]
+    old = make_service(server, None, worker_id='w1', sharded=True)
+    add_score(client, fixture_ids, 1)
+    handle_new(old)
+
+    new = make_service(server, None, worker_id='w2', sharded=True)
+    assert new.shards.ring.nodes == ['w1', 'w2'] and old.shards.ring.nodes == ['w1']
+    moved = [f for f in fixture_ids if new.shards.owns(f)]
+    assert moved
+
+    # w1 has not seen the new ring yet and keeps handling w2's fixtures; w2 holds them back
+    add_score(client, fixture_ids, 2)
+    handle_new(old)
+    handle_new(new)
+    new._maintain_shards()
+    assert not new.match_states.get(moved[0])
+    assert not old.shards.is_current(client.get(old.shards.epoch_key))
+
+    # w1 switches and hands over; w2 reads more before it notices
+    old._maintain_shards(force=True)
+    add_score(client, fixture_ids, 3)
+    handle_new(old)
+    handle_new(new)
+    new._maintain_shards()
+    add_score(client, fixture_ids, 4)
+    handle_new(old)
+    handle_new(new)
+
+    for fixture_id in fixture_ids:
+        owner = new if fixture_id in moved else old
+        state = owner.match_states.get(fixture_id)
+        assert state.score == [4, 0] and len(state.events) == 4
+        assert (new if owner is old else old).match_states.get(fixture_id) is None
+    # Every goal was published exactly once, by whichever worker owned it then
+    published = [f[b'fixtureId'].decode() for _, f in client.xrange('live_predictions')]
+    assert sorted(published) == sorted(fixture_ids * 4)
+    assert client.hlen(new.handoff_key) == 0
+    for service in (old, new):
+        assert client.xpending('live_events', service.group_name)['pending'] == 0
+    print("Scale-up in flight test passed.")
+
+def test_scale_up_behind_old_owner():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    fixture_ids = [f"F{i}" for i in range(20)]
+    old = make_service(server, None, worker_id='w1', sharded=True)
+    # Sent before w2's groups exist and still unread by w1 when it switches
+    add_score(client, fixture_ids, 1)
+    new = make_service(server, None, worker_id='w2', sharded=True)
+    old._maintain_shards(force=True)
+    handle_new(old)
+    add_score(client, fixture_ids, 2)
+    new._maintain_shards()
+    handle_new(new)
+    handle_new(old)
+
+    for fixture_id in fixture_ids:
+        owner = new if new.shards.owns(fixture_id) else old
+        assert [e['data']['score'] for e in owner.match_states.get(fixture_id).events] == [[1, 0], [2, 0]]
+    published = [f[b'fixtureId'].decode() for _, f in client.xrange('live_predictions')]
+    assert sorted(published) == sorted(fixture_ids * 2)
+    print("Scale-up behind old owner test passed.")
+
+def test_run_async():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    fixture_ids = ['F0', 'F1', 'F2', 'F3']
+    with tempfile.TemporaryDirectory() as tmp:
+        async_client = fakeredis.FakeAsyncRedis(server=server)
+        service = make_service(server, tmp, async_redis_client=async_client, snapshot_interval_sec=0.0)
+        add_goals(client, fixture_ids)
+
+        async def run():
+            task = asyncio.create_task(service.run_async())
+            deadline = time.time() + 10
+            while not drained(client, service, fixture_ids) and time.time() < deadline:
+                await asyncio.sleep(0.05)
+            service.stop()
+            await asyncio.wait_for(task, timeout=5)
+
+        asyncio.run(run())
+        assert drained(client, service, fixture_ids)
+        # Snapshots were written from the maintenance thread
+        assert os.path.exists(os.path.join(tmp, f"{service.consumer_name}.snapshot"))
+    print("Async live inference test passed.")
+
+if __name__ == "__main__":
+    test_publishes_queued_before_acks()
+    test_failed_flush_rereads_pending()
+    test_catch_up_skips_shadow_inference()
+    test_catch_up_replays_in_entry_order()
+    test_coalesced_repricing_label()
+    test_crashed_worker_state_adopted()
+    test_scale_up_with_messages_in_flight()
+    test_scale_up_behind_old_owner()
+    test_run_async()
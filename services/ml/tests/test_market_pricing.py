@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import numpy as np
+from models.dixon_coles import DixonColesModel
+from models.market_pricing import MarketPricingEngine
+
+def brute_force(probs, h_line):
+    win = lose = 0.0
+    for i in range(probs.shape[0]):
+        for j in range(probs.shape[1]):
+            adjusted = i - j + h_line
+            if adjusted > 0: win += probs[i, j]
+            elif adjusted < 0: lose += probs[i, j]
+    return win, lose
+
+def test_market_pricing():
+    engine = MarketPricingEngine()
+    probs = DixonColesModel.score_matrices(1.6, 1.1, -0.05, 10)
+    markets = engine.price(probs)
+
+    i, j = np.indices(probs.shape)
+    assert np.isclose(markets["1X2"]["HOME"], probs[i > j].sum())
+    assert np.isclose(markets["1X2"]["HOME"] + markets["1X2"]["DRAW"] + markets["1X2"]["AWAY"], 1.0)
+    assert np.isclose(markets["OVER_UNDER_2_5"]["OVER"], probs[i + j > 2.5].sum())
+    assert np.isclose(markets["OVER_UNDER_0_5"]["UNDER"], probs[0, 0])
+    assert np.isclose(markets["BTTS"]["YES"], probs[1:, 1:].sum())
+    assert np.isclose(markets["HOME_OVER_UNDER_1_5"]["OVER"], probs[2:, :].sum())
+    assert np.isclose(markets["WINNING_MARGIN"]["HOME_1"], probs[i - j == 1].sum())
+    assert np.isclose(markets["CORRECT_SCORE"]["2-1"], probs[2, 1])
+    assert np.isclose(sum(markets["WINNING_MARGIN"].values()), 1.0)
+
+    # Quarter line: half stake on each neighbouring line
+    w1, l1 = brute_force(probs, -0.5)
+    w2, l2 = brute_force(probs, -1.0)
+    expected = (w1 + w2) / (w1 + w2 + l1 + l2)
+    assert np.isclose(markets["ASIAN_HANDICAP_-0_75"]["HOME"], expected)
+    print("Market pricing test passed.")
+
+def test_market_pricing_batch_and_in_play():
+    engine = MarketPricingEngine()
+    stack = DixonColesModel.score_matrices(np.array([1.2, 1.8]), np.array([1.0, 0.7]), 0.0, 8)
+    batch = engine.price(stack)
+    single = engine.price(stack[1])
+    assert batch["1X2"]["HOME"].shape == (2,)
+    assert np.isclose(batch["ASIAN_HANDICAP_+0_25"]["AWAY"][1], single["ASIAN_HANDICAP_+0_25"]["AWAY"])
+
+    # 1-0 up with goals still to come
+    live = engine.price(stack[0], current_score=(1, 0))
+    assert np.isclose(live["BTTS"]["YES"], 1 - stack[0][:, 0].sum())
+    assert np.isclose(live["OVER_UNDER_0_5"]["OVER"], 1.0)
+    print("Batch and in-play pricing test passed.")
+
+if __name__ == "__main__":
+    test_market_pricing()
+    test_market_pricing_batch_and_in_play()
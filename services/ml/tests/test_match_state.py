@@ -0,0 +1,48 @@
+import sys
+import os
+import tempfile
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from match_state import MatchStateStore, FileSnapshotSink
+
+def test_match_state_store():
+    store = MatchStateStore(event_capacity=5, idle_timeout_sec=100, finished_ttl_sec=10)
+    for i in range(20):
+        state = store.touch('fixture_1')
+        state.events.append({'type': 'SHOT', 'data': {'elapsed': i}})
+        state.elapsed = i
+    state.score = [2, 1]
+    state.current_probs = {'home': 0.7, 'draw': 0.2, 'away': 0.1}
+
+    # Event ring keeps only the most recent events
+    assert len(state.events) == 5
+    assert state.events[0]['data']['elapsed'] == 15
+
+    finished = store.touch('fixture_2')
+    finished.finished = True
+    idle = store.touch('fixture_3')
+    store.offsets = {'live_events': '1700000000000-3'}
+
+    # Snapshot round trip
+    restored = MatchStateStore(event_capacity=5)
+    sink = FileSnapshotSink(os.path.join(tempfile.mkdtemp(), 'worker.snapshot'))
+    sink.save(store.to_bytes())
+    restored.load_bytes(sink.load())
+    copy = restored.get('fixture_1')
+    assert len(restored) == 3
+    assert restored.offsets == store.offsets
+    assert copy.score == [2, 1] and copy.elapsed == 19
+    assert copy.current_probs == state.current_probs
+    assert list(copy.events) == list(state.events)
+    assert restored.get('fixture_3').current_probs is None
+    assert restored.get('fixture_2').finished
+
+    # Finished fixtures go after the grace period, idle ones after the timeout
+    now = idle.last_update
+    assert store.evict(now + 50) == ['fixture_2']
+    assert sorted(store.evict(now + 200)) == ['fixture_1', 'fixture_3']
+    assert len(store) == 0
+    print("Match state store test passed.")
+
+if __name__ == "__main__":
+    test_match_state_store()
@@ -0,0 +1,57 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+import numpy as np
+from src.models.multi_league import MultiLeagueDixonColesModel
+
+def make_league(league, rng, n=120):
+    home = rng.integers(0, 4, n)
+    away = (home + rng.integers(1, 4, n)) % 4
+    return pd.DataFrame({
+        'leagueId': league,
+        'home_team': [f"{league}_{i}" for i in home],
+        'away_team': [f"{league}_{i}" for i in away],
+        'home_goals': rng.poisson(1.4, n),
+        'away_goals': rng.poisson(1.1, n)
+    })
+
+def test_multi_league_fit():
+    rng = np.random.default_rng(0)
+    df = pd.concat([make_league('EPL', rng), make_league('LIGA', rng)], ignore_index=True)
+
+    model = MultiLeagueDixonColesModel(max_workers=2)
+    sizes = model.fit(df)
+    assert sizes == {'EPL': 4, 'LIGA': 4}
+    assert model.league_for('LIGA_0', 'LIGA_2') == 'LIGA'
+
+    # Same result as fitting the partition on its own
+    sequential = MultiLeagueDixonColesModel(max_workers=1)
+    sequential.fit(df[df['leagueId'] == 'EPL'])
+    assert np.allclose(model.predict_probs('EPL_1', 'EPL_3'), sequential.predict_probs('EPL_1', 'EPL_3'))
+
+    batch = model.predict_probs_batch(['EPL_0', 'LIGA_1'], ['EPL_1', 'LIGA_3'])
+    assert np.allclose(batch.sum(axis=(1, 2)), 1.0)
+    assert model.predict_probs_batch([], []).shape == (0, 11, 11)
+
+    try:
+        model.predict_probs('EPL_0', 'LIGA_1')
+        assert False, "Expected KeyError for cross-league fixture"
+    except KeyError:
+        pass
+    print("Multi-league test passed.")
+
+def test_multi_league_empty_partial_fit():
+    rng = np.random.default_rng(1)
+    model = MultiLeagueDixonColesModel(max_workers=1)
+    model.fit(make_league('EPL', rng))
+    before = model.predict_probs('EPL_0', 'EPL_1')
+
+    assert model.partial_fit(make_league('EPL', rng).iloc[:0]) == {}
+    assert np.array_equal(model.predict_probs('EPL_0', 'EPL_1'), before)
+    print("Empty warm-start test passed.")
+
+if __name__ == "__main__":
+    test_multi_league_fit()
+    test_multi_league_empty_partial_fit()
@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import numpy as np
+from backtesting.order_book import OrderBook
+
+def test_order_book():
+    book = OrderBook(recovery_rate=0.1, now=0.0)
+    book.update([(2.0, 100), (2.1, 50), (1.9, 200)], now=0.0)
+    assert list(book.prices) == [2.1, 2.0, 1.9]
+
+    # Walks the book best price first
+    filled, price = book.fill(120, now=0.0)
+    assert filled == 120
+    assert abs(price - (50 * 2.1 + 70 * 2.0) / 120) < 1e-12
+    assert list(book.volume) == [0, 30, 200]
+
+    # Consumed levels recover 10% of their depth per second
+    assert abs(book.available(now=5.0) - (25 + 80 + 200)) < 1e-9
+    assert abs(book.available(now=100.0) - 350) < 1e-9
+
+    # Level updates: requote, remove on zero, insert in order
+    book.set_level(2.0, 10, now=100.0)
+    book.set_level(1.9, 0, now=100.0)
+    book.set_level(2.05, 40, now=100.0)
+    assert list(book.prices) == [2.1, 2.05, 2.0]
+    assert list(book.volume) == [50, 40, 10]
+
+    # A stake larger than the book fills what is there
+    filled, price = book.fill(1000, now=100.0)
+    assert filled == 100 and abs(price - (50 * 2.1 + 40 * 2.05 + 10 * 2.0) / 100) < 1e-12
+    assert book.fill(10, now=100.0) == (0.0, 0.0)
+    print("Order book test passed.")
+
+if __name__ == "__main__":
+    test_order_book()
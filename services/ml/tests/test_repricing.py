@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from repricing import RepricingScheduler
+
+def test_repricing_scheduler():
+    calls = []
+    def price_fn(home, away, score, elapsed):
+        calls.append((tuple(score), elapsed))
+        return {'home': 0.5 - 0.001 * elapsed, 'draw': 0.3, 'away': 0.2 + 0.001 * elapsed}
+
+    scheduler = RepricingScheduler(price_fn, window_ms=250, threshold=0.005)
+
+    # A burst of events coalesces into one update once the window closes
+    for i in range(10):
+        scheduler.mark('fixture_1', now=100.0 + i * 0.01)
+    assert scheduler.due(now=100.2) == []
+    assert scheduler.next_due() == 100.25
+    assert scheduler.due(now=100.3) == ['fixture_1']
+    assert scheduler.pending == 0
+
+    # Urgent marks are due immediately and can be claimed early
+    scheduler.mark('fixture_2', urgent=True, now=100.0)
+    assert scheduler.due(now=100.0) == ['fixture_2']
+    scheduler.mark('fixture_3', now=100.0)
+    assert scheduler.take('fixture_3') and not scheduler.take('fixture_3')
+
+    # Memoized per score and elapsed bucket, priced at the bucket midpoint
+    p1 = scheduler.price('Home', 'Away', [1, 0], 30)
+    p2 = scheduler.price('Home', 'Away', [1, 0], 30.9)
+    assert p1 is p2 and calls == [((1, 0), 30.5)]
+    scheduler.price('Home', 'Away', [1, 0], 31)
+    assert calls[-1] == ((1, 0), 31.5)
+
+    # Publish only on moves beyond the threshold
+    assert scheduler.should_publish('fixture_1', scheduler.price('Home', 'Away', [1, 0], 30))
+    assert not scheduler.should_publish('fixture_1', scheduler.price('Home', 'Away', [1, 0], 33))
+    assert scheduler.should_publish('fixture_1', scheduler.price('Home', 'Away', [1, 0], 36))
+    print("Repricing scheduler test passed.")
+
+if __name__ == "__main__":
+    test_repricing_scheduler()
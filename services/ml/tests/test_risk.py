@@ -0,0 +1,36 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+from risk import RegimeDetector
+
+def test_regime_detector():
+    detector = RegimeDetector(jump_halflife_sec=60.0)
+    now = 1_700_000_000.0
+
+    # Calm market on one selection, a 20% jump on another of the same fixture
+    for i in range(10):
+        detector.update('fixture_1', 'home', 2.0 + 0.001 * i, timestamp=now + i)
+        detector.update('fixture_1', 'away', 3.0, timestamp=now + i)
+        detector.update('fixture_2', 'home', 1.8, timestamp=now + i)
+    detector.update('fixture_1', 'away', 3.6, timestamp=now + 10)
+
+    assert not detector.is_unstable('fixture_1', 'home', now=now + 10)
+    assert detector.is_unstable('fixture_1', 'away', now=now + 10)
+    assert not detector.is_unstable('fixture_1', 'away', market='OVER_UNDER_2_5', now=now + 10)
+    # The jump decays away once the market settles
+    assert detector.scores(now=now + 310).loc['fixture_1', 'jump_intensity'] < 0.05
+
+    scores = detector.scores(now=now + 10)
+    assert list(scores.index) == ['fixture_1', 'fixture_2']
+    assert scores.loc['fixture_1', 'unstable'] and not scores.loc['fixture_2', 'unstable']
+    assert scores.loc['fixture_1', 'jumps'] == 1
+
+    detector.drop_fixture('fixture_1')
+    assert list(detector.scores(now=now + 10).index) == ['fixture_2']
+    detector.update('fixture_3', 'home', 2.5, timestamp=now + 11)
+    assert sorted(detector.scores(now=now + 11).index) == ['fixture_2', 'fixture_3']
+    print("Regime detector test passed.")
+
+if __name__ == "__main__":
+    test_regime_detector()
@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import time
+import fakeredis
+from sharding import ConsistentHashRing, ShardCoordinator
+
+def test_consistent_hash_ring():
+    fixtures = [f"fixture_{i}" for i in range(2000)]
+    ring = ConsistentHashRing(['w1', 'w2', 'w3'])
+    before = {f: ring.owner(f) for f in fixtures}
+
+    counts = {w: list(before.values()).count(w) for w in ring.nodes}
+    assert min(counts.values()) > 400 # Roughly balanced
+
+    # Scale-up only moves fixtures onto the new worker
+    ring.set_nodes(['w1', 'w2', 'w3', 'w4'])
+    after = {f: ring.owner(f) for f in fixtures}
+    moved = [f for f in fixtures if before[f] != after[f]]
+    assert all(after[f] == 'w4' for f in moved)
+    assert len(moved) < 0.4 * len(fixtures)
+    print("Consistent hash ring test passed.")
+
+def test_departed_workers():
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeRedis(server=server)
+    workers = {w: ShardCoordinator(fakeredis.FakeRedis(server=server), w) for w in ['w1', 'w2', 'w3']}
+    for coordinator in workers.values():
+        coordinator.heartbeat()
+    assert workers['w3'].joined_from == ['w1', 'w2']
+    # The last to join already saw everyone, the others catch up on their next beat
+    assert workers['w3'].heartbeat() is False
+    assert workers['w1'].heartbeat() is True
+    assert workers['w2'].heartbeat() is True
+    assert workers['w1'].ring.nodes == workers['w2'].ring.nodes == ['w1', 'w2', 'w3']
+    # One epoch per join, all agreed on; plain refreshes keep it
+    assert workers['w1'].epoch == workers['w3'].epoch == 3
+    assert workers['w3'].joined_from is None
+    assert workers['w1'].is_current(client.get('live_workers:epoch'))
+
+    # w3 crashes: the first survivor to notice reports it, the other only sees the new ring
+    client.zadd('live_workers', {'w3': time.time() - 60})
+    assert workers['w1'].heartbeat() is True
+    assert workers['w1'].departed == ['w3']
+    assert workers['w2'].heartbeat() is True
+    assert workers['w2'].departed == []
+    assert workers['w2'].ring.nodes == ['w1', 'w2']
+    assert workers['w2'].epoch == 4
+
+    # A graceful leave is not a departure
+    workers['w2'].leave()
+    assert workers['w1'].heartbeat() is True
+    assert workers['w1'].departed == []
+    assert workers['w1'].epoch == workers['w2'].epoch == 5
+    print("Departed workers test passed.")
+
+if __name__ == "__main__":
+    test_consistent_hash_ring()
+    test_departed_workers()
@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import numpy as np
+import pandas as pd
+from infrastructure.shared_frame import share_frame, attach_frame, release_frame
+
+def test_shared_frame_dtypes():
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2024-03-01 15:00', None, '2024-08-01 19:45']).tz_localize('Europe/London'),
+        'kickoff': pd.to_datetime(['2024-01-01', '2024-01-02', None]),
+        'goals': pd.array([1, None, 3], dtype='Int64'),
+        'settled': pd.array([True, None, False], dtype='boolean'),
+        'team': pd.array(['A', None, 'C'], dtype='string'),
+        'league': pd.Categorical(['EPL', 'LIGA', 'EPL'], categories=['LIGA', 'EPL'], ordered=True),
+        'venue': np.array(['home', None, 'away'], dtype=object),
+        'odds': [1.5, np.nan, 2.5]
+    })
+    blocks, spec = share_frame(df)
+    try:
+        attached = attach_frame(spec)
+    finally:
+        release_frame(blocks)
+    pd.testing.assert_frame_equal(attached, df)
+    assert str(attached['date'].dt.tz) == 'Europe/London'
+
+    # Row slices, as handed to per-partition workers
+    blocks, spec = share_frame(df)
+    try:
+        pd.testing.assert_frame_equal(attach_frame(spec, 1, 3), df.iloc[1:3].reset_index(drop=True))
+    finally:
+        release_frame(blocks)
+
+    try:
+        share_frame(pd.DataFrame({'period': pd.period_range('2024-01', periods=2, freq='M')}))
+        assert False, "Expected TypeError for a period column"
+    except TypeError:
+        pass
+    print("Shared frame dtype test passed.")
+
+if __name__ == "__main__":
+    test_shared_frame_dtypes()
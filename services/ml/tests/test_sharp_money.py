@@ -0,0 +1,95 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import numpy as np
+from sharp_money import SharpMoneyEngine
+
+def _reference_leadership(history_a, history_b, now, window=300):
+    ts = np.arange(now - window, now, 1)
+    a = np.interp(ts, *zip(*history_a), left=history_a[0][1])
+    b = np.interp(ts, *zip(*history_b), left=history_b[0][1])
+    lags = np.arange(-10, 11)
+    corrs = []
+    for lag in lags:
+        if lag == 0:
+            corrs.append(np.corrcoef(a, b)[0, 1])
+        elif lag > 0:
+            corrs.append(np.corrcoef(a[lag:], b[:-lag])[0, 1])
+        else:
+            corrs.append(np.corrcoef(a[:lag], b[-lag:])[0, 1])
+    best = int(np.argmax(corrs))
+    return lags[best], corrs[best]
+
+def test_leadership_matches_direct_correlation():
+    rng = np.random.default_rng(3)
+    engine = SharpMoneyEngine(capacity=256)
+    now = 1_700_000_000.0
+    histories = {}
+
+    # Soft book follows the sharp book 4 seconds later
+    for sel in ['home', 'draw', 'away']:
+        t = np.sort(now - 330 + rng.uniform(0, 330, 200))
+        sharp = 2.0 + np.cumsum(rng.normal(0, 0.02, len(t)))
+        for book, lag in [('Betfair', 0.0), ('Pinnacle', 4.0)]:
+            histories[(book, sel)] = [(ti + lag, p) for ti, p in zip(t, sharp) if ti + lag < now]
+            for ti, p in histories[(book, sel)]:
+                engine.add_price('fixture_1', book, sel, p, timestamp=ti)
+    engine.add_price('fixture_1', 'Bet365', 'home', 2.1, timestamp=now - 10)
+
+    queries = [('fixture_1', sel, 'Betfair', 'Pinnacle') for sel in ['home', 'draw', 'away']]
+    results = engine.detect_leadership_many(queries + [('fixture_1', 'home', 'Betfair', 'Bet365'),
+                                                       ('fixture_1', 'home', 'Betfair', 'Unknown')], now=now)
+    for (_, sel, _, _), result in zip(queries, results):
+        lag, corr = _reference_leadership(histories[('Betfair', sel)], histories[('Pinnacle', sel)], now)
+        # The direct loop labels lags from the soft book's side
+        assert result['lag_sec'] == -lag
+        assert abs(result['correlation'] - corr) < 1e-9
+    assert results[0]['lag_sec'] == 4.0 and results[0]['leadership_score'] > 0.7 # Sharp leads
+    assert results[3] == 0.0 # Flat soft book
+    assert results[4] is None
+    assert engine.detect_leadership('fixture_1', 'home', 'Betfair', 'Pinnacle', now=now) == results[0]
+
+    # Ring keeps only the newest ticks per series
+    for i in range(1000):
+        engine.add_price('fixture_2', 'Betfair', 'home', 2.0 + i, timestamp=now + i)
+    sid = engine.prices.series_id('fixture_2', 'Betfair', 'home')
+    assert engine.prices.counts[sid] == 256
+    assert engine.prices.prices[sid].min() == 2.0 + 1000 - 256
+
+    engine.drop_fixture('fixture_2')
+    assert engine.prices.series_id('fixture_2', 'Betfair', 'home') is None
+    print("Sharp money leadership test passed.")
+
+def test_streaming_lead_lag():
+    rng = np.random.default_rng(1)
+    engine = SharpMoneyEngine()
+    now = 1_700_000_000.0
+    t = np.sort(now - 600 + rng.uniform(0, 600, 600))
+    prices = 2.0 + np.cumsum(rng.normal(0, 0.02, len(t)))
+
+    # Pinnacle trails Betfair by 4s, Bet365 by 7s
+    ticks = []
+    for ti, p in zip(t, prices):
+        ticks += [(ti, 'Betfair', p), (ti + 4, 'Pinnacle', p), (ti + 7, 'Bet365', p + 0.1)]
+    for ti, book, p in sorted(ticks):
+        engine.add_price('fixture_1', book, 'home', p, timestamp=ti)
+
+    streaming = engine.lead_lag.leadership('fixture_1', 'home', 'Betfair', 'Pinnacle')
+    batch = engine.detect_leadership('fixture_1', 'home', 'Betfair', 'Pinnacle', now=ticks[-1][0])
+    assert streaming['lag_sec'] == batch['lag_sec'] == 4.0
+    assert streaming['leadership_score'] > 0.99
+    assert engine.lead_lag.leadership('fixture_1', 'home', 'Pinnacle', 'Betfair')['lag_sec'] == -4.0
+
+    pairs = engine.pair_leaderships('fixture_1', leader='Betfair')
+    assert set(pairs) == {('home', 'Betfair', 'Pinnacle'), ('home', 'Betfair', 'Bet365')}
+    assert pairs[('home', 'Betfair', 'Bet365')]['lag_sec'] == 7.0
+    assert engine.lead_lag.leadership('fixture_1', 'home', 'Betfair', 'Unknown') is None
+
+    engine.drop_fixture('fixture_1')
+    assert engine.pair_leaderships('fixture_1') == {}
+    print("Streaming lead-lag test passed.")
+
+if __name__ == "__main__":
+    test_leadership_matches_direct_correlation()
+    test_streaming_lead_lag()
@@ -4,7 +4,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src'
 
 import pandas as pd
 import numpy as np
-from backtesting.simulator import BacktestingSimulator
+from backtesting.simulator import BacktestingSimulator, _simulate_log_paths
 
 def test_simulator():
     sim = BacktestingSimulator(initial_bankroll=1000)
@@ -30,5 +30,77 @@ def test_simulator():
     print(f"Simulation metrics: {metrics}")
     print("Simulator test passed.")
 
+def test_batch_matches_per_row():
+    rng = np.random.default_rng(0)
+    n = 2000
+    df = pd.DataFrame({
+        'date': pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.permutation(n), unit='h'),
+        'home_team': [f"T{i % 40}" for i in range(n)],
+        'away_team': [f"T{(i + 7) % 40}" for i in range(n)],
+        'home_odds': rng.uniform(1.3, 4.0, n),
+        'draw_odds': rng.uniform(2.8, 4.0, n),
+        'away_odds': rng.uniform(1.5, 6.0, n),
+        'result': rng.integers(0, 3, n),
+        'pick': rng.integers(-1, 3, n),
+        'fraction': rng.uniform(0.001, 0.03, n)
+    })
+
+    def predict_row(row):
+        return {'recommended_bet': None if row['pick'] < 0 else int(row['pick']), 'suggested_stake': row['fraction']}
+
+    def predict_batch(batch):
+        return {'recommended_bet': batch['pick'].where(batch['pick'] >= 0), 'suggested_stake': batch['fraction']}
+
+    per_row, batch = BacktestingSimulator(), BacktestingSimulator()
+    expected = per_row.run(df, predict_row)
+    results = batch.run_batch(df, predict_batch)
+
+    assert len(results) == len(expected) == (df['pick'] >= 0).sum()
+    assert (results['bet_type'].to_numpy() == expected['bet_type'].to_numpy()).all()
+    assert (results['is_win'].to_numpy() == expected['is_win'].to_numpy()).all()
+    for col in ['odds', 'stake', 'profit', 'bankroll']:
+        assert np.allclose(results[col], expected[col], rtol=1e-9)
+    assert np.isclose(batch.bankroll, per_row.bankroll, rtol=1e-9)
+
+    metrics, expected_metrics = batch.calculate_metrics(), per_row.calculate_metrics()
+    for key in expected_metrics:
+        assert np.isclose(metrics[key], expected_metrics[key], rtol=1e-9)
+    print("Batch backtest test passed.")
+
+def test_monte_carlo_summary():
+    sim = BacktestingSimulator(initial_bankroll=1000)
+    kwargs = dict(n_sims=5000, n_steps=60, stake_fraction=0.1, ruin_level=0.6, chunk_size=1000, seed=7)
+    summary = sim.run_monte_carlo_summary(**kwargs)
+    parallel = sim.run_monte_carlo_summary(max_workers=2, **kwargs)
+    pd.testing.assert_frame_equal(summary['percentile_bands'], parallel['percentile_bands'])
+    assert summary['max_drawdown'] == parallel['max_drawdown']
+    assert summary['ruin_probability'] == parallel['ruin_probability']
+
+    # Rebuild every path from the same per-chunk seeds
+    params = dict(win_rate=0.55, odds=1.9, stake_fraction=0.1, black_swan_prob=0.01, black_swan_loss=0.05)
+    seeds = np.random.SeedSequence(7).spawn(5)
+    paths = 1000 * np.exp(np.vstack([_simulate_log_paths(np.random.default_rng(s), 1000, 60, **params) for s in seeds]))
+
+    ruined = (paths <= 600).any(axis=1)
+    assert summary['ruin_probability'] == ruined.mean()
+    assert summary['time_to_ruin']['counts'].sum() == ruined.sum()
+    peaks = np.maximum(np.maximum.accumulate(paths, axis=1), 1000)
+    assert np.isclose(summary['max_drawdown']['p50'], np.percentile((1 - paths / peaks).max(axis=1), 50))
+    assert np.isclose(summary['final_bankroll']['p95'], np.percentile(paths[:, -1], 95))
+
+    # Histogram bands put each percentile where the empirical CDF crosses it, to within a bin
+    bands = summary['percentile_bands']
+    assert (bands.loc[0] == 1000).all()
+    for step in [1, 20, 60]:
+        for q in [5, 50, 95]:
+            below = (paths[:, step - 1] <= bands.loc[step, f"p{q}"] * (1 + 5e-3)).mean()
+            above = (paths[:, step - 1] < bands.loc[step, f"p{q}"] * (1 - 5e-3)).mean()
+            assert above <= q / 100 <= below
+
+    assert len(sim.run_monte_carlo(n_sims=10, n_steps=5, seed=1)[0]) == 6
+    print("Monte Carlo summary test passed.")
+
 if __name__ == "__main__":
     test_simulator()
+    test_batch_matches_per_row()
+    test_monte_carlo_summary()
@@ -0,0 +1,32 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../src')))
+
+import numpy as np
+import tempfile
+from models.stacking_ensemble import StackingEnsemble, ProbabilityCalibrator, CompiledEnsemble
+
+def test_compiled_ensemble_matches_sklearn():
+    rng = np.random.default_rng(0)
+    base = rng.dirichlet([2, 1.5, 1.8], size=(500, 2)).reshape(500, 6)
+    y = rng.integers(0, 3, 500)
+
+    ensemble = StackingEnsemble()
+    assert np.allclose(ensemble.compile().predict_proba(base), ensemble.predict_proba(base))
+
+    ensemble.fit(base, y)
+    calibrator = ProbabilityCalibrator()
+    calibrator.fit(ensemble.predict_proba(base), y)
+
+    expected = calibrator.calibrate(ensemble.predict_proba(base[:50]))
+    compiled = ensemble.compile(calibrator)
+    assert np.allclose(compiled.predict_proba(base[:50]), expected, atol=1e-12)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'ensemble.npz')
+        compiled.save(path)
+        assert np.allclose(CompiledEnsemble.load(path).predict_proba(base[:50]), expected, atol=1e-12)
+    print("Compiled ensemble test passed.")
+
+if __name__ == "__main__":
+    test_compiled_ensemble_matches_sklearn()
@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from src.backtesting.simulator import BacktestingSimulator
+from src.backtesting.sweep import ParameterSweep, value_bet_strategy
+
+def _history(n: int = 3000, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    probs = rng.dirichlet([4, 2.5, 3], n)
+    odds = 0.95 / (probs * rng.uniform(0.9, 1.1, (n, 3)))
+    return pd.DataFrame({
+        'date': pd.Timestamp('2014-01-01') + pd.to_timedelta(rng.permutation(n), unit='h'),
+        'home_team': [f"T{i % 30}" for i in range(n)],
+        'away_team': [f"T{(i + 11) % 30}" for i in range(n)],
+        'home_prob': probs[:, 0], 'draw_prob': probs[:, 1], 'away_prob': probs[:, 2],
+        'home_odds': odds[:, 0], 'draw_odds': odds[:, 1], 'away_odds': odds[:, 2],
+        'result': [rng.choice(3, p=p) for p in probs]
+    })
+
+def test_parameter_sweep():
+    df = _history()
+    param_sets = ParameterSweep.grid({'ev_threshold': [0.0, 0.05], 'kelly_fraction': [0.1, 0.5],
+                                      'commission': [0.0, 0.05]})
+    assert len(param_sets) == 8
+
+    parallel = ParameterSweep(df, max_workers=2).run(param_sets)
+    sequential = ParameterSweep(df, max_workers=1).run(param_sets)
+    pd.testing.assert_frame_equal(parallel, sequential)
+    assert list(parallel.columns[:3]) == ['ev_threshold', 'kelly_fraction', 'commission']
+    assert (parallel['total_bets'] > 0).all()
+
+    # Same numbers as a direct batch backtest
+    sim = BacktestingSimulator(commission=0.05)
+    sim.run_batch(df, lambda batch: value_bet_strategy(batch, ev_threshold=0.05, kelly_fraction=0.5))
+    row = parallel[(parallel['ev_threshold'] == 0.05) & (parallel['kelly_fraction'] == 0.5) & (parallel['commission'] == 0.05)]
+    assert np.isclose(row['final_bankroll'].iloc[0], sim.calculate_metrics()['final_bankroll'])
+
+    samples = ParameterSweep.random({'ev_threshold': (0.0, 0.1), 'max_stake': [0.02, 0.05]}, n_iter=5, seed=1)
+    assert samples == ParameterSweep.random({'ev_threshold': (0.0, 0.1), 'max_stake': [0.02, 0.05]}, n_iter=5, seed=1)
+    assert all(0.0 <= s['ev_threshold'] <= 0.1 and s['max_stake'] in (0.02, 0.05) for s in samples)
+    print(parallel)
+    print("Parameter sweep test passed.")
+
+if __name__ == "__main__":
+    test_parameter_sweep()
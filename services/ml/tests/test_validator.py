@@ -0,0 +1,67 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+import pandas as pd
+from src.backtesting.validator import WalkForwardValidator
+
+# Outcome frequencies per home team: a cold fit counts the whole window, a warm
+# start adds the new rows to the previous counts, so both give the same model
+def train_counts(train, previous=None):
+    counts = {} if previous is None else dict(previous)
+    for team, result in zip(train['home_team'], train['result']):
+        counts[team] = counts.get(team, np.ones(3)) + np.eye(3)[result]
+    return counts
+
+def predict_row(model, row):
+    probs = model.get(row['home_team'], np.ones(3))
+    return {'prob_home': probs[0] / probs.sum(), 'recommended_bet': int(probs.argmax())}
+
+def predict_batch(model, test):
+    probs = np.array([model.get(team, np.ones(3)) for team in test['home_team']])
+    return {'prob_home': probs[:, 0] / probs.sum(axis=1), 'recommended_bet': probs.argmax(axis=1)}
+
+def test_walk_forward():
+    rng = np.random.default_rng(5)
+    n = 3000
+    df = pd.DataFrame({
+        'date': (pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 6 * 365, n), unit='D')).strftime('%Y-%m-%d'),
+        'home_team': [f"T{i}" for i in rng.integers(0, 20, n)],
+        'result': rng.integers(0, 3, n)
+    })
+    original = df.copy()
+
+    validator = WalkForwardValidator(train_window_years=3, test_window_months=6)
+    per_row = validator.validate(df, train_counts, predict_row)
+    pd.testing.assert_frame_equal(df, original) # Caller's frame is untouched
+
+    batched = validator.validate(df, train_counts, predict_batch_fn=predict_batch)
+    parallel = WalkForwardValidator(3, 6, max_workers=2).validate(df, train_counts, predict_batch_fn=predict_batch)
+    warm = validator.validate(df, train_counts, predict_batch_fn=predict_batch, warm_start=True)
+
+    dates = pd.to_datetime(df['date'])
+    assert len(per_row) == (dates >= dates.min() + pd.DateOffset(years=3)).sum()
+    assert per_row['date'].is_monotonic_increasing
+    for result in [batched, parallel, warm]:
+        pd.testing.assert_frame_equal(result, per_row, check_dtype=False)
+    print("Walk-forward validation test passed.")
+
+def test_walk_forward_tz_aware_parallel():
+    rng = np.random.default_rng(6)
+    n = 800
+    df = pd.DataFrame({
+        'date': pd.Timestamp('2015-01-01', tz='Europe/London') + pd.to_timedelta(rng.integers(0, 5 * 365, n), unit='D'),
+        'home_team': pd.array([f"T{i}" for i in rng.integers(0, 10, n)], dtype='string'),
+        'result': rng.integers(0, 3, n)
+    })
+    sequential = WalkForwardValidator(3, 6).validate(df, train_counts, predict_batch_fn=predict_batch)
+    # Workers see the frame through shared memory, with its timezone and dtypes intact
+    parallel = WalkForwardValidator(3, 6, max_workers=2).validate(df, train_counts, predict_batch_fn=predict_batch)
+    assert len(sequential) > 0
+    assert str(parallel['date'].dt.tz) == 'Europe/London'
+    pd.testing.assert_frame_equal(parallel, sequential)
+
+if __name__ == "__main__":
+    test_walk_forward()
+    test_walk_forward_tz_aware_parallel()